@@ -529,6 +529,11 @@ class Connector:
         self.doc_source["error"] = str(error)
         await self.sync_doc()
 
+    async def _save_checkpoint(self, checkpoint):
+        """Saves how far the sync went, to resume from there if it fails."""
+        self.doc_source["sync_checkpoint"] = checkpoint
+        await self.sync_doc()
+
     async def _sync_done(self, job, result, exception=None):
         doc_updated = result.get("doc_updated", 0)
         doc_created = result.get("doc_created", 0)
@@ -543,6 +548,9 @@ class Connector:
         if exception is None:
             self.doc_source["last_sync_error"] = None
             self.doc_source["error"] = None
+            if self.data_provider is not None:
+                self.doc_source["sync_cursor"] = self.data_provider.sync_cursor()
+            self.doc_source["sync_checkpoint"] = None
         else:
             self.doc_source["last_sync_error"] = str(exception)
             self.doc_source["error"] = str(exception)
@@ -554,6 +562,16 @@ class Connector:
             f"[{self.id}] Sync done: {indexed_count} indexed, {doc_deleted} "
             f" deleted. ({int(time.time() - self._start_time)} seconds)"
         )
+        doc_retried = result.get("doc_retried", 0)
+        doc_dropped = result.get("doc_dropped", 0)
+        if doc_retried or doc_dropped:
+            logger.warning(
+                f"[{self.id}] {doc_retried} operations were retried, {doc_dropped} were dropped. Last dropped: {result.get('dead_letters', [])}"
+            )
+        if self.data_provider is not None:
+            sync_stats = self.data_provider.sync_stats()
+            if sync_stats:
+                logger.info(f"[{self.id}] Sync stats: {sync_stats}")
 
     async def prepare_docs(self, data_provider, filtering=None):
         if filtering is None:
@@ -657,8 +675,18 @@ class Connector:
                     f"Could not instantiate {self.source_klass} for {service_type}"
                 )
 
-            if not await self.data_provider.changed():
+            self.data_provider.set_sync_cursor(self.doc_source.get("sync_cursor"))
+            self.data_provider.set_sync_checkpoint(
+                self.doc_source.get("sync_checkpoint")
+            )
+            self.data_provider.set_filtering(self.filtering.get_active_filter())
+
+            # forced syncs run even when nothing changed, e.g. to apply new sync rules
+            if not sync_now and not await self.data_provider.changed():
                 logger.debug(f"No change in {service_type} data provider, skipping...")
+                # the next sync creates its own data provider
+                await self.data_provider.close()
+                self.data_provider = None
                 return
         except Exception as exc:
             self.doc_source["error"] = str(exc)
@@ -700,6 +728,8 @@ class Connector:
                 filtering=self.filtering,
                 sync_rules_enabled=sync_rules_enabled,
                 options=bulk_options,
+                data_provider=self.data_provider,
+                on_checkpoint=self._save_checkpoint,
             )
             await self._sync_done(job, result)
 
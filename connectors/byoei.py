@@ -20,41 +20,191 @@ Elasticsearch <== Bulker <== queue <== Fetcher <== generator
 
 """
 import asyncio
-import copy
 import functools
+import gzip
 import time
-from collections import defaultdict
+import zlib
+from collections import defaultdict, deque
 
 from elasticsearch import NotFoundError as ElasticNotFoundError
 from elasticsearch.helpers import async_scan
+from elasticsearch.serializer import JsonSerializer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from connectors.byoc import Filtering
 from connectors.es import ESClient
 from connectors.filtering.basic_rule import BasicRuleEngine, parse
 from connectors.logger import logger
 from connectors.utils import (
+    DEFAULT_ADAPTIVE_BULK,
+    DEFAULT_CHECKPOINT_INTERVAL,
     DEFAULT_CHUNK_MEM_SIZE,
     DEFAULT_CHUNK_SIZE,
+    DEFAULT_COMPRESSION,
+    DEFAULT_COMPRESSION_LEVEL,
     DEFAULT_CONCURRENT_DOWNLOADS,
     DEFAULT_DISPLAY_EVERY,
+    DEFAULT_ERROR_BUDGET,
     DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_DEAD_LETTERS,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_MIN_CHUNK_MEM_SIZE,
+    DEFAULT_MIN_CONCURRENCY,
     DEFAULT_QUEUE_MEM_SIZE,
     DEFAULT_QUEUE_SIZE,
+    DEFAULT_RETRY_INTERVAL,
+    DEFAULT_TARGET_BULK_LATENCY,
     ConcurrentTasks,
     MemQueue,
-    get_size,
+    estimate_size,
     iso_utc,
 )
 
 OP_INDEX = "index"
 OP_UPSERT = "update"
 OP_DELETE = "delete"
+OP_CHECKPOINT = "checkpoint"
 TIMESTAMP_FIELD = "_timestamp"
+CONTENT_HASH_FIELD = "_content_hash"
+# statuses of the bulk items that can succeed when sent again
+RETRY_STATUSES = (429, 503)
+GZIP = "gzip"
+DEFLATE = "deflate"
+COMPRESSIONS = (GZIP, DEFLATE)
+
+
+_json_serializer = JsonSerializer()
 
 
 def get_mb_size(ob):
     """Returns the size of ob in MiB"""
-    return round(get_size(ob) / (1024 * 1024), 2)
+    return round(estimate_size(ob) / (1024 * 1024), 2)
+
+
+def encode_ndjson(lines):
+    """Encodes the lines of a bulk operation as NDJSON, with orjson when it's installed.
+
+    Values JSON doesn't support are encoded like the Elasticsearch client does.
+    """
+    if orjson is not None:
+        return b"".join(
+            orjson.dumps(
+                line,
+                default=_json_serializer.default,
+                option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS,
+            )
+            for line in lines
+        )
+    return b"".join(_json_serializer.dumps(line) + b"\n" for line in lines)
+
+
+def compress(body, compression, level=DEFAULT_COMPRESSION_LEVEL):
+    """Compresses a request body for the given `Content-Encoding`.
+
+    Args:
+        body (bytes): Body of the request
+        compression (str): `gzip` or `deflate`
+        level (int): Compression level, from 1 (fastest) to 9 (smallest)
+
+    Returns:
+        bytes: Compressed body
+    """
+    if compression == GZIP:
+        return gzip.compress(body, compresslevel=level)
+    if compression == DEFLATE:
+        # the deflate content coding of HTTP is the zlib format
+        return zlib.compress(body, level)
+    raise ValueError(
+        f"Unsupported compression {compression}, use one of {COMPRESSIONS}"
+    )
+
+
+class ErrorBudgetExceeded(Exception):
+    pass
+
+
+class BulkController:
+    """Tunes the size of the bulk requests and how many are sent at once.
+
+    It follows an additive increase, multiplicative decrease scheme, from the
+    responses of the bulk requests:
+    - 429 rejections halve both the size and the concurrency
+    - a `took` longer than `target_latency` halves the size, the cluster
+      spends too long on each request
+    - a request waiting longer than `target_latency` besides its `took`
+      halves the concurrency, too many requests are queued
+    - otherwise the size grows by `min_chunk_mem_size`, and the concurrency
+      by one every `concurrency` responses
+
+    Both stay within their min and max limits, and start at their max.
+    """
+
+    def __init__(
+        self,
+        max_chunk_mem_size,
+        max_concurrency,
+        min_chunk_mem_size=DEFAULT_MIN_CHUNK_MEM_SIZE,
+        min_concurrency=DEFAULT_MIN_CONCURRENCY,
+        target_latency=DEFAULT_TARGET_BULK_LATENCY,
+    ):
+        self.max_chunk_mem_size = max_chunk_mem_size * 1024 * 1024
+        self.min_chunk_mem_size = min(
+            min_chunk_mem_size * 1024 * 1024, self.max_chunk_mem_size
+        )
+        # without a request in flight, nothing would ever be sent again
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.target_latency = target_latency
+        self.chunk_mem_size = self.max_chunk_mem_size
+        self.concurrency = self.max_concurrency
+        self._successes = 0
+
+    def update(self, elapsed, took=None, rejected=0):
+        """Adapts the size and the concurrency to the response of a bulk request.
+
+        Args:
+            elapsed (float): Seconds the request took to come back
+            took (int): Milliseconds Elasticsearch spent on the request, when reported
+            rejected (int): Number of operations rejected with a 429 status
+        """
+        took = elapsed if took is None else took / 1000
+        chunk_mem_size, concurrency = self.chunk_mem_size, self.concurrency
+        if rejected > 0:
+            reason = f"{rejected} rejected operations"
+            chunk_mem_size //= 2
+            concurrency //= 2
+        elif took > self.target_latency:
+            reason = f"took {took:.2f}s"
+            chunk_mem_size //= 2
+        elif elapsed - took > self.target_latency:
+            reason = f"waited {elapsed - took:.2f}s"
+            concurrency //= 2
+        else:
+            reason = None
+            chunk_mem_size += self.min_chunk_mem_size
+            self._successes += 1
+            if self._successes >= self.concurrency:
+                concurrency += 1
+                self._successes = 0
+
+        chunk_mem_size = max(
+            self.min_chunk_mem_size, min(self.max_chunk_mem_size, chunk_mem_size)
+        )
+        concurrency = max(self.min_concurrency, min(self.max_concurrency, concurrency))
+        if reason is not None:
+            self._successes = 0
+            logger.info(
+                f"Bulk request {reason}, decreasing to {round(chunk_mem_size / (1024 * 1024), 2)}MiB per request and {concurrency} concurrent requests"
+            )
+        elif (chunk_mem_size, concurrency) != (self.chunk_mem_size, self.concurrency):
+            logger.debug(
+                f"Increasing to {round(chunk_mem_size / (1024 * 1024), 2)}MiB per request and {concurrency} concurrent requests"
+            )
+        self.chunk_mem_size, self.concurrency = chunk_mem_size, concurrency
 
 
 class Bulker:
@@ -63,13 +213,33 @@ class Bulker:
     This class runs a coroutine that gets operations out of a `queue` and collects them to
     build and send bulk requests using a `client`
 
+    Each bulk request is encoded as NDJSON while the operations are collected,
+    and sent as is.
+
     The bulk requests are controlled in several ways:
     - `chunk_size` -- a maximum number of operations to send per request
-    - `chunk_mem_size` -- a maximum size in MiB for each bulk request
+    - `chunk_mem_size` -- a maximum size in MiB of the body of each bulk request
     - `max_concurrency` -- a maximum number of concurrent bulk requests
 
+    Operations rejected with a 429 or 503 status are sent again in a smaller
+    bulk request, up to `max_retries` times with an exponential backoff. The
+    ones that still fail are dropped and kept in `dead_letters`, along with
+    the reason of their failure, until more than `error_budget` operations
+    were dropped, which fails the sync.
+
     Extra options:
     - `pipeline_settings` -- ingest pipeline settings to pass to the bulk API
+    - `on_checkpoint` -- coroutine called with each checkpoint of the queue, once
+      the operations queued before it were sent
+    - `max_retries` -- how many times a rejected operation is sent again
+    - `retry_interval` -- base of the exponential backoff, in seconds
+    - `error_budget` -- how many operations can be dropped before failing
+    - `max_dead_letters` -- how many dropped operations are kept
+    - `controller` -- `BulkController` changing the size and the concurrency of
+      the requests as they are sent
+    - `compression` -- `gzip` or `deflate` to compress the bodies of the requests,
+      in a thread so that it doesn't block the event loop
+    - `compression_level` -- compression level, from 1 (fastest) to 9 (smallest)
     """
 
     def __init__(
@@ -80,7 +250,19 @@ class Bulker:
         pipeline_settings,
         chunk_mem_size,
         max_concurrency,
+        on_checkpoint=None,
+        max_retries=DEFAULT_MAX_RETRIES,
+        retry_interval=DEFAULT_RETRY_INTERVAL,
+        error_budget=DEFAULT_ERROR_BUDGET,
+        max_dead_letters=DEFAULT_MAX_DEAD_LETTERS,
+        controller=None,
+        compression=DEFAULT_COMPRESSION,
+        compression_level=DEFAULT_COMPRESSION_LEVEL,
     ):
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Unsupported compression {compression}, use one of {COMPRESSIONS}"
+            )
         self.client = client
         self.queue = queue
         self.bulk_time = 0
@@ -91,6 +273,17 @@ class Bulker:
         self.chunk_mem_size = chunk_mem_size * 1024 * 1024
         self.max_concurrent_bulks = max_concurrency
         self.bulk_tasks = ConcurrentTasks(max_concurrency=max_concurrency)
+        self.on_checkpoint = on_checkpoint
+        self.max_retries = max_retries
+        self.retry_interval = retry_interval
+        self.error_budget = error_budget
+        self.retried = 0
+        self.dropped = 0
+        self.dead_letters = deque(maxlen=max_dead_letters)
+        self.controller = controller
+        self.compression = compression
+        self.compression_level = compression_level
+        self.bytes_sent = 0
 
     def _bulk_op(self, doc, operation=OP_INDEX):
         doc_id = doc["_id"]
@@ -108,60 +301,167 @@ class Bulker:
 
         raise TypeError(operation)
 
-    async def _batch_bulk(self, operations):
-        # todo treat result to retry errors like in async_streaming_bulk
-        task_num = len(self.bulk_tasks)
-
-        logger.debug(
-            f"Task {task_num} - Sending a batch of {len(operations)} ops -- {get_mb_size(operations)}MiB"
+    def _drop(self, op, data):
+        """Keeps a failed operation in the dead letters, and fails once over the error budget."""
+        logger.error(f"operation {op} failed, {data['error']}")
+        self.dropped += 1
+        self.dead_letters.append(
+            {
+                "op": op,
+                "_id": data.get("_id"),
+                "status": data.get("status"),
+                "error": data["error"],
+            }
         )
-        start = time.time()
-        try:
-            res = await self.client.bulk(
+        if self.dropped > self.error_budget:
+            raise ErrorBudgetExceeded(
+                f"{self.dropped} operations failed, over the error budget of {self.error_budget}. Last error: {data['error'].get('reason')}"
+            )
+
+    async def _send(self, operations):
+        """Sends the body of a bulk request, compressed when enabled.
+
+        The Elasticsearch client can't send bodies it didn't encode itself as
+        NDJSON, so compressed ones go through `perform_request` as JSON, which
+        the bulk API accepts as well.
+        """
+        if self.compression is None:
+            self.bytes_sent += len(operations)
+            return await self.client.bulk(
                 operations=operations, pipeline=self.pipeline_settings.name
             )
 
+        body = await asyncio.get_running_loop().run_in_executor(
+            None, compress, operations, self.compression, self.compression_level
+        )
+        self.bytes_sent += len(body)
+        params = {}
+        if self.pipeline_settings.name:
+            params["pipeline"] = self.pipeline_settings.name
+        return await self.client.perform_request(
+            "PUT",
+            "/_bulk",
+            params=params,
+            headers={
+                "accept": "application/json",
+                "content-type": "application/json",
+                "content-encoding": self.compression,
+            },
+            body=body,
+        )
+
+    async def _batch_bulk(self, operations, offsets):
+        """Sends a bulk request, and again the operations rejected because of the load.
+
+        Args:
+            operations (bytes): NDJSON body of the request
+            offsets (list): Position of each operation in the body
+        """
+        task_num = len(self.bulk_tasks)
+
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                await asyncio.sleep(self.retry_interval**attempt)
+            logger.debug(
+                f"Task {task_num} - Sending a batch of {len(offsets)} ops -- {round(len(operations) / (1024 * 1024), 2)}MiB"
+            )
+            start = time.time()
+            try:
+                res = await self._send(operations)
+            finally:
+                elapsed = time.time() - start
+                self.bulk_time += elapsed
+
+            failed = []
             if res.get("errors"):
-                for item in res["items"]:
-                    for op, data in item.items():
-                        if "error" in data:
-                            logger.error(f"operation {op} failed, {data['error']}")
-                            raise Exception(data["error"]["reason"])
-        finally:
-            self.bulk_time += time.time() - start
+                failed = [
+                    (position, op, data)
+                    for position, item in enumerate(res["items"])
+                    for op, data in item.items()
+                    if "error" in data
+                ]
+            if self.controller is not None:
+                self.controller.update(
+                    elapsed=elapsed,
+                    took=res.get("took"),
+                    rejected=sum(
+                        1 for _, _, data in failed if data.get("status") == 429
+                    ),
+                )
+                self.chunk_mem_size = self.controller.chunk_mem_size
+                self.bulk_tasks.max_concurrency = self.controller.concurrency
+
+            rejected = []
+            for position, op, data in failed:
+                if data.get("status") in RETRY_STATUSES and attempt < self.max_retries:
+                    rejected.append(position)
+                else:
+                    self._drop(op, data)
+            if not rejected:
+                return res
+
+            logger.warning(
+                f"Task {task_num} - {len(rejected)} ops were rejected, sending them again"
+            )
+            self.retried += len(rejected)
+            bounds = offsets + [len(operations)]
+            retried_operations = bytearray()
+            retried_offsets = []
+            for position in rejected:
+                retried_offsets.append(len(retried_operations))
+                begin, end = bounds[position], bounds[position + 1]
+                retried_operations += operations[begin:end]
+            operations, offsets = bytes(retried_operations), retried_offsets
 
         return res
 
     async def run(self):
-        batch = []
+        # NDJSON body of the next bulk request, its number of lines and the
+        # position of each operation in it
+        batch = bytearray()
+        lines = 0
+        offsets = []
         self.bulk_time = 0
         self.bulking = True
-        bulk_size = 0
 
         while True:
-            doc_size, doc = await self.queue.get()
+            _, doc = await self.queue.get()
             if doc in ("END_DOCS", "FETCH_ERROR"):
                 break
             operation = doc["_op_type"]
+            if operation == OP_CHECKPOINT:
+                if lines > 0:
+                    await self.bulk_tasks.put(
+                        functools.partial(self._batch_bulk, bytes(batch), offsets)
+                    )
+                    batch.clear()
+                    lines = 0
+                    offsets = []
+                # raises if one of the bulk requests failed, even one that finished before
+                await self.bulk_tasks.join()
+                if self.on_checkpoint is not None:
+                    await self.on_checkpoint(doc["checkpoint"])
+                continue
+
             self.ops[operation] += 1
-            batch.extend(self._bulk_op(doc, operation))
+            operation_lines = self._bulk_op(doc, operation)
+            offsets.append(len(batch))
+            batch += encode_ndjson(operation_lines)
+            lines += len(operation_lines)
 
-            bulk_size += doc_size
-            if len(batch) >= self.chunk_size or bulk_size > self.chunk_mem_size:
+            if lines >= self.chunk_size or len(batch) > self.chunk_mem_size:
                 await self.bulk_tasks.put(
-                    functools.partial(
-                        self._batch_bulk,
-                        copy.copy(batch),
-                    )
+                    functools.partial(self._batch_bulk, bytes(batch), offsets)
                 )
                 batch.clear()
-                bulk_size = 0
+                lines = 0
+                offsets = []
 
             await asyncio.sleep(0)
 
         await self.bulk_tasks.join()
-        if len(batch) > 0:
-            await self._batch_bulk(batch)
+        if lines > 0:
+            await self._batch_bulk(bytes(batch), offsets)
 
 
 class Fetcher:
@@ -182,6 +482,8 @@ class Fetcher:
         queue_size=DEFAULT_QUEUE_SIZE,
         display_every=DEFAULT_DISPLAY_EVERY,
         concurrent_downloads=DEFAULT_CONCURRENT_DOWNLOADS,
+        data_provider=None,
+        checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL,
     ):
         self.client = client
         self.queue = queue
@@ -204,6 +506,9 @@ class Fetcher:
         )
         self.display_every = display_every
         self.concurrent_downloads = concurrent_downloads
+        self.data_provider = data_provider
+        self.checkpoint_interval = checkpoint_interval
+        self.last_checkpoint = time.monotonic()
 
     def __str__(self):
         return (
@@ -234,6 +539,86 @@ class Fetcher:
             }
         )
 
+    async def _checkpoint(self, lazy_downloads):
+        """Queues the checkpoint of the data provider, after the documents yielded before it."""
+        self.last_checkpoint = time.monotonic()
+        checkpoint = self.data_provider.sync_checkpoint()
+        if checkpoint is None:
+            return
+        await lazy_downloads.join()
+        await self.queue.put({"_op_type": OP_CHECKPOINT, "checkpoint": checkpoint})
+
+    async def _fetch_doc(self, doc, lazy_download, lazy_downloads):
+        doc_id = doc["id"] = doc.pop("_id")
+
+        if doc.get("_op_type") == OP_DELETE:
+            # the backend reports a deletion, e.g. from a change log
+            self.existing_ids.pop(doc_id, None)
+            await self.queue.put(
+                {
+                    "_op_type": OP_DELETE,
+                    "_index": self.index,
+                    "_id": doc_id,
+                }
+            )
+            self.total_docs_deleted += 1
+            return
+
+        if self.basic_rule_engine and not self.basic_rule_engine.should_ingest(doc):
+            return
+
+        if doc_id in self.existing_ids:
+            # pop out of self.existing_ids
+            ts, content_hash = self.existing_ids.pop(doc_id)
+
+            # If the doc has a content hash or a timestamp, we can use it
+            # to see if it has been modified. This reduces the bulk size
+            # a *lot*
+            #
+            # The content hash wins over the timestamp when the backend
+            # provides one, since a timestamp can change while the content
+            # stays the same.
+            #
+            # Some backends do not know how to do this, so it's optional.
+            # For these, we update the docs in any case.
+            if CONTENT_HASH_FIELD in doc:
+                unchanged = content_hash == doc[CONTENT_HASH_FIELD]
+            else:
+                unchanged = TIMESTAMP_FIELD in doc and ts == doc[TIMESTAMP_FIELD]
+            if unchanged:
+                # cancel the download
+                if lazy_download is not None:
+                    await lazy_download(doit=False)
+                return
+
+            # the doc exists, but we are still overwriting it with `index`
+            operation = OP_INDEX
+            self.total_docs_updated += 1
+        else:
+            operation = OP_INDEX
+            self.total_docs_created += 1
+            if TIMESTAMP_FIELD not in doc:
+                doc[TIMESTAMP_FIELD] = iso_utc()
+
+        # if we need to call lazy_download we push it in lazy_downloads
+        if lazy_download is not None:
+            await lazy_downloads.put(
+                functools.partial(
+                    self._deferred_index, lazy_download, doc_id, doc, operation
+                )
+            )
+
+        else:
+            # we can push into the queue right away
+            await self.queue.put(
+                {
+                    "_op_type": operation,
+                    "_index": self.index,
+                    "_id": doc_id,
+                    "doc": doc,
+                }
+            )
+
     async def get_docs(self, generator):
         logger.info("Starting doc lookups")
         self.sync_runs = True
@@ -246,55 +631,15 @@ class Fetcher:
                 if count % self.display_every == 0:
                     logger.info(str(self))
 
-                doc_id = doc["id"] = doc.pop("_id")
+                await self._fetch_doc(doc, lazy_download, lazy_downloads)
 
-                if self.basic_rule_engine and not self.basic_rule_engine.should_ingest(
-                    doc
+                if (
+                    self.data_provider is not None
+                    and self.checkpoint_interval
+                    and time.monotonic() - self.last_checkpoint
+                    >= self.checkpoint_interval
                 ):
-                    continue
-
-                if doc_id in self.existing_ids:
-                    # pop out of self.existing_ids
-                    ts = self.existing_ids.pop(doc_id)
-
-                    # If the doc has a timestamp, we can use it to see if it has
-                    # been modified. This reduces the bulk size a *lot*
-                    #
-                    # Some backends do not know how to do this, so it's optional.
-                    # For these, we update the docs in any case.
-                    if TIMESTAMP_FIELD in doc and ts == doc[TIMESTAMP_FIELD]:
-                        # cancel the download
-                        if lazy_download is not None:
-                            await lazy_download(doit=False)
-                        continue
-
-                    # the doc exists, but we are still overwriting it with `index`
-                    operation = OP_INDEX
-                    self.total_docs_updated += 1
-                else:
-                    operation = OP_INDEX
-                    self.total_docs_created += 1
-                    if TIMESTAMP_FIELD not in doc:
-                        doc[TIMESTAMP_FIELD] = iso_utc()
-
-                # if we need to call lazy_download we push it in lazy_downloads
-                if lazy_download is not None:
-                    await lazy_downloads.put(
-                        functools.partial(
-                            self._deferred_index, lazy_download, doc_id, doc, operation
-                        )
-                    )
-
-                else:
-                    # we can push into the queue right away
-                    await self.queue.put(
-                        {
-                            "_op_type": operation,
-                            "_index": self.index,
-                            "_id": doc_id,
-                            "doc": doc,
-                        }
-                    )
+                    await self._checkpoint(lazy_downloads)
 
                 await asyncio.sleep(0)
         except Exception as e:
@@ -306,12 +651,24 @@ class Fetcher:
             # wait for all downloads to be finished
             await lazy_downloads.join()
 
+        # documents the backend filtered out itself never reached the engine
+        if self.basic_rule_engine is not None and self.data_provider is not None:
+            for (
+                rule_id,
+                matches_count,
+            ) in self.data_provider.basic_rules_matches().items():
+                self.basic_rule_engine.add_matches(rule_id, matches_count)
+
         # We delete any document that existed in Elasticsearch that was not
         # returned by the backend.
         #
         # Since we popped out every seen doc, existing_ids has now the ids to delete
         logger.debug(f"Delete {len(self.existing_ids)} docs from Elasticsearch")
         for doc_id in self.existing_ids.keys():
+            if self.data_provider is not None and not self.data_provider.should_delete(
+                doc_id
+            ):
+                continue
             await self.queue.put(
                 {
                     "_op_type": OP_DELETE,
@@ -384,7 +741,7 @@ class ElasticServer(ESClient):
             raise IndexMissing(f"Index {index} does not exist!")
 
     async def get_existing_ids(self, index):
-        """Returns an iterator on the `id` and `_timestamp` fields of all documents in an index.
+        """Returns an iterator on the `id`, `_timestamp` and `_content_hash` fields of all documents in an index.
 
 
         WARNING
@@ -403,11 +760,12 @@ class ElasticServer(ESClient):
         async for doc in async_scan(
             client=self.client,
             index=index,
-            _source=["id", TIMESTAMP_FIELD],
+            _source=["id", TIMESTAMP_FIELD, CONTENT_HASH_FIELD],
         ):
             doc_id = doc["_source"].get("id", doc["_id"])
             ts = doc["_source"].get(TIMESTAMP_FIELD)
-            yield doc_id, ts
+            content_hash = doc["_source"].get(CONTENT_HASH_FIELD)
+            yield doc_id, ts, content_hash
 
     async def async_bulk(
         self,
@@ -417,6 +775,8 @@ class ElasticServer(ESClient):
         filtering=Filtering(),
         sync_rules_enabled=False,
         options=None,
+        data_provider=None,
+        on_checkpoint=None,
     ):
         if options is None:
             options = {}
@@ -429,10 +789,35 @@ class ElasticServer(ESClient):
         concurrent_downloads = options.get(
             "concurrent_downloads", DEFAULT_CONCURRENT_DOWNLOADS
         )
+        checkpoint_interval = options.get(
+            "checkpoint_interval", DEFAULT_CHECKPOINT_INTERVAL
+        )
+        max_retries = options.get("max_retries", DEFAULT_MAX_RETRIES)
+        retry_interval = options.get("retry_interval", DEFAULT_RETRY_INTERVAL)
+        error_budget = options.get("error_budget", DEFAULT_ERROR_BUDGET)
+        max_dead_letters = options.get("max_dead_letters", DEFAULT_MAX_DEAD_LETTERS)
+        compression = options.get("compression", DEFAULT_COMPRESSION)
+        compression_level = options.get("compression_level", DEFAULT_COMPRESSION_LEVEL)
+        controller = None
+        if options.get("adaptive_bulk", DEFAULT_ADAPTIVE_BULK):
+            controller = BulkController(
+                max_chunk_mem_size=chunk_mem_size,
+                max_concurrency=max_concurrency,
+                min_chunk_mem_size=options.get(
+                    "min_chunk_mem_size", DEFAULT_MIN_CHUNK_MEM_SIZE
+                ),
+                min_concurrency=options.get("min_concurrency", DEFAULT_MIN_CONCURRENCY),
+                target_latency=options.get(
+                    "target_bulk_latency", DEFAULT_TARGET_BULK_LATENCY
+                ),
+            )
 
         start = time.time()
         stream = MemQueue(maxsize=queue_size, maxmemsize=queue_mem_size * 1024 * 1024)
-        existing_ids = {k: v async for (k, v) in self.get_existing_ids(index)}
+        existing_ids = {
+            k: (ts, content_hash)
+            async for (k, ts, content_hash) in self.get_existing_ids(index)
+        }
         logger.debug(
             f"Found {len(existing_ids)} docs in {index} (duration "
             f"{int(time.time() - start)} seconds) "
@@ -450,6 +835,8 @@ class ElasticServer(ESClient):
             queue_size=queue_size,
             display_every=display_every,
             concurrent_downloads=concurrent_downloads,
+            data_provider=data_provider,
+            checkpoint_interval=checkpoint_interval,
         )
         fetcher_task = asyncio.create_task(fetcher.run(generator))
 
@@ -461,6 +848,14 @@ class ElasticServer(ESClient):
             pipeline,
             chunk_mem_size=chunk_mem_size,
             max_concurrency=max_concurrency,
+            on_checkpoint=on_checkpoint,
+            max_retries=max_retries,
+            retry_interval=retry_interval,
+            error_budget=error_budget,
+            max_dead_letters=max_dead_letters,
+            controller=controller,
+            compression=compression,
+            compression_level=compression_level,
         )
         bulker_task = asyncio.create_task(bulker.run())
 
@@ -473,5 +868,8 @@ class ElasticServer(ESClient):
             "attachment_extracted": fetcher.total_downloads,
             "doc_updated": fetcher.total_docs_updated,
             "doc_deleted": fetcher.total_docs_deleted,
+            "doc_retried": bulker.retried,
+            "doc_dropped": bulker.dropped,
+            "dead_letters": list(bulker.dead_letters),
             "fetch_error": fetcher.fetch_error,
         }
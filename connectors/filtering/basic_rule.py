@@ -141,6 +141,15 @@ class BasicRuleEngine:
         self.rules_match_stats[BasicRule.DEFAULT_RULE_ID] += 1
         return True
 
+    def add_matches(self, rule_id, matches_count):
+        """Counts documents a rule matched outside of the engine, e.g. in the backend."""
+        rule = next((rule for rule in self.rules if rule and rule.id_ == rule_id), None)
+        if rule is None:
+            return
+
+        self.rules_match_stats.setdefault(rule.id_, RuleMatchStats(rule.policy, 0))
+        self.rules_match_stats[rule.id_] += matches_count
+
 
 class InvalidRuleError(ValueError):
     pass
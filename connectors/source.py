@@ -104,13 +104,105 @@ class DataSourceConfiguration:
         return len(self._config) == 0
 
 
+# values of these exact types are already serializable in JSON
+JSON_NATIVE_TYPES = (str, int, float, bool, type(None))
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _decode(value):
+    return value.decode(errors="ignore")
+
+
+class SerializerRegistry:
+    """Serializers of document values, looked up by the type of each value.
+
+    A value is serialized by the serializer registered for its exact type, or
+    else for the closest of its base classes. The lookup is cached per type.
+    Lists, tuples and dicts are serialized item by item, and values with no
+    serializer are kept as they are.
+    """
+
+    def __init__(self, serializers=None):
+        """
+        Args:
+            serializers (dict): Callables turning a value into a serializable one, by type
+        """
+        self.serializers = dict(serializers or {})
+        self._lookups = {}
+
+    def register(self, value_type, serializer):
+        """Registers the serializer of a type, and of its subclasses."""
+        self.serializers[value_type] = serializer
+        self._lookups = {}
+
+    def copy(self):
+        """Returns a registry with the same serializers, to register more without changing this one."""
+        return SerializerRegistry(self.serializers)
+
+    def _lookup(self, value_type):
+        for base in value_type.__mro__:
+            if base in self.serializers:
+                return self.serializers[base]
+        if issubclass(value_type, (list, tuple)):
+            return self._serialize_sequence
+        if issubclass(value_type, dict):
+            return self._serialize_mapping
+        return None
+
+    def _serialize_sequence(self, value):
+        return [self.serialize_value(item) for item in value]
+
+    def _serialize_mapping(self, value):
+        for key, svalue in value.items():
+            value[key] = self.serialize_value(svalue)
+        return value
+
+    def serialize_value(self, value):
+        """Serialize input value with respect to its datatype.
+
+        Args:
+            value (Any Datatype): Value to be serialized
+
+        Returns:
+            value (Any Datatype): Serialized version of input value.
+        """
+        value_type = type(value)
+        if value_type in JSON_NATIVE_TYPES:
+            return value
+        try:
+            serializer = self._lookups[value_type]
+        except KeyError:
+            serializer = self._lookups[value_type] = self._lookup(value_type)
+        if serializer is None:
+            return value
+        return serializer(value)
+
+
+DEFAULT_SERIALIZERS = {
+    datetime: _isoformat,
+    date: _isoformat,
+    Decimal128: Decimal128.to_decimal,
+    bytes: _decode,
+    bytearray: _decode,
+    Decimal: float,
+}
+
+
 class BaseDataSource:
     """Base class, defines a loose contract."""
 
+    # sources serializing more types register them on a copy, e.g.
+    # `serializers = BaseDataSource.serializers.copy()`
+    serializers = SerializerRegistry(DEFAULT_SERIALIZERS)
+
     def __init__(self, configuration):
         self.configuration = configuration
         assert isinstance(self.configuration, DataSourceConfiguration)
         self.configuration.set_defaults(self.get_default_configuration())
+        self._sync_cursor = None
 
     def __str__(self):
         return f"Datasource `{self.__class__.__doc__}`"
@@ -175,6 +267,69 @@ class BaseDataSource:
         """
         return True
 
+    def sync_cursor(self):
+        """Returns the state to carry over to the next sync.
+
+        It's stored in the connector document after a successful sync and
+        given back through `set_sync_cursor` before the next one.
+        It needs to be serializable in JSON.
+        """
+        return self._sync_cursor
+
+    def set_sync_cursor(self, sync_cursor):
+        """Receives the sync cursor of the last successful sync, or None."""
+        self._sync_cursor = sync_cursor
+
+    def sync_checkpoint(self):
+        """Returns where `get_docs` would resume from if the sync stopped after
+        the last document it yielded, or None when it can't resume.
+
+        It's called by the fetcher from time to time. Once the documents yielded
+        before it are indexed, it's stored in the connector document and given
+        back through `set_sync_checkpoint` when the sync runs again after a
+        failure. It needs to be serializable in JSON.
+        """
+        return None
+
+    def set_sync_checkpoint(self, checkpoint):
+        """Receives the checkpoint of the last sync when it did not complete, or None.
+
+        Sources resuming from it don't return the documents read before it
+        again, so they have to keep them through `should_delete`.
+        """
+        pass
+
+    def set_filtering(self, filtering):
+        """Receives the filtering the next sync applies, before `changed` is called.
+
+        Sources skipping idle syncs have to run the sync when it changed.
+        """
+        pass
+
+    def sync_stats(self):
+        """Returns statistics about the last call to `get_docs`.
+
+        They are logged when the sync is done. It needs to be serializable
+        in JSON.
+        """
+        return {}
+
+    def basic_rules_matches(self):
+        """Returns how many documents each basic rule matched in the backend.
+
+        Sources applying basic rules in their queries report the documents
+        they did not return, by rule id, so the rule match stats stay correct.
+        """
+        return {}
+
+    def should_delete(self, doc_id):
+        """Called for each document of the index that was not returned by `get_docs`.
+
+        Returning False keeps it in the index, e.g. when it was not fetched
+        because the backend knows it did not change.
+        """
+        return True
+
     async def ping(self):
         """When called, pings the backend
 
@@ -199,6 +354,9 @@ class BaseDataSource:
         The mapping should have least an `id` field
         and optionally a `timestamp` field in ISO 8601 UTC
 
+        A mapping with an `_op_type` field set to `delete` removes the
+        document with that id from the index instead.
+
         The coroutine is called if the document needs to be synced
         and has attachments. It needs to return a mapping to index.
 
@@ -225,6 +383,17 @@ class BaseDataSource:
         """
         pass
 
+    def serialize_value(self, value):
+        """Serialize input value with respect to its datatype.
+
+        Args:
+            value (Any Datatype): Value to be serialized
+
+        Returns:
+            value (Any Datatype): Serialized version of input value.
+        """
+        return self.serializers.serialize_value(value)
+
     def serialize(self, doc):
         """Reads each element from the document and serializes it with respect to its datatype.
 
@@ -234,33 +403,9 @@ class BaseDataSource:
         Returns:
             doc (Dict): Serialized version of dictionary
         """
-
-        def _serialize(value):
-            """Serialize input value with respect to its datatype.
-            Args:
-                value (Any Datatype): Value to be serialized
-
-            Returns:
-                value (Any Datatype): Serialized version of input value.
-            """
-
-            if isinstance(value, (list, tuple)):
-                value = [_serialize(item) for item in value]
-            elif isinstance(value, dict):
-                for key, svalue in value.items():
-                    value[key] = _serialize(svalue)
-            elif isinstance(value, (datetime, date)):
-                value = value.isoformat()
-            elif isinstance(value, Decimal128):
-                value = value.to_decimal()
-            elif isinstance(value, (bytes, bytearray)):
-                value = value.decode(errors="ignore")
-            elif isinstance(value, Decimal):
-                value = float(value)
-            return value
-
+        serialize_value = self.serializers.serialize_value
         for key, value in doc.items():
-            doc[key] = _serialize(value)
+            doc[key] = serialize_value(value)
 
         return doc
 
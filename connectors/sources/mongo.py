@@ -3,9 +3,7 @@
 # or more contributor license agreements. Licensed under the Elastic License 2.0;
 # you may not use this file except in compliance with the Elastic License 2.0.
 #
-from datetime import datetime
-
-from bson import Decimal128, ObjectId
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
 
 from connectors.logger import logger
@@ -15,6 +13,9 @@ from connectors.source import BaseDataSource
 class MongoDataSource(BaseDataSource):
     """MongoDB"""
 
+    serializers = BaseDataSource.serializers.copy()
+    serializers.register(ObjectId, str)
+
     def __init__(self, configuration):
         super().__init__(configuration=configuration)
         self.client = AsyncIOMotorClient(
@@ -48,27 +49,6 @@ class MongoDataSource(BaseDataSource):
     async def ping(self):
         await self.client.admin.command("ping")
 
-    # XXX That's a lot of work...
-    def serialize(self, doc):
-        def _serialize(value):
-            if isinstance(value, ObjectId):
-                value = str(value)
-            if isinstance(value, (list, tuple)):
-                value = [_serialize(item) for item in value]
-            elif isinstance(value, dict):
-                for key, svalue in value.items():
-                    value[key] = _serialize(svalue)
-            elif isinstance(value, datetime):
-                value = value.isoformat()
-            elif isinstance(value, Decimal128):
-                value = value.to_decimal()
-            return value
-
-        for key, value in doc.items():
-            doc[key] = _serialize(value)
-
-        return doc
-
     async def get_docs(self, filtering=None):
         logger.debug("Grabbing collection info")
         collection = self.db[self.configuration["collection"]]
@@ -5,28 +5,188 @@
 #
 """MySQL source module responsible to fetch documents from MySQL"""
 import asyncio
+import base64
+import functools
+import hashlib
+import json
 import ssl
+import time
+import zlib
 from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
 
 import aiomysql
+from pymysql.constants import FIELD_TYPE
+from pymysql.converters import through
+from pymysqlreplication import BinLogStreamReader
+from pymysqlreplication.event import GtidEvent, QueryEvent, XidEvent
+from pymysqlreplication.gtid import Gtid, GtidSet
+from pymysqlreplication.row_event import (
+    DeleteRowsEvent,
+    UpdateRowsEvent,
+    WriteRowsEvent,
+)
 
+from connectors.byoei import CONTENT_HASH_FIELD, TIMESTAMP_FIELD
+from connectors.filtering.basic_rule import Rule, parse
 from connectors.filtering.validation import (
     AdvancedRulesValidator,
     SyncRuleValidationResult,
 )
 from connectors.logger import logger
 from connectors.source import BaseDataSource
-from connectors.utils import RetryStrategy, retryable
+from connectors.utils import RetryStrategy, merge_generators, retryable
 
 MAX_POOL_SIZE = 10
 QUERIES = {
     "ALL_DATABASE": "SHOW DATABASES",
     "ALL_TABLE": "SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = '{database}'",
-    "TABLE_DATA": "SELECT * FROM {database}.{table}",
+    "TABLE_DATA": "SELECT {columns} FROM {database}.{table}",
+    "TABLE_DATA_SINCE": "SELECT {columns} FROM {database}.{table} WHERE {column} >= %s",
+    "TABLE_DATA_PAGE": "SELECT {columns} FROM {database}.{table}{where} ORDER BY {order_by} LIMIT {limit}",
+    "TABLE_COLUMNS": "SELECT {columns} FROM {database}.{table} LIMIT 0",
+    "TABLE_COLUMN_TYPES": "SELECT COLUMN_NAME, DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = '{database}' AND TABLE_NAME = '{table}'",
+    "TABLE_ROW": "SELECT {columns} FROM {database}.{table} WHERE {where}",
+    "TABLE_DATA_WHERE": "SELECT {columns} FROM {database}.{table} WHERE {where}",
+    "DATABASES_TABLES": "SELECT TABLE_SCHEMA, TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA IN ({databases})",
+    "DATABASES_STATE": "SELECT COUNT(*), MAX(UPDATE_TIME), MAX(CREATE_TIME), @@GLOBAL.gtid_executed FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA IN ({databases})",
+    "TABLE_MATCHES": "SELECT {rule}, COUNT(*) FROM {database}.{table} WHERE {where} GROUP BY 1",
+    "TABLE_KEY_RANGE": "SELECT MIN({key}), MAX({key}) FROM {database}.{table}",
+    "TABLE_KEY_AT_OFFSET": "SELECT {keys} FROM {database}.{table} ORDER BY {keys} LIMIT 1 OFFSET {offset}",
+    "TABLE_ROW_COUNT": "SELECT TABLE_ROWS FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = '{database}' AND TABLE_NAME = '{table}'",
     "TABLE_PRIMARY_KEY": "SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = '{database}' AND TABLE_NAME = '{table}' AND COLUMN_KEY = 'PRI'",
     "TABLE_LAST_UPDATE_TIME": "SELECT UPDATE_TIME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = '{database}' AND TABLE_NAME = '{table}'",
+    "TABLE_COLUMN": "SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = '{database}' AND TABLE_NAME = '{table}' AND COLUMN_NAME = %s",
+    "TABLE_CHECKSUM": "CHECKSUM TABLE {database}.{table}",
+    "BINARY_LOGS": "SHOW BINARY LOGS",
+    "BINARY_LOG_STATUS": "SHOW MASTER STATUS",
+    "REPLICA_STATUS": "SHOW REPLICA STATUS",
+    "SLAVE_STATUS": "SHOW SLAVE STATUS",
+    "GTID_PURGED_IN": "SELECT GTID_SUBSET(@@GLOBAL.gtid_purged, %s)",
+    "DATABASE_TABLES": "SELECT TABLE_NAME, UPDATE_TIME, TABLE_ROWS FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = '{database}'",
+    "STATS_EXPIRY_VARIABLE": "SHOW VARIABLES LIKE 'information_schema_stats_expiry'",
+    "DISABLE_STATS_EXPIRY": "SET SESSION information_schema_stats_expiry = 0",
+    "DATABASE_COLUMNS": "SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_KEY FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = '{database}' ORDER BY TABLE_NAME, ORDINAL_POSITION",
 }
 DEFAULT_FETCH_SIZE = 50
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_KEYSET_PAGINATION = False
+DEFAULT_TABLE_SHARDS = 1
+DEFAULT_CONCURRENT_TABLES = 1
+DEFAULT_MAX_IN_FLIGHT_ROWS = 1000
+DEFAULT_PREFETCH_METADATA = False
+DEFAULT_SKIP_UNCHANGED_TABLES = False
+DEFAULT_INCREMENTAL_COLUMN = ""
+DEFAULT_FULL_SYNC_INTERVAL = 24
+DEFAULT_CONSISTENT_SNAPSHOT = False
+DEFAULT_CDC = False
+DEFAULT_CDC_SERVER_ID = 8500
+DEFAULT_CONTENT_HASH = False
+DEFAULT_ADAPTIVE_FETCH_SIZE = False
+DEFAULT_FETCH_BYTES_TARGET = 1024 * 1024
+MIN_FETCH_SIZE = 1
+MAX_FETCH_SIZE = 10000
+MAX_FETCH_LATENCY = 1  # seconds
+NON_STRING_VALUE_SIZE = 8
+DEFAULT_TRUNCATE_SIZE = 1024 * 1024
+EXCLUDE = "exclude"
+TRUNCATE = "truncate"
+DEFER = "defer"
+COMPRESS = "compress"
+DEFAULT_PUSH_DOWN_BASIC_RULES = False
+DEFAULT_SKIP_IDLE_SYNCS = False
+DEFAULT_RAW_ROWS = False
+DEFAULT_RESUMABLE_SYNCS = False
+DEFAULT_SCHEMA_CACHE_TTL = 30
+DEFAULT_EXPLAIN_ADVANCED_RULES = False
+DEFAULT_POOL_MIN_SIZE = 1
+DEFAULT_POOL_RECYCLE = -1
+DEFAULT_CONNECT_TIMEOUT = 0
+DEFAULT_QUERY_TIMEOUT = 0
+DEFAULT_READ_TIMEOUT = 0
+DEFAULT_REPLICAS = ""
+DEFAULT_REPLICA_ROUTING = "round_robin"
+DEFAULT_MAX_REPLICA_LAG = 60
+# seconds a replication lag is trusted for, before it's checked again
+REPLICA_LAG_CHECK_INTERVAL = 30
+REPLICA_ROUTINGS = ("round_robin", "least_loaded")
+# fields of the documents basic rules can apply to, besides the columns
+DOCUMENT_FIELDS = (
+    "id",
+    TIMESTAMP_FIELD,
+    CONTENT_HASH_FIELD,
+    "_extract_binary_content",
+    "_reduce_whitespace",
+    "_run_ml_inference",
+)
+NUMERIC_TYPES = {
+    "tinyint",
+    "smallint",
+    "mediumint",
+    "int",
+    "bigint",
+    "float",
+    "double",
+    "decimal",
+}
+STRING_TYPES = {
+    "char",
+    "varchar",
+    "tinytext",
+    "text",
+    "mediumtext",
+    "longtext",
+    "enum",
+}
+# data types whose values come back unchanged from UNCOMPRESS(COMPRESS())
+COMPRESSIBLE_TYPES = {
+    "char",
+    "varchar",
+    "tinytext",
+    "text",
+    "mediumtext",
+    "longtext",
+    "binary",
+    "varbinary",
+    "tinyblob",
+    "blob",
+    "mediumblob",
+    "longblob",
+}
+# options changing the documents of the rows, which the documents kept from
+# the last sync don't follow once they changed
+DOCUMENT_OPTIONS = (
+    "excluded_columns",
+    "truncated_columns",
+    "truncate_size",
+    "deferred_columns",
+    "compressed_columns",
+    "content_hash",
+    "raw_rows",
+)
+COLUMN_POLICIES = {
+    "excluded_columns": EXCLUDE,
+    "truncated_columns": TRUNCATE,
+    "deferred_columns": DEFER,
+    "compressed_columns": COMPRESS,
+}
+# values of these field types are read as the text sent by the server, instead
+# of being parsed into Python objects, when reading raw rows
+RAW_DECODERS = {
+    field_type: through
+    for field_type in (
+        FIELD_TYPE.DECIMAL,
+        FIELD_TYPE.NEWDECIMAL,
+        FIELD_TYPE.DATE,
+        FIELD_TYPE.DATETIME,
+        FIELD_TYPE.TIMESTAMP,
+    )
+}
+RAW_DATETIME_TYPES = {"datetime", "timestamp"}
+CONTENT_HASH_DIGEST_SIZE = 16
+BINLOG_BATCH_SIZE = 500
 RETRIES = 3
 RETRY_INTERVAL = 2
 DEFAULT_SSL_DISABLED = True
@@ -37,6 +197,97 @@ def format_list(databases):
     return ", ".join(databases)
 
 
+def quote_identifier(identifier):
+    return f"`{identifier.replace('`', '``')}`"
+
+
+def row_comparison(columns, operator):
+    """Builds a row constructor comparison usable with query parameters.
+
+    Example: `(`a`, `b`) > (%s, %s)` for the columns `a` and `b`.
+    """
+    return f"({', '.join(map(quote_identifier, columns))}) {operator} ({', '.join(['%s'] * len(columns))})"
+
+
+def escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def basic_rule_condition(rule, column, column_type):
+    """Translates a basic rule on a column into a SQL condition, if it can be.
+
+    The condition has to match exactly the rows the rule matches once they are
+    serialized, so only a few cases are translated:
+    - `equals`, `<` and `>` on numeric columns, compared as floats
+    - `equals` and `starts_with` on text columns with an ASCII value,
+      compared byte by byte as Python does
+
+    Args:
+        rule (BasicRule): Rule to translate
+        column (str): Name of the column the rule applies to
+        column_type (str): Data type of the column
+
+    Returns:
+        tuple: Condition and its query parameters, or None
+    """
+    identifier = quote_identifier(column)
+    if column_type in NUMERIC_TYPES and rule.rule in (
+        Rule.EQUALS,
+        Rule.LESS_THAN,
+        Rule.GREATER_THAN,
+    ):
+        try:
+            value = float(rule.value)
+        except (TypeError, ValueError):
+            return None
+        operator = {Rule.EQUALS: "=", Rule.LESS_THAN: "<", Rule.GREATER_THAN: ">"}[
+            rule.rule
+        ]
+        return f"{identifier} {operator} %s", [value]
+
+    if (
+        column_type in STRING_TYPES
+        and isinstance(rule.value, str)
+        and rule.value.isascii()
+    ):
+        if rule.rule == Rule.EQUALS:
+            return (
+                f"{identifier} = %s AND CAST({identifier} AS BINARY) = CAST(%s AS BINARY)",
+                [rule.value, rule.value],
+            )
+        # NULL is serialized to None, whose string starts with these values
+        if rule.rule == Rule.STARTS_WITH and not "None".startswith(rule.value):
+            pattern = f"{escape_like(rule.value)}%"
+            return (
+                f"{identifier} LIKE %s AND CAST({identifier} AS BINARY) LIKE CAST(%s AS BINARY)",
+                [pattern, pattern],
+            )
+    return None
+
+
+def case_expression(conditions, values, default):
+    """Builds a CASE expression returning the value of the first matching condition.
+
+    Args:
+        conditions (list): Conditions and their query parameters, or None for a condition always true
+        values (list): Value of each condition
+        default (str): Value when no condition matches
+
+    Returns:
+        tuple: Expression and its query parameters
+    """
+    branches, args = [], []
+    for condition, value in zip(conditions, values):
+        if condition is None:
+            default = value
+            break
+        branches.append(f"WHEN {condition[0]} THEN {value}")
+        args.extend(condition[1])
+    if not branches:
+        return str(default), args
+    return f"CASE {' '.join(branches)} ELSE {default} END", args
+
+
 class MySQLAdvancedRulesValidator(AdvancedRulesValidator):
     def __init__(self, source):
         self.source = source
@@ -64,9 +315,12 @@ class MySQLAdvancedRulesValidator(AdvancedRulesValidator):
     async def _remote_validation(self, advanced_rules, databases_to_filter):
         await self.source.ping()
 
-        inaccessible_databases = set(
-            await self.source.validate_databases(databases=databases_to_filter)
+        # the tables of all the databases are listed with one query
+        inaccessible_databases, schema = await asyncio.gather(
+            self.source.validate_databases(databases=databases_to_filter),
+            self.source.fetch_schema(databases=list(databases_to_filter)),
         )
+        inaccessible_databases = set(inaccessible_databases)
         inaccessible_databases_to_filter = inaccessible_databases.intersection(
             databases_to_filter
         )
@@ -81,12 +335,7 @@ class MySQLAdvancedRulesValidator(AdvancedRulesValidator):
         database_to_missing_tables = {}
 
         for database in databases_to_filter:
-            tables = set(
-                map(
-                    lambda table: table[0],
-                    await self.source.fetch_tables(database=database),
-                )
-            )
+            tables = set(schema.get(database, []))
             tables_to_filter = set(advanced_rules.get(database, {}).keys())
 
             missing_tables = tables_to_filter - tables
@@ -108,14 +357,773 @@ class MySQLAdvancedRulesValidator(AdvancedRulesValidator):
                 validation_message=f"Tables not found or inaccessible (database -> tables): {missing_tables_str}.",
             )
 
+        if self.source.configuration.get(
+            "explain_advanced_rules", DEFAULT_EXPLAIN_ADVANCED_RULES
+        ):
+            return await self._explain_queries(advanced_rules)
+
+        return SyncRuleValidationResult.valid_result(
+            SyncRuleValidationResult.ADVANCED_RULES
+        )
+
+    async def _explain_queries(self, advanced_rules):
+        """Checks the queries of the advanced rules with EXPLAIN, all at once."""
+        queries = [
+            (database, table, query)
+            for database, tables in sorted(advanced_rules.items())
+            for table, query in sorted(tables.items())
+        ]
+        errors = await asyncio.gather(
+            *(
+                self.source.explain_query(database=database, table=table, query=query)
+                for database, table, query in queries
+            )
+        )
+        invalid_queries = [
+            f"({database} -> {table}: {error})"
+            for (database, table, _), error in zip(queries, errors)
+            if error is not None
+        ]
+
+        if len(invalid_queries) > 0:
+            return SyncRuleValidationResult(
+                SyncRuleValidationResult.ADVANCED_RULES,
+                is_valid=False,
+                validation_message=f"Invalid queries (database -> table: error): {format_list(invalid_queries)}.",
+            )
+
         return SyncRuleValidationResult.valid_result(
             SyncRuleValidationResult.ADVANCED_RULES
         )
 
 
+def content_hash(document):
+    """Returns a digest of the values of a serialized document.
+
+    The `_id` and `_timestamp` fields are left out, so that the digest only
+    changes when the content of the row does.
+
+    Args:
+        document (dict): Serialized document
+
+    Returns:
+        str: Hexadecimal digest
+    """
+    content = {
+        key: value
+        for key, value in document.items()
+        if key not in ("_id", TIMESTAMP_FIELD, CONTENT_HASH_FIELD)
+    }
+    return hashlib.blake2b(
+        json.dumps(content, sort_keys=True, default=str).encode("utf-8"),
+        digest_size=CONTENT_HASH_DIGEST_SIZE,
+    ).hexdigest()
+
+
+def estimate_row_size(row):
+    """Returns a cheap estimate of the size of a row, in bytes.
+
+    Strings and bytes count for their length, any other value for a fixed size.
+    """
+    return sum(
+        len(value)
+        if isinstance(value, (str, bytes, bytearray))
+        else NON_STRING_VALUE_SIZE
+        for value in row
+    )
+
+
+class AdaptiveFetchSize:
+    """Picks how many rows to fetch in each batch of a table.
+
+    The size aims at `bytes_target` bytes per batch, from a moving average of
+    the observed row sizes. It at most doubles from one batch to the next and
+    is halved when a batch takes longer than `MAX_FETCH_LATENCY` to come back.
+    """
+
+    def __init__(self, size, bytes_target):
+        self.size = size
+        self.bytes_target = bytes_target
+        self.bytes_per_row = None
+
+    def update(self, rows, elapsed):
+        """Adapts the size to a fetched batch.
+
+        Args:
+            rows (list): Rows of the batch
+            elapsed (float): Seconds it took to fetch the batch
+
+        Returns:
+            int: Size of the next batch
+        """
+        if not rows:
+            return self.size
+
+        bytes_per_row = sum(estimate_row_size(row) for row in rows) / len(rows)
+        if self.bytes_per_row is None:
+            self.bytes_per_row = bytes_per_row
+        else:
+            self.bytes_per_row = (self.bytes_per_row + bytes_per_row) / 2
+
+        size = min(int(self.bytes_target // max(self.bytes_per_row, 1)), self.size * 2)
+        if elapsed > MAX_FETCH_LATENCY:
+            size = min(size, self.size // 2)
+        self.size = max(MIN_FETCH_SIZE, min(MAX_FETCH_SIZE, size))
+        return self.size
+
+
+def _keep(value):
+    return value
+
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _to_float(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def _decode(value):
+    return (
+        value.decode(errors="ignore")
+        if isinstance(value, (bytes, bytearray))
+        else value
+    )
+
+
+def _raw_decimal(value):
+    return float(value) if isinstance(value, str) else _to_float(value)
+
+
+def _parse_raw_datetime(value):
+    """Parses a DATETIME or TIMESTAMP read as text into the datetime the connection gives.
+
+    The server sends `YYYY-MM-DD hh:mm:ss[.f]`, with as many fractional digits
+    as the precision of the column, which can't be compared with the text of
+    the parsed value directly.
+    """
+    if not isinstance(value, str):
+        return value
+    seconds, _, fraction = value.partition(".")
+    try:
+        parsed = datetime.strptime(seconds, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        # like the connection, invalid dates such as 0000-00-00 are kept as text
+        return value
+    return parsed.replace(microsecond=int(fraction.ljust(6, "0")) if fraction else 0)
+
+
+def _raw_datetime(value):
+    return _isoformat(_parse_raw_datetime(value))
+
+
+def uncompress(value):
+    """Reverses MySQL's COMPRESS(): the length of the value on 4 bytes, then its zlib stream.
+
+    Args:
+        value (bytes): Compressed value
+
+    Returns:
+        bytes: Value before compression
+    """
+    if not value:
+        # COMPRESS('') is ''
+        return value
+    return zlib.decompress(value[4:])
+
+
+# serializers of the values of each MySQL data type, any other type goes through
+# the generic `serialize_value` of the data source
+COLUMN_SERIALIZERS = {
+    "tinyint": _keep,
+    "smallint": _keep,
+    "mediumint": _keep,
+    "int": _keep,
+    "bigint": _keep,
+    "float": _keep,
+    "double": _keep,
+    "year": _keep,
+    "decimal": _to_float,
+    "date": _isoformat,
+    "datetime": _isoformat,
+    "timestamp": _isoformat,
+    "char": _decode,
+    "varchar": _decode,
+    "tinytext": _decode,
+    "text": _decode,
+    "mediumtext": _decode,
+    "longtext": _decode,
+    "enum": _decode,
+    "json": _decode,
+    "binary": _decode,
+    "varbinary": _decode,
+    "tinyblob": _decode,
+    "blob": _decode,
+    "mediumblob": _decode,
+    "longblob": _decode,
+    "bit": _decode,
+}
+# serializers of the data types read as text with `RAW_DECODERS`, giving the
+# same values as the serializers of the parsed ones
+RAW_COLUMN_SERIALIZERS = {
+    **COLUMN_SERIALIZERS,
+    "decimal": _raw_decimal,
+    "datetime": _raw_datetime,
+    "timestamp": _raw_datetime,
+}
+
+
+def _uncompressed(serializer):
+    def _serialize(value):
+        return serializer(uncompress(value))
+
+    return _serialize
+
+
+class RowTransformer:
+    """Turns the rows of a table into documents.
+
+    Everything that only depends on the table is worked out once: the position
+    of the primary key columns and a serializer for each column, picked from
+    its data type when it's known.
+    """
+
+    def __init__(
+        self,
+        database,
+        table,
+        column_names,
+        keys,
+        serialize_value,
+        column_types=None,
+        content_hash=False,
+        raw_values=False,
+        compressed_columns=(),
+    ):
+        """
+        Args:
+            database (str): Name of database
+            table (str): Name of table
+            column_names (list): Prefixed column names, in the order of the rows
+            keys (list): Prefixed primary key columns
+            serialize_value (callable): Generic serializer, for the columns of unknown type
+            column_types (dict): Data type of each column, by unprefixed name
+            content_hash (bool): Whether to add a digest of the values to the documents
+            raw_values (bool): Whether the rows were read with `RAW_DECODERS`
+            compressed_columns (list): Unprefixed names of the columns read with COMPRESS()
+        """
+        self.database = database
+        self.table = table
+        self.column_names = column_names
+        prefix = f"{database}_{table}_"
+        column_types = column_types or {}
+        # the ids are built from the parsed values, whichever way the rows were read
+        self.key_parsers = [
+            (
+                column_names.index(key),
+                _parse_raw_datetime
+                if raw_values
+                and column_types.get(key.removeprefix(prefix)) in RAW_DATETIME_TYPES
+                else _keep,
+            )
+            for key in keys
+            if key in column_names
+        ]
+        serializers = RAW_COLUMN_SERIALIZERS if raw_values else COLUMN_SERIALIZERS
+        self.serializers = []
+        for column_name in column_names:
+            column = column_name.removeprefix(prefix)
+            serializer = serializers.get(column_types.get(column), serialize_value)
+            if column in compressed_columns:
+                serializer = _uncompressed(serializer)
+            self.serializers.append(serializer)
+        self.serialize_value = serialize_value
+        self.prefix = prefix
+        self.content_hash = content_hash
+
+    def __call__(self, row, timestamp):
+        """Returns the document of a row.
+
+        Args:
+            row (tuple): Values of the row, in the order of the column names
+            timestamp (datetime): Last time the row changed
+
+        Returns:
+            Dict: Document to be indexed
+        """
+        document = {
+            column_name: serializer(value)
+            for column_name, serializer, value in zip(
+                self.column_names, self.serializers, row
+            )
+        }
+        keys_value = "".join(
+            f"{parse(row[index])}_"
+            for index, parse in self.key_parsers
+            # keys like 0 are falsy, but still part of the id
+            if row[index] is not None
+        )
+        document["_id"] = f"{self.prefix}{keys_value}"
+        document["_timestamp"] = self.serialize_value(timestamp)
+        document["Database"] = self.database
+        document["Table"] = self.table
+        if self.content_hash:
+            document[CONTENT_HASH_FIELD] = content_hash(document)
+        return document
+
+
+def digest_filtering(filtering):
+    """Returns a digest of the filtering, to tell whether it changed since a sync."""
+    return json.dumps(filtering or {}, sort_keys=True, default=str)
+
+
+def encode_key(values):
+    """Turns the primary key values of a row into a list that can be stored as JSON.
+
+    Values that JSON can't represent exactly are tagged with their type,
+    so `decode_key` gives back the values read from the table.
+    """
+    if values is None:
+        return None
+    encoded = []
+    for value in values:
+        if isinstance(value, Decimal):
+            value = {"decimal": str(value)}
+        elif isinstance(value, (bytes, bytearray)):
+            value = {"bytes": base64.b64encode(value).decode("ascii")}
+        elif isinstance(value, datetime):
+            value = {"datetime": value.isoformat()}
+        elif isinstance(value, date):
+            value = {"date": value.isoformat()}
+        elif isinstance(value, timedelta):
+            value = {"timedelta": [value.days, value.seconds, value.microseconds]}
+        encoded.append(value)
+    return encoded
+
+
+def decode_key(values):
+    """Gives back the primary key values encoded by `encode_key`."""
+    if values is None:
+        return None
+    decoded = []
+    for value in values:
+        if isinstance(value, dict):
+            if "decimal" in value:
+                value = Decimal(value["decimal"])
+            elif "bytes" in value:
+                value = base64.b64decode(value["bytes"])
+            elif "datetime" in value:
+                value = datetime.fromisoformat(value["datetime"])
+            elif "date" in value:
+                value = date.fromisoformat(value["date"])
+            elif "timedelta" in value:
+                value = timedelta(*value["timedelta"])
+        decoded.append(value)
+    return decoded
+
+
+def parse_binlog_status(status):
+    """Turns the result of `SHOW MASTER STATUS` into a binary log checkpoint.
+
+    Raises:
+        Exception: Binary logging is disabled
+    """
+    if not status:
+        raise Exception(
+            "Binary logging is disabled on the MySQL server, it's required to read changes."
+        )
+    log_file, log_pos = status[0][:2]
+    # MariaDB doesn't report GTIDs here
+    gtid_set = status[0][4] if len(status[0]) > 4 else None
+    return {"log_file": log_file, "log_pos": log_pos, "gtid_set": gtid_set or None}
+
+
+@asynccontextmanager
+async def _streaming_cursor(connection, decoders=None):
+    """Opens an unbuffered cursor, converting the values with `decoders` when given.
+
+    Args:
+        connection (aiomysql.Connection): Connection to open the cursor on
+        decoders (dict): Converters of the values by field type, overriding the ones of the connection
+
+    Yields:
+        aiomysql.SSCursor: Cursor
+    """
+    if decoders is None:
+        async with connection.cursor(aiomysql.cursors.SSCursor) as cursor:
+            yield cursor
+        return
+
+    connection_decoders = connection.decoders
+    connection.decoders = {**connection_decoders, **decoders}
+    try:
+        async with connection.cursor(aiomysql.cursors.SSCursor) as cursor:
+            yield cursor
+    finally:
+        connection.decoders = connection_decoders
+
+
+class PoolUsage:
+    """Tracks how busy the connections of a pool get.
+
+    Waiters are the queries waiting for a connection, either because all of
+    them are in use or because a new one is being opened.
+    """
+
+    def __init__(self):
+        self.in_use = 0
+        self.waiters = 0
+        self.peak_in_use = 0
+        self.peak_waiters = 0
+
+    @asynccontextmanager
+    async def acquire(self, pool):
+        """Acquires a connection of the pool, counting the time spent waiting for it.
+
+        Args:
+            pool (aiomysql.Pool): Pool to acquire the connection from
+
+        Yields:
+            aiomysql.Connection: Connection of the pool
+        """
+        self.waiters += 1
+        self.peak_waiters = max(self.peak_waiters, self.waiters)
+        waiting = True
+        try:
+            async with pool.acquire() as connection:
+                self.waiters -= 1
+                waiting = False
+                self.in_use += 1
+                self.peak_in_use = max(self.peak_in_use, self.in_use)
+                try:
+                    yield connection
+                finally:
+                    self.in_use -= 1
+        finally:
+            if waiting:
+                self.waiters -= 1
+
+    def stats(self, pool):
+        """Returns the utilization of the pool, to size it against `max_connections`."""
+        return {
+            "min_size": pool.minsize,
+            "max_size": pool.maxsize,
+            "size": pool.size,
+            "in_use": self.in_use,
+            "idle": pool.freesize,
+            "waiters": self.waiters,
+            "peak_in_use": self.peak_in_use,
+            "peak_waiters": self.peak_waiters,
+        }
+
+
+class Replica:
+    """A read replica, along with its connection pool and its replication lag."""
+
+    def __init__(self, host, port, pool):
+        self.host = host
+        self.port = port
+        self.pool = pool
+        self.usage = PoolUsage()
+        self.lag = None
+        self.checked_at = None
+
+    @property
+    def name(self):
+        return f"{self.host}:{self.port}"
+
+    @property
+    def load(self):
+        return self.usage.in_use + self.usage.waiters
+
+    async def read_lag(self):
+        """Reads how many seconds the replica is behind its source.
+
+        Returns:
+            int: Replication lag, or None when the replica doesn't replicate
+        """
+        async with self.pool.acquire() as connection:
+            async with connection.cursor(aiomysql.cursors.DictCursor) as cursor:
+                try:
+                    await cursor.execute(QUERIES["REPLICA_STATUS"])
+                except aiomysql.ProgrammingError:
+                    # servers older than 8.0.22
+                    await cursor.execute(QUERIES["SLAVE_STATUS"])
+                status = await cursor.fetchone()
+        if not status:
+            return None
+        return status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+
+
+class ConsistentSnapshot:
+    """Connections reading from the same consistent snapshot of the server.
+
+    Like mydumper, tables are locked with `FLUSH TABLES WITH READ LOCK` while
+    every worker connection starts its transaction and the binary log position
+    is read, so the rows read by all the workers and the position match.
+    The lock is released right after, it doesn't last for the whole read.
+
+    Worker connections are handed out one query at a time through `acquire`,
+    like the connections of a pool.
+    """
+
+    def __init__(self, connection_settings, workers):
+        self.connection_settings = connection_settings
+        self.workers = workers
+        self._connections = asyncio.Queue()
+        self._all_connections = []
+
+    async def start(self, binlog_position=False):
+        """Opens the worker connections on a shared snapshot.
+
+        Args:
+            binlog_position (boolean): Whether to read the binary log position of the snapshot
+
+        Returns:
+            dict: Binary log checkpoint of the snapshot, or None
+        """
+        control = await aiomysql.connect(**self.connection_settings)
+        locked = self.workers > 1 or binlog_position
+        try:
+            async with control.cursor() as cursor:
+                if locked:
+                    await cursor.execute("FLUSH TABLES WITH READ LOCK")
+                for _ in range(self.workers):
+                    connection = await aiomysql.connect(**self.connection_settings)
+                    self._all_connections.append(connection)
+                    async with connection.cursor() as worker_cursor:
+                        await worker_cursor.execute(
+                            "SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ"
+                        )
+                        await worker_cursor.execute(
+                            "START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY"
+                        )
+                    self._connections.put_nowait(connection)
+
+                checkpoint = None
+                if binlog_position:
+                    await cursor.execute(QUERIES["BINARY_LOG_STATUS"])
+                    checkpoint = parse_binlog_status(await cursor.fetchall())
+                if locked:
+                    await cursor.execute("UNLOCK TABLES")
+        except Exception:
+            await self.close()
+            raise
+        finally:
+            control.close()
+
+        logger.info(
+            f"Started a consistent snapshot on {self.workers} connections"
+            + (f" at {checkpoint}." if checkpoint else ".")
+        )
+        return checkpoint
+
+    @asynccontextmanager
+    async def acquire(self):
+        connection = await self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put_nowait(connection)
+
+    async def close(self):
+        for connection in self._all_connections:
+            connection.close()
+        self._all_connections = []
+        self._connections = asyncio.Queue()
+
+
+def _decode_json(value):
+    if isinstance(value, bytes):
+        return value.decode(errors="ignore")
+    if isinstance(value, dict):
+        return {_decode_json(key): _decode_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode_json(item) for item in value]
+    return value
+
+
+def _dump_json_columns(values, json_columns):
+    """Turns the JSON values parsed from the binary log back into the text the
+    server sends when they're selected, like the rows of the scans."""
+    for column in json_columns:
+        if values.get(column) is not None:
+            values[column] = json.dumps(
+                _decode_json(values[column]), ensure_ascii=False
+            )
+
+
+def _join_set_columns(values, set_columns):
+    """Turns the members of the SET values parsed from the binary log back into
+    the comma separated text the server sends, in the order of the definition."""
+    for column, members in set_columns.items():
+        if values.get(column) is not None:
+            chosen = {_decode_json(member) for member in values[column]}
+            values[column] = ",".join(member for member in members if member in chosen)
+
+
+class BinlogReader:
+    """Reads the row changes of the binary log, starting from a checkpoint.
+
+    The checkpoint is a dict with the `log_file` and `log_pos` to resume from,
+    and the `gtid_set` already read when the server uses GTIDs. It moves forward
+    on every committed transaction.
+
+    `BinLogStreamReader` is blocking, so events are read in batches in a thread.
+    Reading stops at the end of the binary log.
+    """
+
+    def __init__(
+        self,
+        connection_settings,
+        server_id,
+        databases,
+        checkpoint,
+        batch_size=BINLOG_BATCH_SIZE,
+    ):
+        self.databases = set(databases)
+        self.checkpoint = dict(checkpoint)
+        self.batch_size = batch_size
+        self.schema_changed = False
+        self._gtid_set = (
+            GtidSet(checkpoint["gtid_set"]) if checkpoint.get("gtid_set") else None
+        )
+        position = (
+            {"auto_position": checkpoint["gtid_set"]}
+            if self._gtid_set is not None
+            else {"log_file": checkpoint["log_file"], "log_pos": checkpoint["log_pos"]}
+        )
+        self._stream = BinLogStreamReader(
+            connection_settings=connection_settings,
+            server_id=server_id,
+            only_schemas=list(databases),
+            only_events=[
+                WriteRowsEvent,
+                UpdateRowsEvent,
+                DeleteRowsEvent,
+                GtidEvent,
+                QueryEvent,
+                XidEvent,
+            ],
+            resume_stream=True,
+            blocking=False,
+            **position,
+        )
+
+    def _read_batch(self):
+        """Reads the next events and turns the row events into changes.
+
+        Returns:
+            list: Tuples of operation, database, table, values of the row, values before an update and time of the change
+        """
+        changes = []
+        while len(changes) < self.batch_size:
+            event = self._stream.fetchone()
+            if event is None:
+                break
+
+            if isinstance(event, GtidEvent):
+                if self._gtid_set is not None:
+                    self._gtid_set.merge_gtid(Gtid(event.gtid))
+            elif isinstance(event, XidEvent):
+                self._commit()
+            elif isinstance(event, QueryEvent):
+                schema = (
+                    event.schema.decode()
+                    if isinstance(event.schema, bytes)
+                    else event.schema
+                )
+                statement = event.query.strip().upper()
+                if statement == "COMMIT":
+                    # transactions on non-transactional engines like MyISAM end
+                    # with a COMMIT statement instead of a XID event
+                    self._commit()
+                elif schema in self.databases and statement != "BEGIN":
+                    # DDL and TRUNCATE have no row events to replay
+                    logger.warning(
+                        f"Statement '{event.query}' can't be replayed from the binary log, the next sync will take a new snapshot."
+                    )
+                    self.schema_changed = True
+            else:
+                timestamp = datetime.fromtimestamp(event.timestamp, timezone.utc)
+                json_columns = [
+                    column.name
+                    for column in event.columns
+                    if column.type == FIELD_TYPE.JSON
+                ]
+                set_columns = {
+                    column.name: column.set_values
+                    for column in event.columns
+                    if column.type == FIELD_TYPE.SET
+                }
+                for row in event.rows:
+                    for values in row.values():
+                        _dump_json_columns(values, json_columns)
+                        _join_set_columns(values, set_columns)
+                    if isinstance(event, DeleteRowsEvent):
+                        operation, values, previous_values = (
+                            "delete",
+                            row["values"],
+                            None,
+                        )
+                    elif isinstance(event, UpdateRowsEvent):
+                        operation = "index"
+                        values, previous_values = (
+                            row["after_values"],
+                            row["before_values"],
+                        )
+                    else:
+                        operation, values, previous_values = (
+                            "index",
+                            row["values"],
+                            None,
+                        )
+                    changes.append(
+                        (
+                            operation,
+                            event.schema,
+                            event.table,
+                            values,
+                            previous_values,
+                            timestamp,
+                        )
+                    )
+        return changes
+
+    def _commit(self):
+        # resuming is only possible between transactions
+        self.checkpoint = {
+            "log_file": self._stream.log_file,
+            "log_pos": self._stream.log_pos,
+            "gtid_set": str(self._gtid_set) if self._gtid_set else None,
+        }
+
+    async def changes(self):
+        """Yields the changes found in the binary log since the checkpoint."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                changes = await loop.run_in_executor(None, self._read_batch)
+                if not changes:
+                    break
+                for change in changes:
+                    yield change
+        finally:
+            await loop.run_in_executor(None, self._stream.close)
+
+
 class MySqlDataSource(BaseDataSource):
     """MySQL"""
 
+    serializers = BaseDataSource.serializers.copy()
+    # TIME columns are read as timedelta, SET columns can be read as sets
+    serializers.register(timedelta, str)
+    serializers.register(set, sorted)
+    # the table names of each database, shared by the instances reading the
+    # same server since the validation of the filtering creates its own
+    schema_cache = {}
+
     def __init__(self, configuration):
         """Set up the connection to the MySQL server.
 
@@ -125,8 +1133,42 @@ class MySqlDataSource(BaseDataSource):
         super().__init__(configuration=configuration)
         self.retry_count = self.configuration["retry_count"]
         self.connection_pool = None
+        self.pool_usage = PoolUsage()
+        self.replicas = []
+        self._next_replica = 0
+        self.read_timeout = int(
+            self.configuration.get("read_timeout", DEFAULT_READ_TIMEOUT)
+        )
         self.ssl_disabled = self.configuration["ssl_disabled"]
         self.certificate = self.configuration["ssl_ca"]
+        self.catalog = {}
+        self.snapshot = None
+        self.table_states = {}
+        self.high_water_marks = {}
+        self.kept_tables = set()
+        self._last_table_states = {}
+        self._last_high_water_marks = {}
+        self.last_full_sync = None
+        self.full_sync = True
+        self.binlog_checkpoint = None
+        self._last_binlog_checkpoint = None
+        self.changes_only = False
+        self.fetch_sizes = {}
+        self.stats_expiry = None
+        self.deferred_columns = {}
+        self.compressed_columns = {}
+        self.basic_rules = []
+        self.rules_matches = {}
+        self.databases_state = None
+        self.resume_from = None
+        self.next_filtering = None
+        self.resumed = False
+        self.resume_keys = {}
+        self.completed_tables = []
+        self.position = None
+        self.ordered_tables = {}
+        self.last_keys = {}
+        self.filtering_digest = None
 
     @classmethod
     def get_default_configuration(cls):
@@ -171,6 +1213,181 @@ class MySqlDataSource(BaseDataSource):
                 "label": "How many rows to fetch on each call",
                 "type": "int",
             },
+            "keyset_pagination": {
+                "value": DEFAULT_KEYSET_PAGINATION,
+                "label": "Page through tables using their primary keys",
+                "type": "bool",
+            },
+            "page_size": {
+                "value": DEFAULT_PAGE_SIZE,
+                "label": "How many rows to fetch per page when paginating on primary keys",
+                "type": "int",
+            },
+            "table_shards": {
+                "value": DEFAULT_TABLE_SHARDS,
+                "label": "How many primary key ranges of a table to read concurrently",
+                "type": "int",
+            },
+            "concurrent_tables": {
+                "value": DEFAULT_CONCURRENT_TABLES,
+                "label": "How many tables to read concurrently",
+                "type": "int",
+            },
+            "max_in_flight_rows": {
+                "value": DEFAULT_MAX_IN_FLIGHT_ROWS,
+                "label": "How many rows can be read ahead when reading tables concurrently",
+                "type": "int",
+            },
+            "prefetch_metadata": {
+                "value": DEFAULT_PREFETCH_METADATA,
+                "label": "Load the metadata of all the tables of a database at once",
+                "type": "bool",
+            },
+            "skip_unchanged_tables": {
+                "value": DEFAULT_SKIP_UNCHANGED_TABLES,
+                "label": "Skip tables that did not change since the last sync",
+                "type": "bool",
+            },
+            "incremental_column": {
+                "value": DEFAULT_INCREMENTAL_COLUMN,
+                "label": "Increasing column used to only fetch the rows changed since the last sync (e.g. updated_at)",
+                "type": "str",
+            },
+            "full_sync_interval": {
+                "value": DEFAULT_FULL_SYNC_INTERVAL,
+                "label": "How many hours between full syncs when fetching rows incrementally",
+                "type": "int",
+            },
+            "consistent_snapshot": {
+                "value": DEFAULT_CONSISTENT_SNAPSHOT,
+                "label": "Read all the tables from the same point in time, on concurrent_tables connections",
+                "type": "bool",
+            },
+            "cdc": {
+                "value": DEFAULT_CDC,
+                "label": "Read changes from the binary log after a first full sync",
+                "type": "bool",
+            },
+            "cdc_server_id": {
+                "value": DEFAULT_CDC_SERVER_ID,
+                "label": "Server id used to read the binary log, unique among the replicas",
+                "type": "int",
+            },
+            "content_hash": {
+                "value": DEFAULT_CONTENT_HASH,
+                "label": "Only re-index rows whose values changed, using a digest of each row",
+                "type": "bool",
+            },
+            "adaptive_fetch_size": {
+                "value": DEFAULT_ADAPTIVE_FETCH_SIZE,
+                "label": "Adapt fetch_size to each table, from the size of its rows",
+                "type": "bool",
+            },
+            "fetch_bytes_target": {
+                "value": DEFAULT_FETCH_BYTES_TARGET,
+                "label": "How many bytes to fetch in each batch when adapting fetch_size",
+                "type": "int",
+            },
+            "excluded_columns": {
+                "value": "",
+                "label": "Columns left out of the documents, as column or table.column",
+                "type": "list",
+            },
+            "truncated_columns": {
+                "value": "",
+                "label": "Columns cut to truncate_size, as column or table.column",
+                "type": "list",
+            },
+            "truncate_size": {
+                "value": DEFAULT_TRUNCATE_SIZE,
+                "label": "Length truncated columns are cut to, in characters for text and bytes for binary columns",
+                "type": "int",
+            },
+            "deferred_columns": {
+                "value": "",
+                "label": "Columns only fetched for the rows that need to be indexed, as column or table.column",
+                "type": "list",
+            },
+            "push_down_basic_rules": {
+                "value": DEFAULT_PUSH_DOWN_BASIC_RULES,
+                "label": "Apply basic sync rules in the queries, when sync rules are enabled",
+                "type": "bool",
+            },
+            "compressed_columns": {
+                "value": "",
+                "label": "Columns compressed by the server before being sent, as column or table.column",
+                "type": "list",
+            },
+            "raw_rows": {
+                "value": DEFAULT_RAW_ROWS,
+                "label": "Read decimal and date columns as text instead of parsing them, when reading tables",
+                "type": "bool",
+            },
+            "resumable_syncs": {
+                "value": DEFAULT_RESUMABLE_SYNCS,
+                "label": "Resume failed syncs from their last checkpoint, instead of reading all the tables again",
+                "type": "bool",
+            },
+            "skip_idle_syncs": {
+                "value": DEFAULT_SKIP_IDLE_SYNCS,
+                "label": "Skip scheduled syncs when the databases did not change since the last one",
+                "type": "bool",
+            },
+            "pool_min_size": {
+                "value": DEFAULT_POOL_MIN_SIZE,
+                "label": "Connections opened when the pool is created",
+                "type": "int",
+            },
+            "pool_max_size": {
+                "value": MAX_POOL_SIZE,
+                "label": "Maximum number of connections of the pool",
+                "type": "int",
+            },
+            "pool_recycle": {
+                "value": DEFAULT_POOL_RECYCLE,
+                "label": "Seconds after which idle connections are reopened (-1 to never reopen them)",
+                "type": "int",
+            },
+            "connect_timeout": {
+                "value": DEFAULT_CONNECT_TIMEOUT,
+                "label": "Seconds to wait for a connection to open (0 to wait forever)",
+                "type": "int",
+            },
+            "query_timeout": {
+                "value": DEFAULT_QUERY_TIMEOUT,
+                "label": "Seconds after which the server aborts a SELECT, with MAX_EXECUTION_TIME (0 for no limit)",
+                "type": "int",
+            },
+            "read_timeout": {
+                "value": DEFAULT_READ_TIMEOUT,
+                "label": "Seconds to wait for each response of the server (0 to wait forever)",
+                "type": "int",
+            },
+            "schema_cache_ttl": {
+                "value": DEFAULT_SCHEMA_CACHE_TTL,
+                "label": "Seconds the table lists are cached for, between the validation of the advanced rules and the sync",
+                "type": "int",
+            },
+            "explain_advanced_rules": {
+                "value": DEFAULT_EXPLAIN_ADVANCED_RULES,
+                "label": "Check the queries of the advanced rules with EXPLAIN when validating them",
+                "type": "bool",
+            },
+            "replicas": {
+                "value": DEFAULT_REPLICAS,
+                "label": "Read replicas the tables are read from, as host or host:port",
+                "type": "list",
+            },
+            "replica_routing": {
+                "value": DEFAULT_REPLICA_ROUTING,
+                "label": "How reads are spread over the replicas (round_robin, least_loaded)",
+                "type": "str",
+            },
+            "max_replica_lag": {
+                "value": DEFAULT_MAX_REPLICA_LAG,
+                "label": "Seconds behind the primary after which a replica isn't read from",
+                "type": "int",
+            },
             "retry_count": {
                 "value": RETRIES,
                 "label": "How many retry count for fetching rows on each call",
@@ -191,7 +1408,20 @@ class MySqlDataSource(BaseDataSource):
     def advanced_rules_validators(self):
         return [MySQLAdvancedRulesValidator(self)]
 
+    def tweak_bulk_options(self, options):
+        """Changes of the binary log have to be applied in order, by a single bulk request at a time.
+
+        Args:
+            options (dict): Bulk options
+        """
+        if self.configuration["cdc"]:
+            options["max_concurrency"] = 1
+
     async def close(self):
+        for replica in self.replicas:
+            replica.pool.close()
+            await replica.pool.wait_closed()
+        self.replicas = []
         if self.connection_pool is None:
             return
         self.connection_pool.close()
@@ -224,6 +1454,32 @@ class MySqlDataSource(BaseDataSource):
         if not (self.ssl_disabled or self.certificate):
             raise Exception("SSL certificate must be configured.")
 
+        if self.configuration["replica_routing"] not in REPLICA_ROUTINGS:
+            raise Exception(
+                f"Configured replica routing has to be one of {', '.join(REPLICA_ROUTINGS)}."
+            )
+
+        # the snapshot connections are all taken by the scans of the tables
+        # while the deferred columns are downloaded, and reading them outside
+        # of the snapshot would break its consistency
+        if self.configuration["consistent_snapshot"] and self._configured_columns(
+            "deferred_columns"
+        ):
+            raise Exception(
+                "Configured deferred columns can't be used with a consistent snapshot."
+            )
+
+        # the downloads of the deferred columns wait for a connection of the
+        # pool, which the scans blocked on the full queue of documents never free
+        scans = int(
+            self.configuration.get("concurrent_tables", DEFAULT_CONCURRENT_TABLES)
+        ) * int(self.configuration.get("table_shards", DEFAULT_TABLE_SHARDS))
+        pool_size = int(self.configuration.get("pool_max_size", MAX_POOL_SIZE))
+        if self._configured_columns("deferred_columns") and scans >= pool_size:
+            raise Exception(
+                f"Configured deferred columns need fewer concurrent scans (concurrent_tables × table_shards = {scans}) than connections in the pool ({pool_size})."
+            )
+
     def _ssl_context(self, certificate):
         """Convert string to pem format and create a SSL context
 
@@ -240,39 +1496,199 @@ class MySqlDataSource(BaseDataSource):
         ctx.load_verify_locations(cadata=pem_format)
         return ctx
 
-    async def ping(self):
-        """Verify the connection with MySQL server"""
-        logger.info("Validating MySQL Configuration...")
-        self._validate_configuration()
-        connection_string = {
+    def _connection_settings(self):
+        settings = {
             "host": self.configuration["host"],
             "port": int(self.configuration["port"]),
             "user": self.configuration["user"],
             "password": self.configuration["password"],
-            "db": None,
-            "maxsize": MAX_POOL_SIZE,
             "ssl": self._ssl_context(certificate=self.certificate)
             if not self.ssl_disabled
             else None,
         }
-        logger.info("Pinging MySQL...")
-        if self.connection_pool is None:
-            self.connection_pool = await aiomysql.create_pool(**connection_string)
-        try:
-            async with self.connection_pool.acquire() as connection:
-                await connection.ping()
-                logger.info("Successfully connected to the MySQL Server.")
-        except Exception:
-            logger.exception("Error while connecting to the MySQL Server.")
-            raise
+        connect_timeout = int(
+            self.configuration.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT)
+        )
+        if connect_timeout:
+            settings["connect_timeout"] = connect_timeout
+        query_timeout = int(
+            self.configuration.get("query_timeout", DEFAULT_QUERY_TIMEOUT)
+        )
+        if query_timeout:
+            settings[
+                "init_command"
+            ] = f"SET SESSION MAX_EXECUTION_TIME={query_timeout * 1000}"
+        return settings
+
+    def _acquire(self, scan=False):
+        """Acquires a connection of the consistent snapshot when one is running,
+        of a replica for the scans of tables when one is available, of the pool
+        otherwise."""
+        if self.snapshot is not None:
+            return self.snapshot.acquire()
+        if scan:
+            replica = self._pick_replica()
+            if replica is not None:
+                return replica.usage.acquire(replica.pool)
+        return self.pool_usage.acquire(self.connection_pool)
+
+    def _replica_hosts(self):
+        replicas = self.configuration["replicas"]
+        if isinstance(replicas, str):
+            replicas = replicas.split(",")
+        hosts = []
+        for replica in replicas:
+            replica = replica.strip()
+            if not replica:
+                continue
+            host, _, port = replica.partition(":")
+            hosts.append((host, int(port) if port else int(self.configuration["port"])))
+        return hosts
+
+    def _routes_to_replicas(self):
+        # the binlog position and the snapshot are read from the primary, the
+        # rows they go with have to be read from it too
+        return not (
+            self.configuration["cdc"] or self.configuration["consistent_snapshot"]
+        )
 
-    async def _connect(self, query, fetch_many=False, **query_kwargs):
-        """Executes the passed query on the MySQL server.
+    def _pick_replica(self):
+        """Returns the replica to send a table scan to, or None to use the primary.
 
-        Args:
-            query (str): MySql query to be executed.
+        Replicas without a known lag, or lagging more than `max_replica_lag`,
+        are skipped.
+        """
+        if not self.replicas or not self._routes_to_replicas():
+            return None
+        max_lag = int(
+            self.configuration.get("max_replica_lag", DEFAULT_MAX_REPLICA_LAG)
+        )
+        replicas = [
+            replica
+            for replica in self.replicas
+            if replica.lag is not None and replica.lag <= max_lag
+        ]
+        if not replicas:
+            return None
+        if self.configuration.get("replica_routing") == "least_loaded":
+            return min(replicas, key=lambda replica: replica.load)
+        self._next_replica += 1
+        return replicas[self._next_replica % len(replicas)]
+
+    async def _check_replicas(self, force=False):
+        """Refreshes the replication lag of the replicas checked more than
+        `REPLICA_LAG_CHECK_INTERVAL` seconds ago.
+
+        Args:
+            force (boolean): Whether to check all the replicas
+        """
+        if not self._routes_to_replicas():
+            return
+        for replica in self.replicas:
+            if (
+                not force
+                and replica.checked_at is not None
+                and time.monotonic() - replica.checked_at < REPLICA_LAG_CHECK_INTERVAL
+            ):
+                continue
+            try:
+                replica.lag = await replica.read_lag()
+            except Exception as exception:
+                logger.warning(
+                    f"Could not read the replication lag of {replica.name}, not reading from it. Exception: {exception}"
+                )
+                replica.lag = None
+            else:
+                if replica.lag is None:
+                    logger.warning(
+                        f"{replica.name} is not replicating, not reading from it."
+                    )
+            replica.checked_at = time.monotonic()
+
+    async def _read(self, connection, awaitable):
+        """Waits for a response of the server, for at most `read_timeout` seconds.
+
+        Args:
+            connection (aiomysql.Connection): Connection the response is read from
+            awaitable (coroutine): Read of the response
+
+        Returns:
+            Result of the read
+        """
+        if not self.read_timeout:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self.read_timeout)
+        except asyncio.TimeoutError:
+            # the connection is left in the middle of a response, it can't be reused
+            connection.close()
+            raise
+
+    async def _create_pool(self, **settings):
+        connection_string = {
+            **self._connection_settings(),
+            **settings,
+            "db": None,
+            "minsize": int(
+                self.configuration.get("pool_min_size", DEFAULT_POOL_MIN_SIZE)
+            ),
+            "maxsize": int(self.configuration.get("pool_max_size", MAX_POOL_SIZE)),
+            "pool_recycle": int(
+                self.configuration.get("pool_recycle", DEFAULT_POOL_RECYCLE)
+            ),
+        }
+        return await aiomysql.create_pool(**connection_string)
+
+    async def ping(self):
+        """Verify the connection with MySQL server, and set up the pools of the replicas"""
+        logger.info("Validating MySQL Configuration...")
+        self._validate_configuration()
+        logger.info("Pinging MySQL...")
+        if self.connection_pool is None:
+            self.connection_pool = await self._create_pool()
+        try:
+            async with self.connection_pool.acquire() as connection:
+                await connection.ping()
+                logger.info("Successfully connected to the MySQL Server.")
+        except Exception:
+            logger.exception("Error while connecting to the MySQL Server.")
+            raise
+
+        if self.replicas:
+            return
+        for host, port in self._replica_hosts():
+            try:
+                pool = await self._create_pool(host=host, port=port)
+            except Exception as exception:
+                # the primary can serve the reads of a replica that is down
+                logger.warning(
+                    f"Could not connect to the replica {host}:{port}, not reading from it. Exception: {exception}"
+                )
+                continue
+            self.replicas.append(Replica(host=host, port=port, pool=pool))
+        await self._check_replicas(force=True)
+
+    async def _connect(
+        self,
+        query,
+        fetch_many=False,
+        query_args=None,
+        decoders=None,
+        session_query=None,
+        table_rows=False,
+        **query_kwargs,
+    ):
+        """Executes the passed query on the MySQL server.
+
+        Args:
+            query (str): MySql query to be executed.
             query_kwargs (dict): Query kwargs to format the query.
             fetch_many (boolean): Should use fetchmany to fetch the response.
+            query_args (tuple): Parameters bound to the `%s` placeholders of the query.
+            decoders (dict): Converters of the values by field type, overriding the ones of the connection.
+            session_query (str): Statement executed before the query, on the same connection.
+            table_rows (boolean): Whether the query reads the rows of the table, fetched
+                in batches adapted to their size when `adaptive_fetch_size` is on.
 
         Yields:
             list: Column names and query response
@@ -280,6 +1696,20 @@ class MySqlDataSource(BaseDataSource):
 
         formatted_query = query.format(**query_kwargs)
         size = int(self.configuration.get("fetch_size", DEFAULT_FETCH_SIZE))
+        fetch_size = None
+        # the size adapts to the rows of the table, other queries of the
+        # table like the ones of its keys would skew it
+        if (
+            fetch_many
+            and table_rows
+            and self.configuration.get(
+                "adaptive_fetch_size", DEFAULT_ADAPTIVE_FETCH_SIZE
+            )
+        ):
+            fetch_size = self._fetch_size(
+                database=query_kwargs["database"], table=query_kwargs["table"]
+            )
+            size = fetch_size.size
 
         retry = 1
         yield_once = True
@@ -289,9 +1719,13 @@ class MySqlDataSource(BaseDataSource):
 
         while retry <= self.retry_count:
             try:
-                async with self.connection_pool.acquire() as connection:
-                    async with connection.cursor(aiomysql.cursors.SSCursor) as cursor:
-                        await cursor.execute(formatted_query)
+                async with self._acquire(scan=fetch_many) as connection:
+                    async with _streaming_cursor(connection, decoders) as cursor:
+                        if session_query is not None:
+                            await self._read(connection, cursor.execute(session_query))
+                        await self._read(
+                            connection, cursor.execute(formatted_query, query_args)
+                        )
 
                         if fetch_many:
                             # sending back column names only once
@@ -304,11 +1738,21 @@ class MySqlDataSource(BaseDataSource):
 
                             # setting cursor position where it was failed
                             if cursor_position:
-                                await cursor.scroll(cursor_position, mode="absolute")
+                                await self._read(
+                                    connection,
+                                    cursor.scroll(cursor_position, mode="absolute"),
+                                )
 
                             while True:
-                                rows = await cursor.fetchmany(size=size)
+                                started = time.monotonic()
+                                rows = await self._read(
+                                    connection, cursor.fetchmany(size=size)
+                                )
                                 rows_length = len(rows)
+                                if fetch_size is not None:
+                                    size = fetch_size.update(
+                                        rows=rows, elapsed=time.monotonic() - started
+                                    )
 
                                 # resetting cursor position & retry to 0 for next batch
                                 if cursor_position:
@@ -323,7 +1767,7 @@ class MySqlDataSource(BaseDataSource):
                                 rows_fetched += rows_length
                                 await asyncio.sleep(0)
                         else:
-                            yield await cursor.fetchall()
+                            yield await self._read(connection, cursor.fetchall())
                         break
 
             except IndexError as exception:
@@ -341,9 +1785,443 @@ class MySqlDataSource(BaseDataSource):
                 await asyncio.sleep(RETRY_INTERVAL**retry)
                 retry += 1
 
+    def _fetch_size(self, database, table):
+        """Returns the adaptive fetch size of a table, kept for the whole sync."""
+        key = f"{database}.{table}"
+        if key not in self.fetch_sizes:
+            self.fetch_sizes[key] = AdaptiveFetchSize(
+                size=int(self.configuration.get("fetch_size", DEFAULT_FETCH_SIZE)),
+                bytes_target=int(
+                    self.configuration.get(
+                        "fetch_bytes_target", DEFAULT_FETCH_BYTES_TARGET
+                    )
+                ),
+            )
+        return self.fetch_sizes[key]
+
+    def sync_stats(self):
+        """Returns the utilization of the connection pool, and the fetch size chosen
+        for each table when adapting it."""
+        stats = {}
+        if self.connection_pool is not None:
+            stats["pool"] = self.pool_usage.stats(self.connection_pool)
+        if self.replicas:
+            stats["replicas"] = {
+                replica.name: {
+                    **replica.usage.stats(replica.pool),
+                    "lag": replica.lag,
+                }
+                for replica in self.replicas
+            }
+        if self.fetch_sizes:
+            stats["fetch_sizes"] = {
+                table: fetch_size.size for table, fetch_size in self.fetch_sizes.items()
+            }
+        return stats
+
+    async def _fetch_rows_by_keyset(
+        self,
+        database,
+        table,
+        primary_keys,
+        lower=None,
+        upper=None,
+        columns="*",
+        row_filter=None,
+        decoders=None,
+    ):
+        """Streams the rows of a table one page at a time, ordered by its primary key.
+
+        Each page starts right after the primary key of the last row of the previous page,
+        so it's served by a range scan on the primary key index. A failure only retries the
+        page being read instead of the whole table.
+
+        Args:
+            database (str): Name of database
+            table (str): Name of table
+            primary_keys (list): Primary key columns of the table
+            lower (tuple): Primary key to start from (included). Defaults to None.
+            upper (tuple): Primary key to stop at (excluded). Defaults to None.
+            columns (str): Select list of the columns to fetch. Defaults to all of them.
+            row_filter (tuple): Condition the rows must match and its query parameters. Defaults to None.
+            decoders (dict): Converters of the values by field type. Defaults to the ones of the connection.
+
+        Yields:
+            list: Column names and rows of the table
+        """
+        page_size = int(self.configuration.get("page_size", DEFAULT_PAGE_SIZE))
+        order_by = ", ".join(map(quote_identifier, primary_keys))
+
+        column_names = None
+        key_indexes = []
+        last_key = None
+
+        while True:
+            conditions, query_args = [], []
+            if last_key is not None:
+                conditions.append(row_comparison(primary_keys, ">"))
+                query_args.extend(last_key)
+            elif lower is not None:
+                conditions.append(row_comparison(primary_keys, ">="))
+                query_args.extend(lower)
+            if upper is not None:
+                conditions.append(row_comparison(primary_keys, "<"))
+                query_args.extend(upper)
+            if row_filter is not None:
+                conditions.append(row_filter[0])
+                query_args.extend(row_filter[1])
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+            page = self._connect(
+                query=QUERIES["TABLE_DATA_PAGE"],
+                fetch_many=True,
+                table_rows=True,
+                query_args=tuple(query_args) or None,
+                database=database,
+                table=table,
+                columns=columns,
+                where=where,
+                order_by=order_by,
+                limit=page_size,
+                decoders=decoders,
+            )
+
+            page_column_names = await anext(page)
+            if column_names is None:
+                column_names = page_column_names
+                key_indexes = [
+                    column_names.index(f"{database}_{table}_{key}")
+                    for key in primary_keys
+                ]
+                yield column_names
+
+            rows_count = 0
+            last_row = None
+            async for row in page:
+                rows_count += 1
+                last_row = row
+                yield row
+
+            if rows_count < page_size:
+                break
+
+            last_key = tuple(last_row[index] for index in key_indexes)
+
+    async def _fetch_shard_boundaries(self, database, table, primary_keys, shards):
+        """Splits a table in primary key ranges of about the same size.
+
+        Tables with a single integer primary key are split evenly between the
+        lowest and the highest key. Other tables are split on the keys found at
+        regular offsets of the primary key index, each read by the server, which
+        only sends one row per boundary.
+
+        Args:
+            database (str): Name of database
+            table (str): Name of table
+            primary_keys (list): Primary key columns of the table
+            shards (int): How many ranges to split the table in
+
+        Returns:
+            list: Sorted primary keys separating the ranges. Empty when the table is too small to be split, or when its estimated row count is too high.
+        """
+        page_size = int(self.configuration.get("page_size", DEFAULT_PAGE_SIZE))
+        metadata = self._table_metadata(database=database, table=table)
+        if metadata is not None:
+            row_count = metadata["row_count"]
+        else:
+            rows = await anext(
+                self._connect(
+                    query=QUERIES["TABLE_ROW_COUNT"], database=database, table=table
+                )
+            )
+            row_count = rows[0][0] if rows else 0
+        # TABLE_ROWS is an estimate, only worth splitting tables with many pages
+        if not row_count or row_count < shards * page_size:
+            return []
+
+        keys = ", ".join(map(quote_identifier, primary_keys))
+        boundaries = []
+
+        if len(primary_keys) == 1:
+            [[lowest, highest]] = await anext(
+                self._connect(
+                    query=QUERIES["TABLE_KEY_RANGE"],
+                    database=database,
+                    table=table,
+                    key=keys,
+                )
+            )
+            if isinstance(lowest, int) and isinstance(highest, int):
+                # integer arithmetic stays exact for the largest BIGINT keys
+                boundaries = [
+                    (lowest + (highest - lowest + 1) * shard // shards,)
+                    for shard in range(1, shards)
+                ]
+                return sorted(set(boundaries))
+
+        # the last boundary first, an overestimated row count leaves it past the end
+        for shard in reversed(range(1, shards)):
+            key = await anext(
+                self._connect(
+                    query=QUERIES["TABLE_KEY_AT_OFFSET"],
+                    database=database,
+                    table=table,
+                    keys=keys,
+                    offset=row_count * shard // shards,
+                )
+            )
+            if not key:
+                logger.debug(
+                    f"Not splitting {table} table from database {database}, its estimated row count of {row_count} is too high."
+                )
+                return []
+            boundaries.insert(0, tuple(key[0]))
+
+        # keys are already in the order of the index collation, only dropping duplicates
+        return list(dict.fromkeys(boundaries))
+
+    async def _fetch_rows_in_shards(
+        self,
+        database,
+        table,
+        primary_keys,
+        shards,
+        columns="*",
+        row_filter=None,
+        decoders=None,
+    ):
+        """Reads ranges of the primary key of a table concurrently.
+
+        Every range is read with keyset pagination on its own pooled connection.
+        Rows are yielded as they come, so they are not ordered.
+
+        Args:
+            database (str): Name of database
+            table (str): Name of table
+            primary_keys (list): Primary key columns of the table
+            shards (int): How many ranges to read concurrently
+            columns (str): Select list of the columns to fetch. Defaults to all of them.
+            row_filter (tuple): Condition the rows must match and its query parameters. Defaults to None.
+            decoders (dict): Converters of the values by field type. Defaults to the ones of the connection.
+
+        Yields:
+            list: Column names and rows of the table
+        """
+        boundaries = await self._fetch_shard_boundaries(
+            database=database, table=table, primary_keys=primary_keys, shards=shards
+        )
+        if not boundaries:
+            async for row in self._fetch_rows_by_keyset(
+                database=database,
+                table=table,
+                primary_keys=primary_keys,
+                columns=columns,
+                row_filter=row_filter,
+                decoders=decoders,
+            ):
+                yield row
+            return
+
+        logger.debug(
+            f"Reading table {table} from database {database} in {len(boundaries) + 1} shards."
+        )
+        yield await anext(
+            self._connect(
+                query=QUERIES["TABLE_COLUMNS"],
+                fetch_many=True,
+                database=database,
+                table=table,
+                columns=columns,
+            )
+        )
+
+        async def _read_shard(lower, upper):
+            rows = self._fetch_rows_by_keyset(
+                database=database,
+                table=table,
+                primary_keys=primary_keys,
+                lower=lower,
+                upper=upper,
+                columns=columns,
+                row_filter=row_filter,
+                decoders=decoders,
+            )
+            # skipping column names
+            await anext(rows)
+            async for row in rows:
+                yield row
+
+        bounds = [None] + boundaries + [None]
+        async for row in merge_generators(
+            [_read_shard(lower, upper) for lower, upper in zip(bounds, bounds[1:])],
+            max_concurrency=len(bounds) - 1,
+            queue_size=int(self.configuration.get("page_size", DEFAULT_PAGE_SIZE)),
+        ):
+            yield row
+
+    async def _statistics_session_query(self):
+        """Returns the statement making INFORMATION_SCHEMA.TABLES report the current
+        UPDATE_TIME of the tables, or None.
+
+        MySQL 8 caches the statistics of the tables for
+        `information_schema_stats_expiry` seconds, a day by default, which would
+        hide the changes the idle and unchanged tables checks look for.
+        """
+        if not (
+            self.configuration["skip_idle_syncs"]
+            or self.configuration["skip_unchanged_tables"]
+        ):
+            return None
+        if self.stats_expiry is None:
+            # older servers and MariaDB don't cache them
+            rows = await anext(self._connect(query=QUERIES["STATS_EXPIRY_VARIABLE"]))
+            self.stats_expiry = bool(rows)
+        return QUERIES["DISABLE_STATS_EXPIRY"] if self.stats_expiry else None
+
+    async def fetch_catalog(self, database):
+        """Loads the metadata of all the tables of a database with two queries.
+
+        Lookups done for every table while fetching documents are then served
+        from the catalog instead of querying INFORMATION_SCHEMA each time.
+
+        Args:
+            database (str): Name of database
+
+        Returns:
+            dict: Primary keys, column types, last update time and estimated row count, per table name
+        """
+        tables = await anext(
+            self._connect(
+                query=QUERIES["DATABASE_TABLES"],
+                session_query=await self._statistics_session_query(),
+                database=database,
+            )
+        )
+        catalog = {
+            table_name: {
+                "primary_keys": [],
+                "columns": {},
+                "update_time": update_time,
+                "row_count": row_count,
+            }
+            for table_name, update_time, row_count in tables
+        }
+
+        columns = await anext(
+            self._connect(query=QUERIES["DATABASE_COLUMNS"], database=database)
+        )
+        for table_name, column_name, data_type, column_key in columns:
+            if table_name not in catalog:
+                # created after the tables were listed
+                continue
+            catalog[table_name]["columns"][column_name] = data_type
+            if column_key == "PRI":
+                catalog[table_name]["primary_keys"].append(column_name)
+
+        logger.debug(f"Loaded the metadata of {len(catalog)} tables of {database}.")
+        self.catalog[database] = catalog
+        return catalog
+
+    async def _fetch_column_types(self, database, table):
+        """Returns the data type of each column of a table, by column name."""
+        columns = await anext(
+            self._connect(
+                query=QUERIES["TABLE_COLUMN_TYPES"], database=database, table=table
+            )
+        )
+        return dict(columns)
+
+    def _table_metadata(self, database, table):
+        return self.catalog.get(database, {}).get(table)
+
+    async def _has_column(self, database, table, column):
+        metadata = self._table_metadata(database=database, table=table)
+        if metadata is not None:
+            return column in metadata["columns"]
+        columns = await anext(
+            self._connect(
+                query=QUERIES["TABLE_COLUMN"],
+                query_args=(column,),
+                database=database,
+                table=table,
+            )
+        )
+        return len(columns) > 0
+
     async def fetch_tables(self, database):
         return await anext(self._connect(query=QUERIES["ALL_TABLE"], database=database))
 
+    async def fetch_schema(self, databases):
+        """Lists the tables of the databases, with one query for all of them.
+
+        The lists are cached for `schema_cache_ttl` seconds, per server and user,
+        so that the validation of the advanced rules and the sync following it
+        share them, even though they run on different instances.
+
+        Args:
+            databases (list): Names of databases
+
+        Returns:
+            dict: Names of the tables, per database name
+        """
+        ttl = int(self.configuration.get("schema_cache_ttl", DEFAULT_SCHEMA_CACHE_TTL))
+        now = time.monotonic()
+        server = (
+            self.configuration["host"],
+            int(self.configuration["port"]),
+            self.configuration["user"],
+        )
+        schema = self.schema_cache
+        expired_databases = [
+            database
+            for database in databases
+            if (*server, database) not in schema
+            or now - schema[(*server, database)][0] >= ttl
+        ]
+        if expired_databases:
+            rows = await anext(
+                self._connect(
+                    query=QUERIES["DATABASES_TABLES"],
+                    query_args=tuple(expired_databases),
+                    databases=", ".join(["%s"] * len(expired_databases)),
+                )
+            )
+            tables = {database: [] for database in expired_databases}
+            for database, table in rows:
+                tables.setdefault(database, []).append(table)
+            for database, table_names in tables.items():
+                schema[(*server, database)] = (now, table_names)
+        return {
+            database: schema[(*server, database)][1]
+            for database in databases
+            if (*server, database) in schema
+        }
+
+    async def explain_query(self, database, table, query):
+        """Runs EXPLAIN on a custom query, without retrying it.
+
+        Args:
+            database (str): Name of database
+            table (str): Name of table
+            query (str): Custom query of an advanced rule
+
+        Returns:
+            str: Error of the server, or None when the query is valid
+        """
+        try:
+            async with self._acquire() as connection:
+                async with connection.cursor() as cursor:
+                    await self._read(
+                        connection,
+                        cursor.execute(
+                            "EXPLAIN "
+                            + query.format(database=database, table=table, columns="*")
+                        ),
+                    )
+        except Exception as exception:
+            return str(exception)
+        return None
+
     async def fetch_rows_for_table(self, database, table=None, query=None):
         """Fetches all the rows from all the tables of the database.
 
@@ -393,58 +2271,1062 @@ class MySqlDataSource(BaseDataSource):
                 f"Fetched 0 tables for the database: {database}. As database has no tables."
             )
 
-    async def fetch_documents(self, database, table, query=QUERIES["TABLE_DATA"]):
-        """Fetches all the table entries and format them in Elasticsearch documents
+    async def fetch_rows_from_tables(self, tables):
+        """Fetches the rows of several tables, reading `concurrent_tables` of them at once.
+
+        Rows of the tables being read are interleaved. Every table gets its turn to hand
+        over rows, so a huge table can't starve the others, and at most `max_in_flight_rows`
+        rows are kept in memory until they are consumed.
+
+        Args:
+            tables (list): Tuples of database name, table name and query to fetch rows with
+
+        Yields:
+            Dict: Row document to index
+        """
+        async for row in merge_generators(
+            [
+                self.fetch_rows_for_table(database=database, table=table, query=query)
+                for database, table, query in tables
+            ],
+            max_concurrency=int(
+                self.configuration.get("concurrent_tables", DEFAULT_CONCURRENT_TABLES)
+            ),
+            queue_size=int(
+                self.configuration.get("max_in_flight_rows", DEFAULT_MAX_IN_FLIGHT_ROWS)
+            ),
+        ):
+            yield row
+
+    async def _tables_to_fetch(self, databases, advanced_rules=None):
+        """Lists the tables to fetch rows from, along with the query to use.
+
+        Args:
+            databases (list): Names of databases
+            advanced_rules (dict): Custom queries per table, per database. Defaults to None.
+
+        Returns:
+            list: Tuples of database name, table name and query
+        """
+        tables_to_fetch = []
+        for database in databases:
+            if advanced_rules is not None and database not in advanced_rules:
+                continue
+
+            if advanced_rules is None:
+                tables = [
+                    table[0] for table in await self.fetch_tables(database=database)
+                ]
+            else:
+                schema = await self.fetch_schema(databases=[database])
+                tables = schema.get(database, [])
+            if not tables:
+                logger.warning(
+                    f"Fetched 0 tables for the database: {database}. As database has no tables."
+                )
+                continue
+
+            for table_name in tables:
+                if advanced_rules is None:
+                    tables_to_fetch.append(
+                        (database, table_name, QUERIES["TABLE_DATA"])
+                    )
+                elif table_name in advanced_rules[database]:
+                    tables_to_fetch.append(
+                        (database, table_name, advanced_rules[database][table_name])
+                    )
+        return tables_to_fetch
+
+    async def _table_changed(self, database, table, update_time):
+        """Checks whether a table changed since the last successful sync.
+
+        Tables are compared on their UPDATE_TIME, or on `CHECKSUM TABLE` for the
+        engines that don't maintain it. The state is recorded for the next sync.
 
         Args:
             database (str): Name of database
             table (str): Name of table
-            query (str): Query to fetch data from a table
+            update_time (datetime): UPDATE_TIME of the table
 
-        Yields:
-            Dict: Document to be indexed
+        Returns:
+            boolean: False when the table is known to be unchanged
+        """
+        state = {"update_time": None, "checksum": None}
+        if update_time is not None:
+            state["update_time"] = update_time.isoformat()
+        else:
+            checksum = await anext(
+                self._connect(
+                    query=QUERIES["TABLE_CHECKSUM"], database=database, table=table
+                )
+            )
+            state["checksum"] = checksum[0][1] if checksum else None
+
+        if state["update_time"] is None and state["checksum"] is None:
+            return True
+
+        self.table_states[(database, table)] = state
+        return self._last_table_states.get((database, table)) != state
+
+    def _load_sync_cursor(self, filtering):
+        """Reads the table states and high-water marks saved by the last successful sync.
+
+        They are discarded when the filtering or the options shaping the
+        documents changed since then. When syncing
+        incrementally, it also decides whether this sync has to be a full one.
+
+        Returns:
+            str: Digest of the filtering, to save in the next sync cursor
+        """
+        filtering_digest = digest_filtering(filtering)
+        sync_cursor = self.sync_cursor() or {}
+        if (
+            sync_cursor.get("filtering") != filtering_digest
+            or sync_cursor.get("options") != self._digest_options()
+        ):
+            sync_cursor = {}
+
+        self.table_states = {}
+        self.high_water_marks = {}
+        self.kept_tables = set()
+        self.binlog_checkpoint = None
+        self.changes_only = False
+        self._last_binlog_checkpoint = sync_cursor.get("binlog")
+        self._last_table_states = {
+            (table_state["database"], table_state["table"]): {
+                "update_time": table_state.get("update_time"),
+                "checksum": table_state.get("checksum"),
+            }
+            for table_state in sync_cursor.get("tables", [])
+        }
+        incremental_column = self.configuration["incremental_column"]
+        self._last_high_water_marks = {
+            (mark["database"], mark["table"]): mark["value"]
+            for mark in sync_cursor.get("high_water_marks", [])
+            if mark["column"] == incremental_column
+        }
+
+        self.last_full_sync = sync_cursor.get("last_full_sync")
+        full_sync_interval = timedelta(
+            hours=int(
+                self.configuration.get("full_sync_interval", DEFAULT_FULL_SYNC_INTERVAL)
+            )
+        )
+        now = datetime.now(timezone.utc)
+        self.full_sync = (
+            self.last_full_sync is None
+            or datetime.fromisoformat(self.last_full_sync) + full_sync_interval <= now
+        )
+        if self.full_sync:
+            self.last_full_sync = now.isoformat()
+            self._last_high_water_marks = {}
+        elif incremental_column:
+            logger.info(
+                f"Fetching rows changed since the last sync, next full sync after {datetime.fromisoformat(self.last_full_sync) + full_sync_interval}."
+            )
+        return filtering_digest
+
+    def _digest_options(self):
+        """Returns a digest of the options shaping the documents, to tell whether
+        they changed since a sync."""
+        options = {}
+        for name in DOCUMENT_OPTIONS:
+            if name in COLUMN_POLICIES:
+                options[name] = sorted(self._configured_columns(name))
+            else:
+                options[name] = self.configuration.get(name)
+        return json.dumps(options, sort_keys=True, default=str)
+
+    def _build_sync_cursor(self, filtering_digest):
+        return {
+            "filtering": filtering_digest,
+            "options": self._digest_options(),
+            "last_full_sync": self.last_full_sync,
+            "tables": [
+                {"database": database, "table": table, **state}
+                for (database, table), state in self.table_states.items()
+            ],
+            "high_water_marks": [
+                {
+                    "database": database,
+                    "table": table,
+                    "column": self.configuration["incremental_column"],
+                    "value": value,
+                }
+                for (database, table), value in self.high_water_marks.items()
+            ],
+            "binlog": self.binlog_checkpoint,
+            "databases_state": self.databases_state,
+        }
+
+    def _resumable(self):
+        # rows of tables read concurrently are interleaved, and resuming would
+        # break the consistency of a snapshot or of the binlog position
+        return (
+            self.configuration["resumable_syncs"]
+            and not self.configuration["cdc"]
+            and not self.configuration["consistent_snapshot"]
+            and int(
+                self.configuration.get("concurrent_tables", DEFAULT_CONCURRENT_TABLES)
+            )
+            <= 1
+        )
+
+    def set_filtering(self, filtering):
+        self.next_filtering = filtering
+
+    def set_sync_checkpoint(self, checkpoint):
+        self.resume_from = checkpoint
+
+    def sync_checkpoint(self):
+        """Returns the tables read completely and the position of the last row
+        yielded, with its primary key when the table is read in its order.
         """
+        if not self._resumable() or self.changes_only or self.position is None:
+            return None
+        database, table, key = self.position
+        return {
+            "filtering": self.filtering_digest,
+            "completed_tables": [list(table) for table in self.completed_tables],
+            "database": database,
+            "table": table,
+            "key": key,
+        }
+
+    def _resume(self, filtering):
+        """Restores the position of the checkpoint of the last sync, when there's one."""
+        self.resumed = False
+        self.resume_keys = {}
+        self.completed_tables = []
+        self.position = None
+        self.ordered_tables = {}
+        self.last_keys = {}
+        self.filtering_digest = digest_filtering(filtering)
+
+        checkpoint = self.resume_from
+        if checkpoint is None or not self._resumable():
+            return
+        if checkpoint.get("filtering") != self.filtering_digest:
+            logger.info(
+                "The filtering changed since the last sync was interrupted, reading all the tables again."
+            )
+            return
+
+        self.resumed = True
+        self.completed_tables = [
+            tuple(table) for table in checkpoint.get("completed_tables", [])
+        ]
+        database, table, key = (
+            checkpoint["database"],
+            checkpoint["table"],
+            checkpoint.get("key"),
+        )
+        self.position = (database, table, key)
+        if key is not None:
+            self.resume_keys[(database, table)] = decode_key(key)
+        logger.info(
+            f"Resuming the last sync from table {table} of database {database}, {len(self.completed_tables)} tables were read completely."
+        )
+
+    def _track_position(self, doc):
+        if "_op_type" in doc or "Database" not in doc:
+            return
+        table = (doc["Database"], doc["Table"])
+        if self.position is not None and self.position[:2] != table:
+            self.completed_tables.append(self.position[:2])
+        key = None
+        if self.ordered_tables.get(table):
+            # the values read from the table, the document holds serialized ones
+            key = encode_key(self.last_keys.get(table))
+        self.position = (*table, key)
+
+    def _keep_table(self, database, table):
+        """Keeps the documents of a table that isn't read, and its state of the last sync."""
+        self.kept_tables.add(f"{database}_{table}_")
+        if (database, table) in self._last_high_water_marks:
+            self.high_water_marks[(database, table)] = self._last_high_water_marks[
+                (database, table)
+            ]
+
+    async def _fetch_databases_state(self, databases):
+        """Returns a summary of the state of the databases, which changes with their content.
+
+        It's made of the number of tables, their latest UPDATE_TIME and CREATE_TIME,
+        and the GTIDs executed by the server, or the position of its binary log when
+        GTIDs are disabled.
 
+        Args:
+            databases (list): Names of the databases
+
+        Returns:
+            dict: State of the databases, or None when changes can't be told from it
+        """
+        tables_count, update_time, create_time, gtid_executed = (
+            await anext(
+                self._connect(
+                    query=QUERIES["DATABASES_STATE"],
+                    session_query=await self._statistics_session_query(),
+                    query_args=tuple(databases),
+                    databases=", ".join(["%s"] * len(databases)),
+                )
+            )
+        )[0]
+        binlog_position = None
+        if not gtid_executed:
+            binlog_status = await anext(
+                self._connect(query=QUERIES["BINARY_LOG_STATUS"])
+            )
+            if binlog_status:
+                binlog_position = f"{binlog_status[0][0]}:{binlog_status[0][1]}"
+
+        if update_time is None and not gtid_executed and binlog_position is None:
+            # the engines of the tables don't record their changes
+            return None
+
+        return {
+            "tables": tables_count,
+            "update_time": update_time.isoformat() if update_time else None,
+            "create_time": create_time.isoformat() if create_time else None,
+            "gtid_executed": gtid_executed or None,
+            "binlog_position": binlog_position,
+        }
+
+    async def changed(self):
+        """Checks whether the configured databases changed since the last successful sync.
+
+        The state of the databases is compared with the one saved in the sync
+        cursor, at the start of the last sync. Syncs are never skipped when the
+        state can't be told, when a full sync is due, or when the filtering or
+        the options shaping the documents changed since the last sync.
+
+        Returns:
+            boolean: False when the databases are known to be unchanged
+        """
+        if not self.configuration["skip_idle_syncs"]:
+            return True
+
+        sync_cursor = self.sync_cursor() or {}
+        last_state = sync_cursor.get("databases_state")
+        if last_state is None:
+            return True
+
+        if sync_cursor.get("options") != self._digest_options():
+            return True
+        if self.next_filtering is not None and sync_cursor.get(
+            "filtering"
+        ) != digest_filtering(self.next_filtering):
+            return True
+
+        if self.configuration["incremental_column"]:
+            full_sync_interval = timedelta(
+                hours=int(
+                    self.configuration.get(
+                        "full_sync_interval", DEFAULT_FULL_SYNC_INTERVAL
+                    )
+                )
+            )
+            last_full_sync = sync_cursor.get("last_full_sync")
+            if last_full_sync is None or datetime.fromisoformat(
+                last_full_sync
+            ) + full_sync_interval <= datetime.now(timezone.utc):
+                return True
+
+        try:
+            if self.connection_pool is None:
+                await self.ping()
+            state = await self._fetch_databases_state(
+                databases=self.configured_databases()
+            )
+        except Exception as exception:
+            logger.warning(
+                f"Could not tell whether the databases changed, syncing anyway. Exception: {exception}"
+            )
+            return True
+        return state is None or state != last_state
+
+    def should_delete(self, doc_id):
+        """Keeps the documents of the tables skipped because they did not change,
+        were read before the resumed sync was interrupted, or only read since their
+        high-water mark or resume key, and all of them when only the changes of the
+        binary log were read.
+
+        Document ids start with `{database}_{table}_`, where names can contain underscores,
+        so every prefix ending with an underscore is looked up.
+        """
+        if self.changes_only:
+            return False
+        index = doc_id.find("_")
+        while index != -1:
+            if doc_id[: index + 1] in self.kept_tables:
+                return False
+            index = doc_id.find("_", index + 1)
+        return True
+
+    async def _fetch_primary_keys(self, database, table):
+        metadata = self._table_metadata(database=database, table=table)
+        if metadata is not None:
+            return metadata["primary_keys"]
         primary_key = await anext(
             self._connect(
                 query=QUERIES["TABLE_PRIMARY_KEY"], database=database, table=table
             )
         )
+        return [column_name[0] for column_name in primary_key]
 
-        keys = []
-        for column_name in primary_key:
-            keys.append(f"{database}_{table}_{column_name[0]}")
+    def _document_id(self, database, table, keys, row):
+        keys_value = ""
+        for key in keys:
+            keys_value += f"{row.get(key)}_" if row.get(key) is not None else ""
+        return f"{database}_{table}_{keys_value}"
 
-        if keys:
+    def _format_document(self, database, table, keys, row, timestamp):
+        """Turns a row, with columns prefixed by database and table names, into a document.
+
+        Args:
+            database (str): Name of database
+            table (str): Name of table
+            keys (list): Prefixed primary key columns
+            row (dict): Values of the row
+            timestamp (datetime): Last time the row changed
+
+        Returns:
+            Dict: Document to be indexed
+        """
+        row.update(
+            {
+                "_id": self._document_id(
+                    database=database, table=table, keys=keys, row=row
+                ),
+                "_timestamp": timestamp,
+                "Database": database,
+                "Table": table,
+            }
+        )
+        document = self.serialize(doc=row)
+        if self.configuration.get("content_hash", DEFAULT_CONTENT_HASH):
+            document[CONTENT_HASH_FIELD] = content_hash(document)
+        return document
+
+    async def _fetch_binlog_position(self):
+        """Returns the current position of the binary log, to read changes from."""
+        return parse_binlog_status(
+            await anext(self._connect(query=QUERIES["BINARY_LOG_STATUS"]))
+        )
+
+    async def _binlog_available(self, checkpoint):
+        """Checks that the binary log still has all the changes since the checkpoint."""
+        if checkpoint.get("gtid_set"):
+            purged = await anext(
+                self._connect(
+                    query=QUERIES["GTID_PURGED_IN"],
+                    query_args=(checkpoint["gtid_set"],),
+                )
+            )
+            return bool(purged and purged[0][0])
+        binary_logs = await anext(self._connect(query=QUERIES["BINARY_LOGS"]))
+        return checkpoint["log_file"] in {binary_log[0] for binary_log in binary_logs}
+
+    async def fetch_binlog_changes(self, databases, checkpoint):
+        """Turns the row changes of the binary log since the checkpoint into documents.
+
+        Args:
+            databases (list): Names of databases to read the changes of
+            checkpoint (dict): Position to read from
+
+        Yields:
+            Dict: Document to be indexed, or deleted when it has `_op_type` set to `delete`
+        """
+        reader = BinlogReader(
+            connection_settings=self._connection_settings(),
+            server_id=int(
+                self.configuration.get("cdc_server_id", DEFAULT_CDC_SERVER_ID)
+            ),
+            databases=databases,
+            checkpoint=checkpoint,
+        )
+        table_keys = {}
+        policies = {}
+
+        async for change in reader.changes():
+            operation, database, table, values, previous_values, timestamp = change
+            if (database, table) not in table_keys:
+                table_keys[(database, table)] = await self._fetch_primary_keys(
+                    database=database, table=table
+                )
+            primary_keys = table_keys[(database, table)]
+            keys = [f"{database}_{table}_{key}" for key in primary_keys]
+            if not keys:
+                continue
+            if operation != "delete":
+                values = self._apply_column_policies(
+                    database=database,
+                    table=table,
+                    values=values,
+                    primary_keys=primary_keys,
+                    policies=policies,
+                )
+
+            row = {
+                f"{database}_{table}_{column}": value
+                for column, value in values.items()
+            }
+            if operation == "delete":
+                yield {
+                    "_id": self._document_id(
+                        database=database, table=table, keys=keys, row=row
+                    ),
+                    "_op_type": "delete",
+                }
+                continue
+
+            document = self._format_document(
+                database=database, table=table, keys=keys, row=row, timestamp=timestamp
+            )
+            if previous_values is not None:
+                previous_id = self._document_id(
+                    database=database,
+                    table=table,
+                    keys=keys,
+                    row={
+                        f"{database}_{table}_{column}": value
+                        for column, value in previous_values.items()
+                    },
+                )
+                # the primary key was updated
+                if previous_id != document["_id"]:
+                    yield {"_id": previous_id, "_op_type": "delete"}
+            yield document
+
+        self.binlog_checkpoint = None if reader.schema_changed else reader.checkpoint
+
+    def _apply_column_policies(self, database, table, values, primary_keys, policies):
+        """Applies the column policies to the values of a row of the binary log,
+        like the select list of the scans does.
+
+        Excluded and deferred columns are left out, the deferred ones being
+        recorded to be downloaded lazily, and truncated ones are cut. Compressed
+        columns are only compressed for the transfer, their values are kept.
 
-            last_update_time = await anext(
+        Args:
+            database (str): Name of database
+            table (str): Name of table
+            values (dict): Values of the row, by column name
+            primary_keys (list): Primary key columns of the table
+            policies (dict): Policy of each column, filled as columns are seen
+
+        Returns:
+            dict: Values to index, by column name
+        """
+        truncate_size = int(
+            self.configuration.get("truncate_size", DEFAULT_TRUNCATE_SIZE)
+        )
+        kept, deferred = {}, []
+        for column, value in values.items():
+            if (table, column) not in policies:
+                policies[(table, column)] = (
+                    None
+                    if column in primary_keys
+                    else self._column_policy(table=table, column=column)
+                )
+            policy = policies[(table, column)]
+            if policy == EXCLUDE:
+                continue
+            if policy == DEFER:
+                deferred.append(column)
+                continue
+            if policy == TRUNCATE and isinstance(value, (str, bytes)):
+                value = value[:truncate_size]
+            kept[column] = value
+        if deferred:
+            self.deferred_columns[(database, table)] = (deferred, primary_keys)
+        return kept
+
+    def _configured_columns(self, name):
+        columns = self.configuration[name]
+        if isinstance(columns, str):
+            columns = columns.split(",")
+        return {column.strip() for column in columns if column.strip()}
+
+    def _column_policy(self, table, column):
+        """Returns whether a column is excluded, truncated or deferred, or None."""
+        for name, policy in COLUMN_POLICIES.items():
+            columns = self._configured_columns(name)
+            if column in columns or f"{table}.{column}" in columns:
+                return policy
+        return None
+
+    async def _select_columns(self, database, table, primary_keys):
+        """Returns the select list of a table, following the column policies.
+
+        Excluded and deferred columns are left out, truncated ones are cut
+        and compressed text and binary ones are compressed server-side. The
+        deferred columns of the table are recorded, to be downloaded lazily,
+        and the compressed ones to be uncompressed. Primary key columns are
+        always fetched.
+
+        Args:
+            database (str): Name of database
+            table (str): Name of table
+            primary_keys (list): Primary key columns of the table
+
+        Returns:
+            str: Select list of the columns to fetch
+        """
+        if not any(self._configured_columns(name) for name in COLUMN_POLICIES):
+            return "*"
+
+        metadata = self._table_metadata(database=database, table=table)
+        column_types = None
+        if metadata is not None:
+            columns = list(metadata["columns"])
+            column_types = metadata["columns"]
+        else:
+            column_names = await anext(
                 self._connect(
-                    query=QUERIES["TABLE_LAST_UPDATE_TIME"],
+                    query=QUERIES["TABLE_COLUMNS"],
+                    fetch_many=True,
                     database=database,
                     table=table,
+                    columns="*",
+                )
+            )
+            prefix = f"{database}_{table}_"
+            columns = [column_name.removeprefix(prefix) for column_name in column_names]
+
+        truncate_size = int(
+            self.configuration.get("truncate_size", DEFAULT_TRUNCATE_SIZE)
+        )
+        select, deferred, compressed = [], [], []
+        for column in columns:
+            policy = (
+                None
+                if column in primary_keys
+                else self._column_policy(table=table, column=column)
+            )
+            if policy == COMPRESS:
+                if column_types is None:
+                    column_types = await self._fetch_column_types(
+                        database=database, table=table
+                    )
+                if column_types.get(column) not in COMPRESSIBLE_TYPES:
+                    logger.debug(
+                        f"Not compressing column {column} of table {table} from database {database}, only text and binary columns are."
+                    )
+                    policy = None
+            if policy == DEFER:
+                deferred.append(column)
+            elif policy == TRUNCATE:
+                select.append(
+                    f"LEFT({quote_identifier(column)}, {truncate_size}) AS {quote_identifier(column)}"
+                )
+            elif policy == COMPRESS:
+                compressed.append(column)
+                select.append(
+                    f"COMPRESS({quote_identifier(column)}) AS {quote_identifier(column)}"
+                )
+            elif policy != EXCLUDE:
+                select.append(quote_identifier(column))
+
+        if deferred:
+            self.deferred_columns[(database, table)] = (deferred, primary_keys)
+        if compressed:
+            self.compressed_columns[(database, table)] = compressed
+        return ", ".join(select)
+
+    async def _basic_rules_filter(self, database, table):
+        """Translates the leading basic rules that apply to a table into a SQL filter.
+
+        Rules are applied in order and the first one matching a document decides
+        whether it's ingested. They are translated until the first rule that
+        can't be, which with all the following ones is left to the basic rule
+        engine. Rules on fields the documents of the table don't have never
+        match, and rules on the database or table name match all the rows or
+        none of them.
+
+        Rows excluded by the filter are counted by rule, to be reported in
+        `basic_rules_matches`.
+
+        Args:
+            database (str): Name of database
+            table (str): Name of table
+
+        Returns:
+            tuple: Condition selecting the rows to fetch and its query parameters, or None
+        """
+        if not self.basic_rules:
+            return None
+
+        if self._table_metadata(database=database, table=table) is None:
+            await self.fetch_catalog(database=database)
+        metadata = self._table_metadata(database=database, table=table)
+        if metadata is None:
+            return None
+
+        prefix = f"{database}_{table}_"
+        rules, conditions = [], []
+        for rule in self.basic_rules:
+            if rule.field in ("Database", "Table"):
+                if not rule.matches({"Database": database, "Table": table}):
+                    continue
+                condition = None
+            elif rule.field in DOCUMENT_FIELDS:
+                break
+            elif rule.field.removeprefix(prefix) in metadata["columns"]:
+                column = rule.field.removeprefix(prefix)
+                policy = (
+                    None
+                    if column in metadata["primary_keys"]
+                    else self._column_policy(table=table, column=column)
                 )
+                if policy == TRUNCATE:
+                    # the document has the truncated value
+                    break
+                if policy in (EXCLUDE, DEFER):
+                    # excluded and deferred columns are not in the document
+                    continue
+                condition = basic_rule_condition(
+                    rule=rule, column=column, column_type=metadata["columns"][column]
+                )
+                if condition is None:
+                    break
+            else:
+                # fields of other tables
+                continue
+            rules.append(rule)
+            conditions.append(condition)
+            if condition is None:
+                break
+
+        if not any(not rule.is_include() for rule in rules):
+            return None
+
+        keep, keep_args = case_expression(
+            conditions=conditions,
+            values=[int(rule.is_include()) for rule in rules],
+            default=1,
+        )
+        rule_index, rule_index_args = case_expression(
+            conditions=conditions, values=list(range(len(rules))), default="NULL"
+        )
+        matches = await anext(
+            self._connect(
+                query=QUERIES["TABLE_MATCHES"],
+                query_args=tuple(rule_index_args + keep_args),
+                database=database,
+                table=table,
+                rule=rule_index,
+                where=f"({keep}) = 0",
+            )
+        )
+        for index, matches_count in matches:
+            if index is not None:
+                rule_id = rules[int(index)].id_
+                self.rules_matches[rule_id] = (
+                    self.rules_matches.get(rule_id, 0) + matches_count
+                )
+
+        return f"({keep}) = 1", keep_args
+
+    def basic_rules_matches(self):
+        """Returns how many rows each basic rule applied in the queries excluded."""
+        return self.rules_matches
+
+    def _lazy_download(self, doc):
+        """Returns the callback downloading the deferred columns of a document, or None."""
+        database, table = doc.get("Database"), doc.get("Table")
+        if (database, table) not in self.deferred_columns:
+            return None
+        columns, primary_keys = self.deferred_columns[(database, table)]
+        return functools.partial(
+            self._download_deferred_columns,
+            database=database,
+            table=table,
+            columns=columns,
+            primary_keys=primary_keys,
+            key_values=tuple(
+                doc.get(f"{database}_{table}_{key}") for key in primary_keys
+            ),
+        )
+
+    async def _download_deferred_columns(
+        self,
+        database,
+        table,
+        columns,
+        primary_keys,
+        key_values,
+        timestamp=None,
+        doit=None,
+    ):
+        """Fetches the deferred columns of a row by its primary key.
+
+        Args:
+            database (str): Name of database
+            table (str): Name of table
+            columns (list): Deferred columns
+            primary_keys (list): Primary key columns of the table
+            key_values (tuple): Primary key of the row
+            timestamp (timestamp, optional): Timestamp of the document. Defaults to None.
+            doit (boolean, optional): Boolean value for whether to get content or not. Defaults to None.
+
+        Returns:
+            dictionary: Values of the deferred columns, prefixed by database and table names
+        """
+        if not doit:
+            return
+
+        rows = await anext(
+            self._connect(
+                query=QUERIES["TABLE_ROW"],
+                query_args=key_values,
+                database=database,
+                table=table,
+                columns=", ".join(map(quote_identifier, columns)),
+                where=" AND ".join(
+                    f"{quote_identifier(key)} = %s" for key in primary_keys
+                ),
             )
-            last_update_time = last_update_time[0][0]
+        )
+        if not rows:
+            return
+        return self.serialize(
+            doc={
+                f"{database}_{table}_{column}": value
+                for column, value in zip(columns, rows[0])
+            }
+        )
+
+    async def fetch_documents(self, database, table, query=QUERIES["TABLE_DATA"]):
+        """Fetches all the table entries and format them in Elasticsearch documents
+
+        Args:
+            database (str): Name of database
+            table (str): Name of table
+            query (str): Query to fetch data from a table
+
+        Yields:
+            Dict: Document to be indexed
+        """
+
+        if (database, table) in self.completed_tables:
+            logger.debug(
+                f"Skipping {table} table from database {database} since it was read before the last sync was interrupted."
+            )
+            self._keep_table(database=database, table=table)
+            if (database, table) in self._last_table_states:
+                self.table_states[(database, table)] = self._last_table_states[
+                    (database, table)
+                ]
+            return
+
+        metadata = self._table_metadata(database=database, table=table)
+        primary_keys = await self._fetch_primary_keys(database=database, table=table)
+        await self._check_replicas()
+        keys = [f"{database}_{table}_{key}" for key in primary_keys]
+
+        if keys:
+            if metadata is not None:
+                last_update_time = metadata["update_time"]
+            else:
+                last_update_time = await anext(
+                    self._connect(
+                        query=QUERIES["TABLE_LAST_UPDATE_TIME"],
+                        session_query=await self._statistics_session_query(),
+                        database=database,
+                        table=table,
+                    )
+                )
+                last_update_time = last_update_time[0][0]
+
+            if (
+                self.configuration["skip_unchanged_tables"]
+                and query == QUERIES["TABLE_DATA"]
+                and not await self._table_changed(
+                    database=database, table=table, update_time=last_update_time
+                )
+            ):
+                logger.debug(
+                    f"Skipping {table} table from database {database} since it did not change since the last sync."
+                )
+                self._keep_table(database=database, table=table)
+                return
+
+            incremental_column = None
+            if (
+                self.configuration["incremental_column"]
+                and query == QUERIES["TABLE_DATA"]
+                and await self._has_column(
+                    database=database,
+                    table=table,
+                    column=self.configuration["incremental_column"],
+                )
+            ):
+                incremental_column = (
+                    f"{database}_{table}_{self.configuration['incremental_column']}"
+                )
+            high_water_mark = self._last_high_water_marks.get((database, table))
+
+            columns = "*"
+            if query == QUERIES["TABLE_DATA"]:
+                columns = await self._select_columns(
+                    database=database, table=table, primary_keys=primary_keys
+                )
 
-            table_rows = self._connect(
-                query=query, fetch_many=True, database=database, table=table
+            since_high_water_mark = (
+                incremental_column is not None and high_water_mark is not None
             )
+            row_filter = None
+            if query == QUERIES["TABLE_DATA"] and not since_high_water_mark:
+                row_filter = await self._basic_rules_filter(
+                    database=database, table=table
+                )
+
+            column_types = metadata["columns"] if metadata is not None else None
+            decoders = None
+            # the incremental column is compared and stored as a parsed value
+            if (
+                self.configuration.get("raw_rows", DEFAULT_RAW_ROWS)
+                and query == QUERIES["TABLE_DATA"]
+                and incremental_column is None
+            ):
+                if column_types is None:
+                    column_types = await self._fetch_column_types(
+                        database=database, table=table
+                    )
+                decoders = RAW_DECODERS
+
+            resume_key = None
+            if query == QUERIES["TABLE_DATA"] and not since_high_water_mark:
+                resume_key = self.resume_keys.pop((database, table), None)
+
+            shards = int(self.configuration.get("table_shards", DEFAULT_TABLE_SHARDS))
+            if since_high_water_mark:
+                # rows sharing the mark are read again, in case some were committed after the last sync
+                table_rows = self._connect(
+                    query=QUERIES["TABLE_DATA_SINCE"],
+                    fetch_many=True,
+                    table_rows=True,
+                    query_args=(high_water_mark,),
+                    database=database,
+                    table=table,
+                    columns=columns,
+                    column=quote_identifier(self.configuration["incremental_column"]),
+                )
+                self.kept_tables.add(f"{database}_{table}_")
+            elif resume_key is not None:
+                logger.info(
+                    f"Resuming table {table} from database {database} at the primary key {resume_key}."
+                )
+                # the rows before the key were read by the interrupted sync
+                self.kept_tables.add(f"{database}_{table}_")
+                self.ordered_tables[(database, table)] = primary_keys
+                table_rows = self._fetch_rows_by_keyset(
+                    database=database,
+                    table=table,
+                    primary_keys=primary_keys,
+                    lower=tuple(resume_key),
+                    columns=columns,
+                    row_filter=row_filter,
+                    decoders=decoders,
+                )
+            elif shards > 1 and query == QUERIES["TABLE_DATA"]:
+                table_rows = self._fetch_rows_in_shards(
+                    database=database,
+                    table=table,
+                    primary_keys=primary_keys,
+                    shards=shards,
+                    columns=columns,
+                    row_filter=row_filter,
+                    decoders=decoders,
+                )
+            elif (
+                self.configuration["keyset_pagination"]
+                and query == QUERIES["TABLE_DATA"]
+            ):
+                self.ordered_tables[(database, table)] = primary_keys
+                table_rows = self._fetch_rows_by_keyset(
+                    database=database,
+                    table=table,
+                    primary_keys=primary_keys,
+                    columns=columns,
+                    row_filter=row_filter,
+                    decoders=decoders,
+                )
+            elif row_filter is not None:
+                table_rows = self._connect(
+                    query=QUERIES["TABLE_DATA_WHERE"],
+                    fetch_many=True,
+                    table_rows=True,
+                    query_args=tuple(row_filter[1]),
+                    database=database,
+                    table=table,
+                    columns=columns,
+                    where=row_filter[0],
+                    decoders=decoders,
+                )
+            else:
+                table_rows = self._connect(
+                    query=query,
+                    fetch_many=True,
+                    table_rows=True,
+                    database=database,
+                    table=table,
+                    columns=columns,
+                    decoders=decoders,
+                )
             column_names = await anext(table_rows)
+            transform = RowTransformer(
+                database=database,
+                table=table,
+                column_names=column_names,
+                keys=keys,
+                serialize_value=self.serialize_value,
+                column_types=column_types,
+                content_hash=self.configuration.get(
+                    "content_hash", DEFAULT_CONTENT_HASH
+                ),
+                raw_values=decoders is not None,
+                compressed_columns=self.compressed_columns.get((database, table), ()),
+            )
+            incremental_index = (
+                column_names.index(incremental_column)
+                if incremental_column in column_names
+                else None
+            )
+
+            key_indexes = None
+            if (database, table) in self.ordered_tables and all(
+                key in column_names for key in keys
+            ):
+                key_indexes = [column_names.index(key) for key in keys]
 
+            highest_value = None
             async for row in table_rows:
-                row = dict(zip(column_names, row))
-                keys_value = ""
-                for key in keys:
-                    keys_value += f"{row.get(key)}_" if row.get(key) else ""
-                row.update(
-                    {
-                        "_id": f"{database}_{table}_{keys_value}",
-                        "_timestamp": last_update_time,
-                        "Database": database,
-                        "Table": table,
-                    }
-                )
-                yield self.serialize(doc=row)
+                if key_indexes is not None:
+                    self.last_keys[(database, table)] = tuple(
+                        row[index] for index in key_indexes
+                    )
+                timestamp = last_update_time
+                if incremental_index is not None:
+                    value = row[incremental_index]
+                    if value is not None and (
+                        highest_value is None or value > highest_value
+                    ):
+                        highest_value = value
+                    # the row's own timestamp lets unchanged rows be skipped on full syncs
+                    if isinstance(value, datetime):
+                        timestamp = value
+                yield transform(row=row, timestamp=timestamp)
+
+            if incremental_column is not None:
+                if highest_value is not None:
+                    high_water_mark = (
+                        highest_value
+                        if isinstance(highest_value, int)
+                        else str(highest_value)
+                    )
+                if high_water_mark is not None:
+                    self.high_water_marks[(database, table)] = high_water_mark
         else:
             logger.warning(
                 f"Skipping {table} table from database {database} since no primary key is associated with it. Assign primary key to the table to index it in the next sync interval."
@@ -473,31 +3355,36 @@ class MySqlDataSource(BaseDataSource):
             databases = database_config
         return databases
 
-    async def get_docs(self, filtering=None):
-        """Executes the logic to fetch databases, tables and rows in async manner.
+    async def _fetch_rows(self, databases, filtering=None):
+        """Fetches the rows of the tables of the databases, following the advanced rules.
 
         Yields:
-            dictionary: Row dictionary containing meta-data of the row.
+            tuple: Row document and the download of its deferred columns, or None
         """
-        databases = self.configured_databases()
-
-        inaccessible_databases = await self.validate_databases(databases=databases)
-        if inaccessible_databases:
-            raise Exception(
-                f"Configured databases: {inaccessible_databases} are inaccessible for user {self.configuration['user']}."
+        if (
+            int(self.configuration.get("concurrent_tables", DEFAULT_CONCURRENT_TABLES))
+            > 1
+        ):
+            advanced_rules = (
+                filtering.get_advanced_rules()
+                if filtering and filtering.has_advanced_rules()
+                else None
             )
-
-        if filtering and filtering.has_advanced_rules():
+            tables = await self._tables_to_fetch(
+                databases=databases, advanced_rules=advanced_rules
+            )
+            logger.debug(f"Fetching rows from {len(tables)} tables concurrently.")
+            async for row in self.fetch_rows_from_tables(tables=tables):
+                yield row, self._lazy_download(row)
+        elif filtering and filtering.has_advanced_rules():
             for database in databases:
                 advanced_rules = filtering.get_advanced_rules()
 
                 if database in advanced_rules:
                     database_filtering = advanced_rules.get(database, {})
-                    tables = await self.fetch_tables(database)
-
-                    for table in tables:
-                        table_name = table[0]
+                    schema = await self.fetch_schema(databases=[database])
 
+                    for table_name in schema.get(database, []):
                         if table_name in database_filtering:
                             query = database_filtering[table_name]
                             logger.debug(
@@ -513,5 +3400,108 @@ class MySqlDataSource(BaseDataSource):
         else:
             for database in databases:
                 async for row in self.fetch_rows_from_all_tables(database=database):
-                    yield row, None
+                    yield row, self._lazy_download(row)
                 await asyncio.sleep(0)
+
+    async def get_docs(self, filtering=None):
+        """Executes the logic to fetch databases, tables and rows in async manner.
+
+        Yields:
+            dictionary: Row dictionary containing meta-data of the row.
+        """
+        databases = self.configured_databases()
+        self.fetch_sizes = {}
+        self.deferred_columns = {}
+        self.compressed_columns = {}
+        self.rules_matches = {}
+        self.basic_rules = (
+            parse(filtering.basic_rules)
+            if filtering is not None and self.configuration["push_down_basic_rules"]
+            else []
+        )
+
+        inaccessible_databases = await self.validate_databases(databases=databases)
+        if inaccessible_databases:
+            raise Exception(
+                f"Configured databases: {inaccessible_databases} are inaccessible for user {self.configuration['user']}."
+            )
+
+        keep_sync_cursor = (
+            self.configuration["skip_unchanged_tables"]
+            or self.configuration["incremental_column"]
+            or self.configuration["cdc"]
+            or self.configuration["skip_idle_syncs"]
+        )
+        if keep_sync_cursor:
+            filtering_digest = self._load_sync_cursor(filtering=filtering)
+
+        if self.configuration["skip_idle_syncs"]:
+            # changes made while reading the tables are seen by the next check
+            self.databases_state = await self._fetch_databases_state(
+                databases=databases
+            )
+
+        if self.configuration["cdc"]:
+            checkpoint = self._last_binlog_checkpoint
+            if checkpoint is not None and filtering and filtering.has_advanced_rules():
+                logger.warning(
+                    "Changes of the binary log can't be filtered with advanced rules, running a full sync."
+                )
+            elif checkpoint is not None and not await self._binlog_available(
+                checkpoint=checkpoint
+            ):
+                logger.warning(
+                    f"The binary log was purged since {checkpoint}, running a full sync."
+                )
+            elif checkpoint is not None:
+                logger.info(f"Reading changes from the binary log since {checkpoint}.")
+                self.changes_only = True
+                async for doc in self.fetch_binlog_changes(
+                    databases=databases, checkpoint=checkpoint
+                ):
+                    yield doc, self._lazy_download(doc)
+                self.set_sync_cursor(
+                    {
+                        **self.sync_cursor(),
+                        "binlog": self.binlog_checkpoint,
+                        "databases_state": self.databases_state,
+                    }
+                )
+                return
+            if not self.configuration["consistent_snapshot"]:
+                # changes made while reading the tables are read again by the next sync
+                self.binlog_checkpoint = await self._fetch_binlog_position()
+
+        self._resume(filtering=filtering)
+
+        self.catalog = {}
+        if self.configuration["prefetch_metadata"]:
+            for database in databases:
+                await self.fetch_catalog(database=database)
+
+        if self.configuration["consistent_snapshot"]:
+            self.snapshot = ConsistentSnapshot(
+                connection_settings=self._connection_settings(),
+                workers=int(
+                    self.configuration.get(
+                        "concurrent_tables", DEFAULT_CONCURRENT_TABLES
+                    )
+                ),
+            )
+            checkpoint = await self.snapshot.start(
+                binlog_position=self.configuration["cdc"]
+            )
+            if self.configuration["cdc"]:
+                self.binlog_checkpoint = checkpoint
+
+        try:
+            async for row in self._fetch_rows(databases=databases, filtering=filtering):
+                self._track_position(row[0])
+                yield row
+        finally:
+            if self.snapshot is not None:
+                await self.snapshot.close()
+                self.snapshot = None
+
+        if keep_sync_cursor:
+            self.set_sync_cursor(self._build_sync_cursor(filtering_digest))
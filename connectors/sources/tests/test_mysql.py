@@ -5,17 +5,48 @@
 #
 """Tests the MySQL source class methods"""
 import asyncio
+import json
 import ssl
+import struct
+import zlib
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
 from unittest import mock
 from unittest.mock import AsyncMock
 
 import aiomysql
 import pytest
+from pymysql.constants import FIELD_TYPE
+from pymysqlreplication.event import GtidEvent, QueryEvent, XidEvent
+from pymysqlreplication.row_event import (
+    DeleteRowsEvent,
+    UpdateRowsEvent,
+    WriteRowsEvent,
+)
 
 from connectors.byoc import Filter
+from connectors.filtering.basic_rule import BasicRule
 from connectors.filtering.validation import SyncRuleValidationResult
 from connectors.source import DataSourceConfiguration
-from connectors.sources.mysql import MySQLAdvancedRulesValidator, MySqlDataSource
+from connectors.sources.mysql import (
+    QUERIES,
+    RAW_DECODERS,
+    AdaptiveFetchSize,
+    BinlogReader,
+    ConsistentSnapshot,
+    MySQLAdvancedRulesValidator,
+    MySqlDataSource,
+    PoolUsage,
+    Replica,
+    RowTransformer,
+    _streaming_cursor,
+    basic_rule_condition,
+    content_hash,
+    digest_filtering,
+    encode_key,
+    uncompress,
+)
 from connectors.sources.tests.support import create_source
 
 
@@ -85,14 +116,6 @@ def patch_validate_databases():
         yield validate_databases
 
 
-@pytest.fixture
-def patch_fetch_tables():
-    with mock.patch.object(
-        MySqlDataSource, "fetch_tables", side_effect=([])
-    ) as fetch_tables:
-        yield fetch_tables
-
-
 @pytest.fixture
 def patch_ping():
     with mock.patch.object(MySqlDataSource, "ping", return_value=AsyncMock()) as ping:
@@ -105,6 +128,13 @@ def patch_fetch_rows_for_table():
         yield mock_to_patch
 
 
+@pytest.fixture(autouse=True)
+def clear_schema_cache():
+    MySqlDataSource.schema_cache.clear()
+    yield
+    MySqlDataSource.schema_cache.clear()
+
+
 @pytest.fixture
 def patch_default_wait_multiplier():
     with mock.patch("connectors.sources.mysql.RETRY_INTERVAL", 0):
@@ -161,7 +191,7 @@ class Cursor:
     async def scroll(self, *args, **kw):
         raise Exception("Incomplete Read Error")
 
-    def execute(self, query):
+    def execute(self, query, args=None):
         """This method returns future object"""
         futures_object = asyncio.Future()
         futures_object.set_result(mock.MagicMock())
@@ -278,6 +308,109 @@ async def test_ping_negative(patch_logger):
             await source.ping()
 
 
+@pytest.mark.asyncio
+async def test_ping_with_pool_settings(patch_logger):
+    """Test ping method of MySQL creates the pool with the configured settings"""
+    # Setup
+    source = create_source(
+        MySqlDataSource,
+        pool_min_size=4,
+        pool_max_size=20,
+        pool_recycle=3600,
+        connect_timeout=5,
+        query_timeout=30,
+    )
+    pool = mock.MagicMock()
+    pool.acquire = Connection
+
+    with mock.patch.object(
+        aiomysql, "create_pool", AsyncMock(return_value=pool)
+    ) as create_pool:
+        # Execute
+        await source.ping()
+
+    # Assert
+    settings = create_pool.call_args.kwargs
+    assert settings["minsize"] == 4
+    assert settings["maxsize"] == 20
+    assert settings["pool_recycle"] == 3600
+    assert settings["connect_timeout"] == 5
+    assert settings["init_command"] == "SET SESSION MAX_EXECUTION_TIME=30000"
+
+
+@pytest.mark.asyncio
+async def test_pool_usage():
+    """Test PoolUsage counts the connections in use and the queries waiting for one"""
+    # Setup
+    usage = PoolUsage()
+    connections = asyncio.Semaphore(2)
+
+    class Pool:
+        minsize = 1
+        maxsize = 2
+        size = 2
+        freesize = 0
+
+        @asynccontextmanager
+        async def acquire(self):
+            async with connections:
+                yield Connection()
+
+    pool = Pool()
+
+    async def _query():
+        async with usage.acquire(pool):
+            await asyncio.sleep(0.01)
+
+    # Execute
+    await asyncio.gather(*[_query() for _ in range(5)])
+
+    # Assert
+    assert usage.stats(pool) == {
+        "min_size": 1,
+        "max_size": 2,
+        "size": 2,
+        "in_use": 0,
+        "idle": 0,
+        "waiters": 0,
+        "peak_in_use": 2,
+        "peak_waiters": 3,
+    }
+
+
+@pytest.mark.asyncio
+async def test_connect_with_read_timeout(patch_logger, patch_default_wait_multiplier):
+    """Test _connect method of MySQL gives up on queries hanging longer than read_timeout"""
+    # Setup
+    source = create_source(MySqlDataSource, retry_count=2)
+    source.read_timeout = 0.01
+    connection = mock.MagicMock()
+    cursor = mock.MagicMock()
+
+    @asynccontextmanager
+    async def _cursor(cursor_class):
+        yield cursor
+
+    @asynccontextmanager
+    async def _acquire():
+        yield connection
+
+    async def _hang(query, args):
+        await asyncio.sleep(1)
+
+    cursor.execute = _hang
+    connection.cursor = _cursor
+    source.connection_pool = mock.MagicMock()
+    source.connection_pool.acquire = _acquire
+
+    # Execute
+    with pytest.raises(asyncio.TimeoutError):
+        await anext(source._connect(query=QUERIES["ALL_DATABASE"]))
+
+    # Assert
+    assert connection.close.call_count == 2
+
+
 @pytest.mark.asyncio
 async def test_connect_with_retry(patch_logger, patch_default_wait_multiplier):
     """Test _connect method of MySQL with retry"""
@@ -558,6 +691,11 @@ async def test_get_docs_with_advanced_rules(
     filtering, expected_docs, patch_validate_databases, patch_fetch_rows_for_table
 ):
     source = await setup_mysql_source([DB_ONE, DB_TWO])
+    source.fetch_schema = AsyncMock(
+        side_effect=lambda databases: {
+            database: [TABLE_ONE, TABLE_TWO] for database in databases
+        }
+    )
     docs_in_db = setup_available_docs(filtering["advanced_snippet"])
     patch_fetch_rows_for_table.return_value = AsyncIter(items=docs_in_db)
 
@@ -616,6 +754,49 @@ def test_validate_configuration_with_port():
         source._validate_configuration()
 
 
+def test_validate_configuration_with_deferred_columns_in_a_snapshot():
+    """This function test _validate_configuration method of MySQL rejects deferred columns with a consistent snapshot"""
+    # Setup
+    source = create_source(
+        MySqlDataSource, consistent_snapshot=True, deferred_columns="notes"
+    )
+    source.configuration.get_field("consistent_snapshot").type = "bool"
+
+    # Execute
+    with pytest.raises(Exception, match="consistent snapshot"):
+        source._validate_configuration()
+
+
+@pytest.mark.parametrize(
+    "concurrent_tables, table_shards, pool_max_size, valid",
+    [
+        (1, 1, 10, True),
+        (3, 3, 10, True),
+        (5, 2, 10, False),
+        (2, 1, 2, False),
+    ],
+)
+def test_validate_configuration_with_deferred_columns_and_concurrent_scans(
+    concurrent_tables, table_shards, pool_max_size, valid
+):
+    """This function test _validate_configuration method of MySQL keeps a pool connection for the deferred columns"""
+    # Setup
+    source = create_source(
+        MySqlDataSource,
+        deferred_columns="notes",
+        concurrent_tables=concurrent_tables,
+        table_shards=table_shards,
+        pool_max_size=pool_max_size,
+    )
+
+    # Execute and Assert
+    if valid:
+        source._validate_configuration()
+    else:
+        with pytest.raises(Exception, match="concurrent scans"):
+            source._validate_configuration()
+
+
 def test_ssl_context():
     """This function test _ssl_context with dummy certificate"""
     # Setup
@@ -627,25 +808,16 @@ def test_ssl_context():
         source._ssl_context(certificate=certificate)
 
 
-async def setup_fetch_tables_side_effect(
-    accessible_databases, datasource, inaccessible_databases
-):
-    fetch_tables_side_effect = []
-    for database in accessible_databases:
-        fetch_tables_side_effect.append(
-            map(
-                lambda table: (table, None),
-                list(datasource[ACCESSIBLE][database].keys()),
-            )
-        )
-    for database in inaccessible_databases:
-        fetch_tables_side_effect.append(
-            map(
-                lambda table: (table, None),
-                list(datasource[INACCESSIBLE][database].keys()),
-            )
-        )
-    return fetch_tables_side_effect
+def options_digest(**options):
+    return create_source(MySqlDataSource, **options)._digest_options()
+
+
+def setup_schema(datasource):
+    schema = {}
+    for databases in datasource.values():
+        for database, tables in databases.items():
+            schema[database] = list(tables.keys())
+    return schema
 
 
 @pytest.mark.parametrize(
@@ -714,7 +886,6 @@ async def test_advanced_rules_validation(
     expected_validation_result,
     patch_configured_databases,
     patch_validate_databases,
-    patch_fetch_tables,
     patch_ping,
 ):
     accessible_databases = list(datasource.get(ACCESSIBLE, {}).keys())
@@ -723,13 +894,2609 @@ async def test_advanced_rules_validation(
 
     patch_configured_databases.return_value = configured_databases
     patch_validate_databases.return_value = inaccessible_databases
-    patch_fetch_tables.side_effect = await setup_fetch_tables_side_effect(
-        accessible_databases, datasource, inaccessible_databases
-    )
 
     source = create_source(MySqlDataSource)
+    source.fetch_schema = AsyncMock(return_value=setup_schema(datasource))
     validation_result = await MySQLAdvancedRulesValidator(source).validate(
         advanced_rules
     )
 
     assert validation_result == expected_validation_result
+
+
+@pytest.mark.asyncio
+async def test_fetch_rows_by_keyset():
+    """Test _fetch_rows_by_keyset method of MySQL with multiple pages"""
+    # Setup
+    source = create_source(MySqlDataSource, page_size=2)
+    column_names = ["db_table_id", "db_table_name"]
+    pages = [
+        [column_names, (1, "one"), (2, "two")],
+        [column_names, (3, "three")],
+    ]
+    calls = []
+
+    def _connect(**kwargs):
+        calls.append(kwargs)
+        return AsyncIter(pages[len(calls) - 1]).__aiter__()
+
+    source._connect = _connect
+
+    # Execute
+    rows = [
+        row
+        async for row in source._fetch_rows_by_keyset(
+            database="db", table="table", primary_keys=["id"]
+        )
+    ]
+
+    # Assert
+    assert rows == [column_names, (1, "one"), (2, "two"), (3, "three")]
+    assert calls[0]["where"] == ""
+    assert calls[0]["query_args"] is None
+    assert calls[1]["where"] == " WHERE (`id`) > (%s)"
+    assert calls[1]["query_args"] == (2,)
+    assert calls[1]["order_by"] == "`id`"
+    assert calls[1]["limit"] == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_documents_with_keyset_pagination():
+    """Test fetch_documents method of MySQL with keyset pagination enabled"""
+    # Setup
+    source = create_source(MySqlDataSource, keyset_pagination=True)
+    source.configuration.get_field("keyset_pagination").type = "bool"
+
+    source.connection_pool = await mock_mysql_response()
+    source.connection_pool.acquire = Connection
+    source.connection_pool.acquire.cursor = Cursor
+    source.connection_pool.acquire.cursor.is_connection_lost = False
+
+    source._fetch_rows_by_keyset = mock.MagicMock(
+        return_value=AsyncIter(
+            [["database_name_table_name_table1"], ("row1",)]
+        ).__aiter__()
+    )
+
+    # Execute
+    documents = [
+        document
+        async for document in source.fetch_documents(
+            database="database_name", table="table_name"
+        )
+    ]
+
+    # Assert
+    source._fetch_rows_by_keyset.assert_called_once_with(
+        database="database_name",
+        table="table_name",
+        primary_keys=["table1", "table2"],
+        columns="*",
+        row_filter=None,
+        decoders=None,
+    )
+    assert documents[0]["_id"] == "database_name_table_name_row1_"
+
+
+@pytest.mark.asyncio
+async def test_fetch_shard_boundaries_with_integer_key():
+    """Test _fetch_shard_boundaries method of MySQL with an integer primary key"""
+    # Setup
+    source = create_source(MySqlDataSource, page_size=10)
+    responses = iter([[(1000,)], [(1, 400)]])
+    source._connect = mock.MagicMock(
+        side_effect=lambda **kwargs: AsyncIter([next(responses)]).__aiter__()
+    )
+
+    # Execute
+    boundaries = await source._fetch_shard_boundaries(
+        database="db", table="table", primary_keys=["id"], shards=4
+    )
+
+    # Assert
+    assert boundaries == [(101,), (201,), (301,)]
+
+
+@pytest.mark.asyncio
+async def test_fetch_shard_boundaries_with_large_integer_key():
+    """Test _fetch_shard_boundaries method of MySQL with the largest BIGINT keys"""
+    # Setup
+    source = create_source(MySqlDataSource, page_size=10)
+    responses = iter([[(1000,)], [(0, 2**64 - 1)]])
+    source._connect = mock.MagicMock(
+        side_effect=lambda **kwargs: AsyncIter([next(responses)]).__aiter__()
+    )
+
+    # Execute
+    boundaries = await source._fetch_shard_boundaries(
+        database="db", table="table", primary_keys=["id"], shards=3
+    )
+
+    # Assert
+    assert boundaries == [(2**64 // 3,), (2**65 // 3,)]
+
+
+@pytest.mark.asyncio
+async def test_fetch_shard_boundaries_with_sampled_keys():
+    """Test _fetch_shard_boundaries method of MySQL with a composite primary key"""
+    # Setup
+    source = create_source(MySqlDataSource, page_size=10)
+    responses = iter([[(90,)], [("b", 1)], [("b", 1)]])
+    source._connect = mock.MagicMock(
+        side_effect=lambda **kwargs: AsyncIter([next(responses)]).__aiter__()
+    )
+
+    # Execute
+    boundaries = await source._fetch_shard_boundaries(
+        database="db", table="table", primary_keys=["name", "id"], shards=3
+    )
+
+    # Assert
+    assert boundaries == [("b", 1)]
+    assert source._connect.call_args_list[1].kwargs["offset"] == 60
+    assert source._connect.call_args_list[2].kwargs["offset"] == 30
+
+
+@pytest.mark.asyncio
+async def test_fetch_shard_boundaries_with_overestimated_row_count(patch_logger):
+    """Test _fetch_shard_boundaries method of MySQL doesn't split a table with fewer rows than estimated"""
+    # Setup
+    source = create_source(MySqlDataSource, page_size=10)
+    responses = iter([[(90,)], []])
+    source._connect = mock.MagicMock(
+        side_effect=lambda **kwargs: AsyncIter([next(responses)]).__aiter__()
+    )
+
+    # Execute
+    boundaries = await source._fetch_shard_boundaries(
+        database="db", table="table", primary_keys=["name", "id"], shards=3
+    )
+
+    # Assert
+    assert boundaries == []
+    assert source._connect.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_shard_boundaries_with_small_table():
+    """Test _fetch_shard_boundaries method of MySQL with a table too small to be split"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    source._connect = mock.MagicMock(return_value=AsyncIter([[(10,)]]).__aiter__())
+
+    # Execute
+    boundaries = await source._fetch_shard_boundaries(
+        database="db", table="table", primary_keys=["id"], shards=4
+    )
+
+    # Assert
+    assert boundaries == []
+
+
+@pytest.mark.asyncio
+async def test_fetch_rows_in_shards():
+    """Test _fetch_rows_in_shards method of MySQL"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    column_names = ["db_table_id"]
+    source._fetch_shard_boundaries = AsyncMock(return_value=[(10,), (20,)])
+    source._connect = mock.MagicMock(return_value=AsyncIter([column_names]).__aiter__())
+    shard_rows = {None: [(1,), (2,)], (10,): [(10,), (11,)], (20,): [(25,)]}
+    source._fetch_rows_by_keyset = mock.MagicMock(
+        side_effect=lambda **kwargs: AsyncIter(
+            [column_names] + shard_rows[kwargs["lower"]]
+        ).__aiter__()
+    )
+
+    # Execute
+    rows = [
+        row
+        async for row in source._fetch_rows_in_shards(
+            database="db", table="table", primary_keys=["id"], shards=3
+        )
+    ]
+
+    # Assert
+    assert rows[0] == column_names
+    assert sorted(rows[1:]) == [(1,), (2,), (10,), (11,), (25,)]
+    assert [
+        (call.kwargs["lower"], call.kwargs["upper"])
+        for call in source._fetch_rows_by_keyset.call_args_list
+    ] == [(None, (10,)), ((10,), (20,)), ((20,), None)]
+
+
+@pytest.mark.asyncio
+async def test_fetch_rows_from_tables():
+    """Test fetch_rows_from_tables method of MySQL interleaves the rows of the tables"""
+    # Setup
+    source = create_source(MySqlDataSource, concurrent_tables=2, max_in_flight_rows=1)
+
+    async def _fetch_rows_for_table(database, table, query):
+        for i in range(3 if table == "big" else 1):
+            await asyncio.sleep(0)
+            yield {"_id": f"{database}_{table}_{i}"}
+
+    source.fetch_rows_for_table = _fetch_rows_for_table
+
+    # Execute
+    rows = [
+        row["_id"]
+        async for row in source.fetch_rows_from_tables(
+            tables=[
+                ("db", "big", "query"),
+                ("db", "small", "query"),
+                ("db", "other", "query"),
+            ]
+        )
+    ]
+
+    # Assert
+    assert sorted(rows) == [
+        "db_big_0",
+        "db_big_1",
+        "db_big_2",
+        "db_other_0",
+        "db_small_0",
+    ]
+    assert rows.index("db_small_0") < rows.index("db_big_2")
+
+
+@pytest.mark.asyncio
+async def test_get_docs_with_concurrent_tables(patch_validate_databases):
+    """Test get_docs method of MySQL reading tables concurrently"""
+    # Setup
+    source = create_source(MySqlDataSource, concurrent_tables=4)
+    source.configuration.set_field(name="database", value=["db_1", "db_2"])
+    source.fetch_tables = AsyncMock(side_effect=[[("table_1",), ("table_2",)], []])
+    source.fetch_rows_for_table = mock.MagicMock(
+        side_effect=lambda database, table, query: AsyncIter(
+            [{"_id": f"{database}_{table}"}]
+        ).__aiter__()
+    )
+
+    # Execute
+    docs = [doc["_id"] async for doc, _ in source.get_docs()]
+
+    # Assert
+    assert sorted(docs) == ["db_1_table_1", "db_1_table_2"]
+    source.fetch_rows_for_table.assert_any_call(
+        database="db_1", table="table_1", query=QUERIES["TABLE_DATA"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_fetch_catalog():
+    """Test fetch_catalog method of MySQL"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    responses = iter(
+        [
+            [("table_1", "2023-01-01", 10), ("table_2", None, 0)],
+            [
+                ("table_1", "id", "int", "PRI"),
+                ("table_1", "name", "varchar", ""),
+                ("table_2", "code", "varchar", "PRI"),
+                ("table_2", "id", "int", "PRI"),
+                ("table_3", "id", "int", "PRI"),
+            ],
+        ]
+    )
+    source._connect = mock.MagicMock(
+        side_effect=lambda **kwargs: AsyncIter([next(responses)]).__aiter__()
+    )
+
+    # Execute
+    catalog = await source.fetch_catalog(database="db")
+
+    # Assert
+    assert catalog == {
+        "table_1": {
+            "primary_keys": ["id"],
+            "columns": {"id": "int", "name": "varchar"},
+            "update_time": "2023-01-01",
+            "row_count": 10,
+        },
+        "table_2": {
+            "primary_keys": ["code", "id"],
+            "columns": {"code": "varchar", "id": "int"},
+            "update_time": None,
+            "row_count": 0,
+        },
+    }
+    assert source.catalog == {"db": catalog}
+
+
+def mysql_compress(value):
+    """Compresses a value like MySQL's COMPRESS()"""
+    if not value:
+        return value
+    return struct.pack("<I", len(value)) + zlib.compress(value)
+
+
+@pytest.mark.parametrize(
+    "value, expected_value",
+    [(None, None), (b"", b""), (b"text " * 100, b"text " * 100)],
+)
+def test_uncompress(value, expected_value):
+    """Test uncompress reverses MySQL's COMPRESS()"""
+    assert uncompress(mysql_compress(value)) == expected_value
+
+
+def test_row_transformer_with_raw_and_compressed_values():
+    """Test RowTransformer builds the same documents from raw and compressed values"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    column_names = [
+        f"db_table_{column}"
+        for column in ["id", "price", "created", "updated", "description"]
+    ]
+    column_types = {
+        "id": "int",
+        "price": "decimal",
+        "created": "date",
+        "updated": "datetime",
+        "description": "longtext",
+    }
+    keys = ["db_table_id"]
+    description = "description " * 100
+    row = (
+        1,
+        Decimal("10.50"),
+        date(2023, 1, 1),
+        datetime(2023, 1, 1, 10, 30, 15, 250),
+        description,
+    )
+    raw_row = (
+        1,
+        "10.50",
+        "2023-01-01",
+        "2023-01-01 10:30:15.000250",
+        mysql_compress(description.encode()),
+    )
+    timestamp = datetime(2023, 1, 2)
+
+    # Execute
+    transform = RowTransformer(
+        database="db",
+        table="table",
+        column_names=column_names,
+        keys=keys,
+        serialize_value=source.serialize_value,
+        column_types=column_types,
+    )
+    raw_transform = RowTransformer(
+        database="db",
+        table="table",
+        column_names=column_names,
+        keys=keys,
+        serialize_value=source.serialize_value,
+        column_types=column_types,
+        raw_values=True,
+        compressed_columns=["description"],
+    )
+
+    # Assert
+    assert raw_transform(row=raw_row, timestamp=timestamp) == transform(
+        row=row, timestamp=timestamp
+    )
+
+
+def test_row_transformer_with_raw_zero_decimal_primary_key():
+    """Test RowTransformer builds the same id from a zero DECIMAL primary key, raw or parsed"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    column_names = ["db_table_id", "db_table_version"]
+    column_types = {"id": "int", "version": "decimal"}
+    keys = ["db_table_id", "db_table_version"]
+    timestamp = datetime(2023, 1, 2)
+
+    # Execute
+    transform = RowTransformer(
+        database="db",
+        table="table",
+        column_names=column_names,
+        keys=keys,
+        serialize_value=source.serialize_value,
+        column_types=column_types,
+    )
+    raw_transform = RowTransformer(
+        database="db",
+        table="table",
+        column_names=column_names,
+        keys=keys,
+        serialize_value=source.serialize_value,
+        column_types=column_types,
+        raw_values=True,
+    )
+
+    # Assert
+    document = transform(row=(0, Decimal("0.00")), timestamp=timestamp)
+    raw_document = raw_transform(row=(0, "0.00"), timestamp=timestamp)
+    assert document["_id"] == raw_document["_id"] == "db_table_0_0.00_"
+
+
+@pytest.mark.parametrize(
+    "value, raw_value",
+    [
+        (datetime(2023, 1, 1, 10, 30, 15), "2023-01-01 10:30:15"),
+        # DATETIME(6) sends all the fractional digits, even when they're zeros
+        (datetime(2023, 1, 1, 10, 30, 15), "2023-01-01 10:30:15.000000"),
+        (datetime(2023, 1, 1, 10, 30, 15, 250), "2023-01-01 10:30:15.000250"),
+        # DATETIME(3) sends milliseconds
+        (datetime(2023, 1, 1, 10, 30, 15, 500000), "2023-01-01 10:30:15.500"),
+        ("0000-00-00 00:00:00", "0000-00-00 00:00:00"),
+    ],
+)
+def test_row_transformer_with_raw_datetime_primary_key(value, raw_value):
+    """Test RowTransformer builds the same documents from a raw DATETIME(6) primary key"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    column_names = ["db_table_created", "db_table_updated"]
+    column_types = {"created": "datetime", "updated": "timestamp"}
+    keys = ["db_table_created"]
+    timestamp = datetime(2023, 1, 2)
+
+    # Execute
+    transform = RowTransformer(
+        database="db",
+        table="table",
+        column_names=column_names,
+        keys=keys,
+        serialize_value=source.serialize_value,
+        column_types=column_types,
+    )
+    raw_transform = RowTransformer(
+        database="db",
+        table="table",
+        column_names=column_names,
+        keys=keys,
+        serialize_value=source.serialize_value,
+        column_types=column_types,
+        raw_values=True,
+    )
+
+    # Assert
+    assert raw_transform(row=(raw_value, raw_value), timestamp=timestamp) == transform(
+        row=(value, value), timestamp=timestamp
+    )
+
+
+@pytest.mark.asyncio
+async def test_streaming_cursor_with_decoders():
+    """Test _streaming_cursor converts values with the given decoders while it's open"""
+    # Setup
+    connection = mock.Mock()
+    connection.decoders = {FIELD_TYPE.LONG: int, FIELD_TYPE.DATETIME: str}
+    seen_decoders = []
+
+    @asynccontextmanager
+    async def _cursor(cursor_class):
+        seen_decoders.append(connection.decoders)
+        yield mock.Mock()
+
+    connection.cursor = _cursor
+
+    # Execute
+    async with _streaming_cursor(connection, RAW_DECODERS):
+        pass
+
+    # Assert
+    assert seen_decoders[0][FIELD_TYPE.LONG] is int
+    assert seen_decoders[0][FIELD_TYPE.DATETIME] is RAW_DECODERS[FIELD_TYPE.DATETIME]
+    assert connection.decoders == {FIELD_TYPE.LONG: int, FIELD_TYPE.DATETIME: str}
+
+
+@pytest.mark.asyncio
+async def test_fetch_documents_with_raw_rows():
+    """Test fetch_documents reads the rows of a table without parsing dates and decimals"""
+    # Setup
+    source = create_source(MySqlDataSource, raw_rows=True)
+    source.configuration.get_field("raw_rows").type = "bool"
+    source._fetch_primary_keys = AsyncMock(return_value=["id"])
+    source._fetch_column_types = AsyncMock(
+        return_value={"id": "int", "updated": "datetime"}
+    )
+    source._connect = mock.Mock(
+        side_effect=[
+            AsyncIter([[(datetime(2023, 1, 2),)]]).__aiter__(),
+            AsyncIter(
+                [["db_table_id", "db_table_updated"], (1, "2023-01-01 10:00:00")]
+            ).__aiter__(),
+        ]
+    )
+
+    # Execute
+    documents = [
+        document
+        async for document in source.fetch_documents(database="db", table="table")
+    ]
+
+    # Assert
+    assert documents[0]["db_table_updated"] == "2023-01-01T10:00:00"
+    assert source._connect.call_args.kwargs["decoders"] is RAW_DECODERS
+
+
+@pytest.mark.parametrize(
+    "column_types",
+    [
+        None,
+        {
+            "id": "int",
+            "name": "varchar",
+            "price": "decimal",
+            "created": "date",
+            "data": "blob",
+            "tags": "set",
+        },
+    ],
+)
+def test_row_transformer(column_types):
+    """Test RowTransformer builds the same documents as _format_document"""
+    # Setup
+    source = create_source(MySqlDataSource, content_hash=True)
+    source.configuration.get_field("content_hash").type = "bool"
+    column_names = [
+        f"db_table_{column}"
+        for column in ["id", "name", "price", "created", "data", "tags"]
+    ]
+    keys = ["db_table_id", "db_table_name"]
+    row = (1, "one", Decimal("1.5"), date(2023, 1, 1), b"blob", None)
+    timestamp = datetime(2023, 1, 2)
+
+    # Execute
+    transform = RowTransformer(
+        database="db",
+        table="table",
+        column_names=column_names,
+        keys=keys,
+        serialize_value=source.serialize_value,
+        column_types=column_types,
+        content_hash=True,
+    )
+
+    # Assert
+    assert transform(row=row, timestamp=timestamp) == source._format_document(
+        database="db",
+        table="table",
+        keys=keys,
+        row=dict(zip(column_names, row)),
+        timestamp=timestamp,
+    )
+
+
+def test_serialize_mysql_types():
+    """Test serialize handles the values of TIME and SET columns"""
+    source = create_source(MySqlDataSource)
+
+    assert source.serialize(
+        {"time": timedelta(hours=1, minutes=30), "set": {"b", "a"}}
+    ) == {"time": "1:30:00", "set": ["a", "b"]}
+
+
+def test_adaptive_fetch_size():
+    """Test AdaptiveFetchSize aims at the bytes target, doubling at most"""
+    fetch_size = AdaptiveFetchSize(size=50, bytes_target=100 * 1000)
+
+    assert fetch_size.update(rows=[("a" * 10,)] * 50, elapsed=0.1) == 100
+    assert fetch_size.update(rows=[("a" * 10,)] * 100, elapsed=0.1) == 200
+    assert fetch_size.update(rows=[("a" * 10000,)] * 200, elapsed=0.1) == 19
+    assert fetch_size.update(rows=[], elapsed=0.1) == 19
+
+
+def test_adaptive_fetch_size_shrinks_on_slow_batches():
+    """Test AdaptiveFetchSize halves the size when a batch is slow to come back"""
+    fetch_size = AdaptiveFetchSize(size=50, bytes_target=100 * 1000)
+
+    assert fetch_size.update(rows=[(1,)] * 50, elapsed=5) == 25
+
+
+class BatchCursor:
+    """Serves rows in batches, recording the size of each fetchmany call"""
+
+    def __init__(self, rows, sizes):
+        self.rows = rows
+        self.sizes = sizes
+        self.description = [["id"], ["text"]]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def execute(self, query, args=None):
+        pass
+
+    async def fetchmany(self, size=1):
+        self.sizes.append(size)
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    async def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+
+@pytest.mark.asyncio
+async def test_connect_with_adaptive_fetch_size():
+    """Test _connect adapts the fetch size of a table and reports it in the sync stats"""
+    # Setup
+    source = create_source(
+        MySqlDataSource, adaptive_fetch_size=True, fetch_bytes_target=1000
+    )
+    source.configuration.get_field("adaptive_fetch_size").type = "bool"
+    rows = [(i, "a" * 92) for i in range(100)]
+    sizes = []
+    connection = mock.Mock()
+    connection.cursor = mock.Mock(return_value=BatchCursor(rows, sizes))
+
+    @asynccontextmanager
+    async def _acquire(scan=False):
+        yield connection
+
+    source._acquire = _acquire
+
+    # Execute
+    response = [
+        row
+        async for row in source._connect(
+            query=QUERIES["TABLE_DATA"],
+            fetch_many=True,
+            table_rows=True,
+            database="db",
+            table="table",
+            columns="*",
+        )
+    ]
+
+    # Assert
+    assert response == [["db_table_id", "db_table_text"]] + rows
+    assert sizes == [50, 10, 10, 10, 10, 10, 10]
+    assert source.sync_stats() == {"fetch_sizes": {"db.table": 10}}
+
+
+@pytest.mark.asyncio
+async def test_connect_keeps_the_fetch_size_for_the_rows_of_the_table():
+    """Test _connect only adapts the fetch size to the queries reading the rows of the table"""
+    # Setup
+    source = create_source(
+        MySqlDataSource, adaptive_fetch_size=True, fetch_bytes_target=1000
+    )
+    source.configuration.get_field("adaptive_fetch_size").type = "bool"
+    sizes = []
+    connection = mock.Mock()
+    connection.cursor = mock.Mock(return_value=BatchCursor([(1,)] * 100, sizes))
+
+    @asynccontextmanager
+    async def _acquire(scan=False):
+        yield connection
+
+    source._acquire = _acquire
+
+    # Execute
+    [
+        row
+        async for row in source._connect(
+            query=QUERIES["TABLE_COLUMNS"],
+            fetch_many=True,
+            database="db",
+            table="table",
+            columns="*",
+        )
+    ]
+
+    # Assert
+    assert set(sizes) == {50}
+    assert source.fetch_sizes == {}
+
+
+@pytest.mark.asyncio
+async def test_fetch_documents_with_catalog():
+    """Test fetch_documents method of MySQL serving table metadata from the catalog"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    source.catalog = {
+        "db": {
+            "table": {
+                "primary_keys": ["id"],
+                "columns": {"id": "int"},
+                "update_time": "2023-01-01",
+                "row_count": 1,
+            }
+        }
+    }
+    source._connect = mock.MagicMock(
+        return_value=AsyncIter([["db_table_id"], (1,)]).__aiter__()
+    )
+
+    # Execute
+    documents = [
+        doc async for doc in source.fetch_documents(database="db", table="table")
+    ]
+
+    # Assert
+    assert documents == [
+        {
+            "db_table_id": 1,
+            "_id": "db_table_1_",
+            "_timestamp": "2023-01-01",
+            "Database": "db",
+            "Table": "table",
+        }
+    ]
+    source._connect.assert_called_once_with(
+        query=QUERIES["TABLE_DATA"],
+        fetch_many=True,
+        table_rows=True,
+        database="db",
+        table="table",
+        columns="*",
+        decoders=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_select_columns():
+    """Test _select_columns excludes, truncates and defers columns"""
+    # Setup
+    source = create_source(
+        MySqlDataSource,
+        excluded_columns="photo",
+        truncated_columns="table.description",
+        truncate_size=10,
+        deferred_columns="notes, id",
+    )
+    source.catalog = {
+        "db": {
+            "table": {
+                "primary_keys": ["id"],
+                "columns": {
+                    "id": "int",
+                    "description": "longtext",
+                    "photo": "longblob",
+                    "notes": "longtext",
+                },
+                "update_time": "2023-01-01",
+                "row_count": 1,
+            }
+        }
+    }
+
+    # Execute
+    columns = await source._select_columns(
+        database="db", table="table", primary_keys=["id"]
+    )
+
+    # Assert
+    assert columns == "`id`, LEFT(`description`, 10) AS `description`"
+    assert source.deferred_columns == {("db", "table"): (["notes"], ["id"])}
+
+
+@pytest.mark.asyncio
+async def test_select_columns_with_compressed_columns():
+    """Test _select_columns compresses columns server-side and records them"""
+    # Setup
+    source = create_source(MySqlDataSource, compressed_columns="description")
+    source.catalog = {
+        "db": {
+            "table": {
+                "primary_keys": ["id"],
+                "columns": {"id": "int", "description": "longtext"},
+                "update_time": "2023-01-01",
+                "row_count": 1,
+            }
+        }
+    }
+
+    # Execute
+    columns = await source._select_columns(
+        database="db", table="table", primary_keys=["id"]
+    )
+
+    # Assert
+    assert columns == "`id`, COMPRESS(`description`) AS `description`"
+    assert source.compressed_columns == {("db", "table"): ["description"]}
+
+
+@pytest.mark.asyncio
+async def test_select_columns_with_compressed_columns_of_other_types(patch_logger):
+    """Test _select_columns only compresses text and binary columns"""
+    # Setup
+    source = create_source(
+        MySqlDataSource, compressed_columns="description, price, created"
+    )
+    source._fetch_column_types = AsyncMock(
+        return_value={
+            "id": "int",
+            "description": "blob",
+            "price": "decimal",
+            "created": "datetime",
+        }
+    )
+    source._connect = mock.Mock(
+        return_value=AsyncIter(
+            [
+                [
+                    "db_table_id",
+                    "db_table_description",
+                    "db_table_price",
+                    "db_table_created",
+                ]
+            ]
+        ).__aiter__()
+    )
+
+    # Execute
+    columns = await source._select_columns(
+        database="db", table="table", primary_keys=["id"]
+    )
+
+    # Assert
+    assert (
+        columns == "`id`, COMPRESS(`description`) AS `description`, `price`, `created`"
+    )
+    assert source.compressed_columns == {("db", "table"): ["description"]}
+    source._fetch_column_types.assert_awaited_once_with(database="db", table="table")
+
+
+@pytest.mark.asyncio
+async def test_select_columns_without_policies():
+    """Test _select_columns selects every column when no policy is configured"""
+    source = create_source(MySqlDataSource)
+    source._connect = mock.Mock()
+
+    assert (
+        await source._select_columns(database="db", table="table", primary_keys=["id"])
+        == "*"
+    )
+    source._connect.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_download_deferred_columns():
+    """Test the lazy download of the deferred columns of a document"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    source.deferred_columns = {("db", "table"): (["notes"], ["id"])}
+    source._connect = mock.MagicMock(
+        return_value=AsyncIter([[(b"some notes",)]]).__aiter__()
+    )
+    doc = {"_id": "db_table_1_", "db_table_id": 1, "Database": "db", "Table": "table"}
+
+    # Execute
+    lazy_download = source._lazy_download(doc)
+
+    # Assert
+    assert await lazy_download(doit=False) is None
+    assert await lazy_download(doit=True, timestamp="2023-01-01") == {
+        "db_table_notes": "some notes"
+    }
+    source._connect.assert_called_once_with(
+        query=QUERIES["TABLE_ROW"],
+        query_args=(1,),
+        database="db",
+        table="table",
+        columns="`notes`",
+        where="`id` = %s",
+    )
+    assert source._lazy_download({**doc, "Table": "other"}) is None
+
+
+def basic_rule(id_, policy, field, rule, value):
+    return BasicRule.from_json(
+        {
+            "id": id_,
+            "order": 0,
+            "policy": policy,
+            "field": field,
+            "rule": rule,
+            "value": value,
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "rule, column_type, expected_condition",
+    [
+        (
+            basic_rule("1", "exclude", "db_table_age", ">", "60"),
+            "int",
+            ("`age` > %s", [60.0]),
+        ),
+        (
+            basic_rule("1", "exclude", "db_table_age", "equals", "6O"),
+            "int",
+            None,
+        ),
+        (
+            basic_rule("1", "exclude", "db_table_name", "equals", "Bob"),
+            "varchar",
+            (
+                "`name` = %s AND CAST(`name` AS BINARY) = CAST(%s AS BINARY)",
+                ["Bob", "Bob"],
+            ),
+        ),
+        (
+            basic_rule("1", "exclude", "db_table_name", "starts_with", "a_"),
+            "text",
+            (
+                "`name` LIKE %s AND CAST(`name` AS BINARY) LIKE CAST(%s AS BINARY)",
+                ["a\\_%", "a\\_%"],
+            ),
+        ),
+        (
+            basic_rule("1", "exclude", "db_table_name", "starts_with", "No"),
+            "text",
+            None,
+        ),
+        (
+            basic_rule("1", "exclude", "db_table_name", ">", "b"),
+            "varchar",
+            None,
+        ),
+        (
+            basic_rule("1", "exclude", "db_table_name", "contains", "b"),
+            "varchar",
+            None,
+        ),
+        (
+            basic_rule("1", "exclude", "db_table_created", "equals", "2023-01-01"),
+            "datetime",
+            None,
+        ),
+    ],
+)
+def test_basic_rule_condition(rule, column_type, expected_condition):
+    assert (
+        basic_rule_condition(
+            rule=rule,
+            column=rule.field.removeprefix("db_table_"),
+            column_type=column_type,
+        )
+        == expected_condition
+    )
+
+
+@pytest.mark.asyncio
+async def test_basic_rules_filter():
+    """Test _basic_rules_filter translates the leading rules and counts the excluded rows"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    source.catalog = {
+        "db": {
+            "table": {
+                "primary_keys": ["id"],
+                "columns": {"id": "int", "name": "varchar", "age": "int"},
+                "update_time": "2023-01-01",
+                "row_count": 1,
+            }
+        }
+    }
+    source.basic_rules = [
+        basic_rule("1", "exclude", "Table", "equals", "other"),
+        basic_rule("2", "exclude", "db_other_age", "<", "5"),
+        basic_rule("3", "exclude", "db_table_age", ">", "60"),
+        basic_rule("4", "include", "db_table_name", "equals", "Bob"),
+        basic_rule("5", "exclude", "db_table_name", "contains", "x"),
+        basic_rule("6", "exclude", "db_table_age", "<", "5"),
+    ]
+    source._connect = mock.MagicMock(
+        return_value=AsyncIter([[(0, 7), (None, 1)]]).__aiter__()
+    )
+
+    # Execute
+    row_filter = await source._basic_rules_filter(database="db", table="table")
+
+    # Assert
+    name_equals = "`name` = %s AND CAST(`name` AS BINARY) = CAST(%s AS BINARY)"
+    assert row_filter == (
+        f"(CASE WHEN `age` > %s THEN 0 WHEN {name_equals} THEN 1 ELSE 1 END) = 1",
+        [60.0, "Bob", "Bob"],
+    )
+    source._connect.assert_called_once_with(
+        query=QUERIES["TABLE_MATCHES"],
+        query_args=(60.0, "Bob", "Bob", 60.0, "Bob", "Bob"),
+        database="db",
+        table="table",
+        rule=f"CASE WHEN `age` > %s THEN 0 WHEN {name_equals} THEN 1 ELSE NULL END",
+        where=f"(CASE WHEN `age` > %s THEN 0 WHEN {name_equals} THEN 1 ELSE 1 END) = 0",
+    )
+    assert source.basic_rules_matches() == {"3": 7}
+
+
+@pytest.mark.asyncio
+async def test_basic_rules_filter_excluding_a_table():
+    """Test _basic_rules_filter excludes all the rows of a table excluded by name"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    source.catalog = {
+        "db": {
+            "table": {
+                "primary_keys": ["id"],
+                "columns": {"id": "int"},
+                "update_time": "2023-01-01",
+                "row_count": 1,
+            }
+        }
+    }
+    source.basic_rules = [basic_rule("1", "exclude", "Table", "equals", "table")]
+    source._connect = mock.MagicMock(return_value=AsyncIter([[(0, 3)]]).__aiter__())
+
+    # Execute
+    row_filter = await source._basic_rules_filter(database="db", table="table")
+
+    # Assert
+    assert row_filter == ("(0) = 1", [])
+    assert source.basic_rules_matches() == {"1": 3}
+
+
+@pytest.mark.asyncio
+async def test_basic_rules_filter_with_include_rules_only():
+    """Test _basic_rules_filter doesn't filter rows when no rule excludes any"""
+    source = create_source(MySqlDataSource)
+    source.catalog = {
+        "db": {
+            "table": {
+                "primary_keys": ["id"],
+                "columns": {"id": "int"},
+                "update_time": "2023-01-01",
+                "row_count": 1,
+            }
+        }
+    }
+    source.basic_rules = [
+        basic_rule("1", "include", "db_table_id", ">", "1"),
+        basic_rule("2", "exclude", "_timestamp", ">", "2023-01-01"),
+    ]
+    source._connect = mock.MagicMock()
+
+    assert await source._basic_rules_filter(database="db", table="table") is None
+    source._connect.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_fetch_documents_with_basic_rules_filter():
+    """Test fetch_documents only reads the rows the basic rules don't exclude"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    source.catalog = {
+        "db": {
+            "table": {
+                "primary_keys": ["id"],
+                "columns": {"id": "int"},
+                "update_time": "2023-01-01",
+                "row_count": 1,
+            }
+        }
+    }
+    source._basic_rules_filter = AsyncMock(return_value=("`id` > %s", [1]))
+    source._connect = mock.MagicMock(
+        return_value=AsyncIter([["db_table_id"], (2,)]).__aiter__()
+    )
+
+    # Execute
+    documents = [
+        doc async for doc in source.fetch_documents(database="db", table="table")
+    ]
+
+    # Assert
+    assert [doc["_id"] for doc in documents] == ["db_table_2_"]
+    source._connect.assert_called_once_with(
+        query=QUERIES["TABLE_DATA_WHERE"],
+        fetch_many=True,
+        table_rows=True,
+        query_args=(1,),
+        database="db",
+        table="table",
+        columns="*",
+        where="`id` > %s",
+        decoders=None,
+    )
+
+
+def test_content_hash():
+    """Test content_hash only changes when the values of a row change"""
+    document = {"_id": "db_table_1_", "_timestamp": "2023-01-01", "db_table_id": 1}
+
+    assert content_hash(document) == content_hash(
+        {**document, "_timestamp": "2023-01-02"}
+    )
+    assert content_hash(document) != content_hash({**document, "db_table_id": 2})
+
+
+def test_format_document_with_content_hash():
+    """Test _format_document adds a digest of the row when content_hash is enabled"""
+    # Setup
+    source = create_source(MySqlDataSource, content_hash=True)
+    source.configuration.get_field("content_hash").type = "bool"
+
+    # Execute
+    document = source._format_document(
+        database="db",
+        table="table",
+        keys=["db_table_id"],
+        row={"db_table_id": 1},
+        timestamp="2023-01-01",
+    )
+
+    # Assert
+    assert document["_content_hash"] == content_hash(document)
+    assert len(document["_content_hash"]) == 32
+
+
+@pytest.mark.asyncio
+async def test_fetch_documents_skips_unchanged_tables():
+    """Test fetch_documents method of MySQL skips a table that didn't change since the last sync"""
+    # Setup
+    source = create_source(MySqlDataSource, skip_unchanged_tables=True)
+    source.configuration.get_field("skip_unchanged_tables").type = "bool"
+    update_time = datetime(2023, 1, 1)
+    source.set_sync_cursor(
+        {
+            "filtering": "{}",
+            "options": options_digest(),
+            "tables": [
+                {
+                    "database": "db",
+                    "table": "table",
+                    "update_time": update_time.isoformat(),
+                    "checksum": None,
+                }
+            ],
+        }
+    )
+    source._load_sync_cursor(filtering=None)
+    source.catalog = {
+        "db": {
+            "table": {
+                "primary_keys": ["id"],
+                "columns": {"id": "int"},
+                "update_time": update_time,
+                "row_count": 1,
+            }
+        }
+    }
+    source._connect = mock.MagicMock()
+
+    # Execute
+    documents = [
+        doc async for doc in source.fetch_documents(database="db", table="table")
+    ]
+
+    # Assert
+    assert documents == []
+    source._connect.assert_not_called()
+    assert not source.should_delete("db_table_1_")
+    assert source.should_delete("db_other_table_1_")
+    assert source.table_states == {
+        ("db", "table"): {"update_time": update_time.isoformat(), "checksum": None}
+    }
+
+
+@pytest.mark.asyncio
+async def test_table_changed_with_checksum():
+    """Test _table_changed method of MySQL falls back to CHECKSUM TABLE"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    source._last_table_states = {("db", "table"): {"update_time": None, "checksum": 1}}
+    source._connect = mock.MagicMock(
+        return_value=AsyncIter([[("db.table", 2)]]).__aiter__()
+    )
+
+    # Execute
+    changed = await source._table_changed(
+        database="db", table="table", update_time=None
+    )
+
+    # Assert
+    assert changed
+    assert source.table_states == {
+        ("db", "table"): {"update_time": None, "checksum": 2}
+    }
+
+
+def test_load_sync_cursor_with_different_filtering():
+    """Test _load_sync_cursor method of MySQL discards the sync cursor when the filtering changed"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    source.set_sync_cursor(
+        {
+            "filtering": "{}",
+            "tables": [
+                {"database": "db", "table": "table", "update_time": None, "checksum": 1}
+            ],
+        }
+    )
+
+    # Execute
+    source._load_sync_cursor(filtering=Filter({"rules": [{"id": "rule"}]}))
+
+    # Assert
+    assert source._last_table_states == {}
+
+
+@pytest.mark.parametrize(
+    "options, expected_table_states",
+    [
+        ({}, {("db", "table"): {"update_time": None, "checksum": 1}}),
+        ({"excluded_columns": "photo, notes"}, {}),
+        ({"content_hash": True}, {}),
+        ({"truncate_size": 10}, {}),
+    ],
+)
+def test_load_sync_cursor_with_changed_options(options, expected_table_states):
+    """Test _load_sync_cursor method of MySQL discards the sync cursor when the options shaping the documents changed"""
+    # Setup
+    source = create_source(MySqlDataSource, **options)
+    source.set_sync_cursor(
+        {
+            "filtering": "{}",
+            "options": options_digest(),
+            "tables": [
+                {"database": "db", "table": "table", "update_time": None, "checksum": 1}
+            ],
+        }
+    )
+
+    # Execute
+    source._load_sync_cursor(filtering=None)
+
+    # Assert
+    assert source._last_table_states == expected_table_states
+
+
+def test_digest_options_ignores_the_order_of_the_columns():
+    """Test _digest_options method of MySQL gives the same digest for the same columns in another order"""
+    assert options_digest(excluded_columns="photo, notes") == options_digest(
+        excluded_columns="notes,photo"
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_docs_saves_table_states(patch_validate_databases):
+    """Test get_docs method of MySQL saves the table states in the sync cursor"""
+    # Setup
+    source = create_source(MySqlDataSource, skip_unchanged_tables=True)
+    source.configuration.get_field("skip_unchanged_tables").type = "bool"
+    source.configuration.set_field(name="database", value=["db"])
+
+    async def _fetch_rows_from_all_tables(database):
+        source.table_states[(database, "table")] = {"update_time": None, "checksum": 3}
+        yield {"_id": "db_table_1_"}
+
+    source.fetch_rows_from_all_tables = _fetch_rows_from_all_tables
+
+    # Execute
+    docs = [doc async for doc, _ in source.get_docs()]
+
+    # Assert
+    assert docs == [{"_id": "db_table_1_"}]
+    sync_cursor = source.sync_cursor()
+    assert sync_cursor["filtering"] == "{}"
+    assert sync_cursor["tables"] == [
+        {"database": "db", "table": "table", "update_time": None, "checksum": 3}
+    ]
+
+
+@pytest.mark.parametrize(
+    "last_full_sync, expected_full_sync, expected_high_water_marks",
+    [
+        (None, True, {}),
+        (datetime(2020, 1, 1, tzinfo=timezone.utc).isoformat(), True, {}),
+        (
+            datetime.now(timezone.utc).isoformat(),
+            False,
+            {("db", "table"): "2023-01-01 00:00:00"},
+        ),
+    ],
+)
+def test_load_sync_cursor_with_incremental_column(
+    last_full_sync, expected_full_sync, expected_high_water_marks
+):
+    """Test _load_sync_cursor method of MySQL runs a full sync once in a while"""
+    # Setup
+    source = create_source(MySqlDataSource, incremental_column="updated_at")
+    source.set_sync_cursor(
+        {
+            "filtering": "{}",
+            "options": options_digest(),
+            "last_full_sync": last_full_sync,
+            "high_water_marks": [
+                {
+                    "database": "db",
+                    "table": "table",
+                    "column": "updated_at",
+                    "value": "2023-01-01 00:00:00",
+                },
+                {
+                    "database": "db",
+                    "table": "other_table",
+                    "column": "id",
+                    "value": 10,
+                },
+            ],
+        }
+    )
+
+    # Execute
+    source._load_sync_cursor(filtering=None)
+
+    # Assert
+    assert source.full_sync == expected_full_sync
+    assert source._last_high_water_marks == expected_high_water_marks
+
+
+@pytest.mark.asyncio
+async def test_fetch_documents_since_high_water_mark():
+    """Test fetch_documents method of MySQL only fetches the rows changed since the last sync"""
+    # Setup
+    source = create_source(MySqlDataSource, incremental_column="updated_at")
+    source.catalog = {
+        "db": {
+            "table": {
+                "primary_keys": ["id"],
+                "columns": {"id": "int", "updated_at": "datetime"},
+                "update_time": datetime(2023, 1, 3),
+                "row_count": 2,
+            }
+        }
+    }
+    source._last_high_water_marks = {("db", "table"): "2023-01-01 00:00:00"}
+    source._connect = mock.MagicMock(
+        return_value=AsyncIter(
+            [
+                ["db_table_id", "db_table_updated_at"],
+                (1, datetime(2023, 1, 2)),
+                (2, datetime(2023, 1, 1)),
+            ]
+        ).__aiter__()
+    )
+
+    # Execute
+    documents = [
+        doc async for doc in source.fetch_documents(database="db", table="table")
+    ]
+
+    # Assert
+    source._connect.assert_called_once_with(
+        query=QUERIES["TABLE_DATA_SINCE"],
+        fetch_many=True,
+        table_rows=True,
+        query_args=("2023-01-01 00:00:00",),
+        database="db",
+        table="table",
+        columns="*",
+        column="`updated_at`",
+    )
+    assert [doc["_timestamp"] for doc in documents] == [
+        "2023-01-02T00:00:00",
+        "2023-01-01T00:00:00",
+    ]
+    assert source.high_water_marks == {("db", "table"): "2023-01-02 00:00:00"}
+    assert not source.should_delete("db_table_3_")
+
+
+# Events recorded from the binary log of a server with GTIDs enabled, for:
+#   INSERT INTO db.customers VALUES (1, 'alice'), (2, 'bob');
+#   UPDATE db.customers SET id = 3 WHERE id = 2;
+#   DELETE FROM db.customers WHERE id = 1;
+#   TRUNCATE TABLE db.orders;
+GTID_SET = "3e11fa47-71ca-11e1-9e33-c80aa9429562:1-10"
+BINLOG_EVENTS = [
+    (GtidEvent, {"gtid": "3e11fa47-71ca-11e1-9e33-c80aa9429562:11"}),
+    (
+        WriteRowsEvent,
+        {
+            "rows": [
+                {"values": {"id": 1, "name": "alice"}},
+                {"values": {"id": 2, "name": "bob"}},
+            ]
+        },
+    ),
+    (XidEvent, {"log_file": "binlog.000002", "log_pos": 1200}),
+    (GtidEvent, {"gtid": "3e11fa47-71ca-11e1-9e33-c80aa9429562:12"}),
+    (
+        UpdateRowsEvent,
+        {
+            "rows": [
+                {
+                    "before_values": {"id": 2, "name": "bob"},
+                    "after_values": {"id": 3, "name": "bob"},
+                }
+            ]
+        },
+    ),
+    (XidEvent, {"log_file": "binlog.000002", "log_pos": 1500}),
+    (GtidEvent, {"gtid": "3e11fa47-71ca-11e1-9e33-c80aa9429562:13"}),
+    (DeleteRowsEvent, {"rows": [{"values": {"id": 1, "name": "alice"}}]}),
+    (XidEvent, {"log_file": "binlog.000002", "log_pos": 1800}),
+    (GtidEvent, {"gtid": "3e11fa47-71ca-11e1-9e33-c80aa9429562:14"}),
+    (QueryEvent, {"schema": b"db", "query": "TRUNCATE TABLE orders"}),
+]
+
+
+class BinLogStreamReaderFake:
+    """Replays the recorded binary log events"""
+
+    recorded_events = BINLOG_EVENTS
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.log_file = None
+        self.log_pos = None
+        self.closed = False
+        self.events = iter(self.recorded_events)
+
+    def fetchone(self):
+        try:
+            klass, attributes = next(self.events)
+        except StopIteration:
+            return None
+        event = mock.Mock(spec=klass)
+        event.schema = attributes.get("schema", "db")
+        event.table = "customers"
+        event.timestamp = 1672531200
+        event.columns = []
+        for name, value in attributes.items():
+            setattr(event, name, value)
+        if klass is XidEvent or "log_pos" in attributes:
+            self.log_file, self.log_pos = attributes["log_file"], attributes["log_pos"]
+        return event
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_binlog_reader():
+    """Test BinlogReader turns the row events of the binary log into changes"""
+    # Setup
+    with mock.patch(
+        "connectors.sources.mysql.BinLogStreamReader", BinLogStreamReaderFake
+    ):
+        reader = BinlogReader(
+            connection_settings={},
+            server_id=1,
+            databases=["db"],
+            checkpoint={
+                "log_file": "binlog.000001",
+                "log_pos": 4,
+                "gtid_set": GTID_SET,
+            },
+            batch_size=2,
+        )
+
+        # Execute
+        changes = [change async for change in reader.changes()]
+
+    # Assert
+    timestamp = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    assert changes == [
+        ("index", "db", "customers", {"id": 1, "name": "alice"}, None, timestamp),
+        ("index", "db", "customers", {"id": 2, "name": "bob"}, None, timestamp),
+        (
+            "index",
+            "db",
+            "customers",
+            {"id": 3, "name": "bob"},
+            {"id": 2, "name": "bob"},
+            timestamp,
+        ),
+        ("delete", "db", "customers", {"id": 1, "name": "alice"}, None, timestamp),
+    ]
+    assert reader._stream.kwargs["auto_position"] == GTID_SET
+    assert reader._stream.closed
+    assert reader.checkpoint == {
+        "log_file": "binlog.000002",
+        "log_pos": 1800,
+        "gtid_set": "3e11fa47-71ca-11e1-9e33-c80aa9429562:1-13",
+    }
+    assert reader.schema_changed
+
+
+def _binlog_column(name, column_type, **attributes):
+    column = mock.Mock(type=column_type, **attributes)
+    # `name` can't be given to the constructor of a mock
+    column.name = name
+    return column
+
+
+class MyISAMBinLogStreamReaderFake(BinLogStreamReaderFake):
+    """Replays a transaction on a MyISAM table, with a JSON column"""
+
+    recorded_events = [
+        (QueryEvent, {"schema": b"db", "query": "BEGIN"}),
+        (
+            WriteRowsEvent,
+            {
+                "columns": [
+                    _binlog_column("id", FIELD_TYPE.LONG),
+                    _binlog_column("attributes", FIELD_TYPE.JSON),
+                ],
+                "rows": [
+                    {"values": {"id": 1, "attributes": {b"tags": [b"new", 1.5]}}},
+                    {"values": {"id": 2, "attributes": None}},
+                ],
+            },
+        ),
+        (
+            QueryEvent,
+            {
+                "schema": b"db",
+                "query": "COMMIT",
+                "log_file": "binlog.000002",
+                "log_pos": 900,
+            },
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_binlog_reader_with_myisam_and_json():
+    """Test BinlogReader moves the checkpoint on COMMIT statements and gives JSON values as text"""
+    # Setup
+    with mock.patch(
+        "connectors.sources.mysql.BinLogStreamReader", MyISAMBinLogStreamReaderFake
+    ):
+        reader = BinlogReader(
+            connection_settings={},
+            server_id=1,
+            databases=["db"],
+            checkpoint={"log_file": "binlog.000001", "log_pos": 4},
+        )
+
+        # Execute
+        changes = [change async for change in reader.changes()]
+
+    # Assert
+    assert [change[3] for change in changes] == [
+        {"id": 1, "attributes": '{"tags": ["new", 1.5]}'},
+        {"id": 2, "attributes": None},
+    ]
+    assert reader.checkpoint == {
+        "log_file": "binlog.000002",
+        "log_pos": 900,
+        "gtid_set": None,
+    }
+    assert not reader.schema_changed
+
+
+class SetBinLogStreamReaderFake(BinLogStreamReaderFake):
+    """Replays the update of a row with a SET column"""
+
+    recorded_events = [
+        (
+            UpdateRowsEvent,
+            {
+                "columns": [
+                    _binlog_column("id", FIELD_TYPE.LONG),
+                    _binlog_column(
+                        "flags", FIELD_TYPE.SET, set_values=["red", "green", "blue"]
+                    ),
+                ],
+                "rows": [
+                    {
+                        "before_values": {"id": 1, "flags": set()},
+                        "after_values": {"id": 1, "flags": {"blue", "red"}},
+                    },
+                    {
+                        "before_values": {"id": 2, "flags": None},
+                        "after_values": {"id": 2, "flags": None},
+                    },
+                ],
+            },
+        ),
+        (XidEvent, {"log_file": "binlog.000002", "log_pos": 700}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_binlog_reader_with_set_columns():
+    """Test BinlogReader gives SET values as the comma separated text of the scans"""
+    # Setup
+    with mock.patch(
+        "connectors.sources.mysql.BinLogStreamReader", SetBinLogStreamReaderFake
+    ):
+        reader = BinlogReader(
+            connection_settings={},
+            server_id=1,
+            databases=["db"],
+            checkpoint={"log_file": "binlog.000001", "log_pos": 4},
+        )
+
+        # Execute
+        changes = [change async for change in reader.changes()]
+
+    # Assert
+    assert [(change[3], change[4]) for change in changes] == [
+        ({"id": 1, "flags": "red,blue"}, {"id": 1, "flags": ""}),
+        ({"id": 2, "flags": None}, {"id": 2, "flags": None}),
+    ]
+
+
+class PoliciesBinLogStreamReaderFake(BinLogStreamReaderFake):
+    """Replays the insert of a row with columns covered by the column policies"""
+
+    recorded_events = [
+        (
+            WriteRowsEvent,
+            {
+                "rows": [
+                    {
+                        "values": {
+                            "id": 1,
+                            "name": "alice",
+                            "password": "secret",
+                            "bio": "a long biography",
+                            "notes": "notes",
+                        }
+                    }
+                ]
+            },
+        ),
+        (XidEvent, {"log_file": "binlog.000002", "log_pos": 900}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fetch_binlog_changes_with_column_policies():
+    """Test fetch_binlog_changes method of MySQL applies the column policies to the changes"""
+    # Setup
+    source = create_source(
+        MySqlDataSource,
+        excluded_columns="password",
+        truncated_columns="customers.bio",
+        truncate_size=6,
+        deferred_columns="notes, id",
+        compressed_columns="name",
+    )
+    source._fetch_primary_keys = AsyncMock(return_value=["id"])
+
+    # Execute
+    with mock.patch(
+        "connectors.sources.mysql.BinLogStreamReader", PoliciesBinLogStreamReaderFake
+    ):
+        documents = [
+            doc
+            async for doc in source.fetch_binlog_changes(
+                databases=["db"],
+                checkpoint={"log_file": "binlog.000001", "log_pos": 4},
+            )
+        ]
+
+    # Assert
+    assert {
+        key: value for key, value in documents[0].items() if key.startswith("db_")
+    } == {
+        "db_customers_id": 1,
+        "db_customers_name": "alice",
+        "db_customers_bio": "a long",
+    }
+    assert source.deferred_columns == {("db", "customers"): (["notes"], ["id"])}
+    assert source._lazy_download(documents[0]) is not None
+
+
+@pytest.mark.asyncio
+async def test_fetch_binlog_changes():
+    """Test fetch_binlog_changes method of MySQL turns the changes into documents"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    source._fetch_primary_keys = AsyncMock(return_value=["id"])
+
+    # Execute
+    with mock.patch(
+        "connectors.sources.mysql.BinLogStreamReader", BinLogStreamReaderFake
+    ):
+        documents = [
+            doc
+            async for doc in source.fetch_binlog_changes(
+                databases=["db"],
+                checkpoint={"log_file": "binlog.000001", "log_pos": 4},
+            )
+        ]
+
+    # Assert
+    assert [(doc["_id"], doc.get("_op_type", "index")) for doc in documents] == [
+        ("db_customers_1_", "index"),
+        ("db_customers_2_", "index"),
+        ("db_customers_2_", "delete"),
+        ("db_customers_3_", "index"),
+        ("db_customers_1_", "delete"),
+    ]
+    assert documents[0]["db_customers_name"] == "alice"
+    assert documents[0]["_timestamp"] == "2023-01-01T00:00:00+00:00"
+    source._fetch_primary_keys.assert_awaited_once_with(
+        database="db", table="customers"
+    )
+    # a TRUNCATE can't be replayed, the next sync takes a snapshot
+    assert source.binlog_checkpoint is None
+
+
+@pytest.mark.asyncio
+async def test_get_docs_with_binlog_checkpoint(patch_validate_databases):
+    """Test get_docs method of MySQL only reads the changes since the binlog checkpoint"""
+    # Setup
+    source = create_source(MySqlDataSource, cdc=True)
+    source.configuration.get_field("cdc").type = "bool"
+    source.configuration.set_field(name="database", value=["db"])
+    checkpoint = {"log_file": "binlog.000001", "log_pos": 4, "gtid_set": None}
+    new_checkpoint = {"log_file": "binlog.000001", "log_pos": 400, "gtid_set": None}
+    source.set_sync_cursor(
+        {"filtering": "{}", "options": options_digest(), "binlog": checkpoint}
+    )
+    source._binlog_available = AsyncMock(return_value=True)
+
+    async def _fetch_binlog_changes(databases, checkpoint):
+        yield {"_id": "db_customers_1_", "_op_type": "delete"}
+        source.binlog_checkpoint = new_checkpoint
+
+    source.fetch_binlog_changes = _fetch_binlog_changes
+    source.fetch_rows_from_all_tables = mock.MagicMock()
+
+    # Execute
+    docs = [doc async for doc, _ in source.get_docs()]
+
+    # Assert
+    assert docs == [{"_id": "db_customers_1_", "_op_type": "delete"}]
+    source.fetch_rows_from_all_tables.assert_not_called()
+    assert not source.should_delete("db_customers_2_")
+    assert source.sync_cursor() == {
+        "filtering": "{}",
+        "options": options_digest(),
+        "binlog": new_checkpoint,
+        "databases_state": None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_changed_after_binlog_changes(patch_validate_databases):
+    """Test changed method of MySQL compares with the state of the databases read by the last sync of the binlog changes"""
+    # Setup
+    checkpoint = {"log_file": "binlog.000001", "log_pos": 4, "gtid_set": None}
+    old_state = {**DATABASES_STATE, "update_time": "2022-12-31T10:00:00"}
+
+    def _source(sync_cursor):
+        source = create_source(MySqlDataSource, cdc=True, skip_idle_syncs=True)
+        source.configuration.get_field("cdc").type = "bool"
+        source.configuration.get_field("skip_idle_syncs").type = "bool"
+        source.configuration.set_field(name="database", value=["db"])
+        source.set_sync_cursor(sync_cursor)
+        source.connection_pool = mock.MagicMock()
+        source._binlog_available = AsyncMock(return_value=True)
+        source._fetch_databases_state = AsyncMock(return_value=DATABASES_STATE)
+
+        async def _fetch_binlog_changes(databases, checkpoint):
+            yield {"_id": "db_customers_1_", "_op_type": "delete"}
+            source.binlog_checkpoint = checkpoint
+
+        source.fetch_binlog_changes = _fetch_binlog_changes
+        return source
+
+    first_sync = _source(
+        {
+            "filtering": "{}",
+            "options": options_digest(),
+            "binlog": checkpoint,
+            "databases_state": old_state,
+        }
+    )
+
+    # Execute
+    first_changed = await first_sync.changed()
+    [doc async for doc, _ in first_sync.get_docs()]
+    second_sync = _source(first_sync.sync_cursor())
+
+    # Assert
+    assert first_changed
+    assert not await second_sync.changed()
+
+
+@pytest.mark.asyncio
+async def test_get_docs_with_purged_binlog_checkpoint(patch_validate_databases):
+    """Test get_docs method of MySQL takes a snapshot when the binlog was purged"""
+    # Setup
+    source = create_source(MySqlDataSource, cdc=True)
+    source.configuration.get_field("cdc").type = "bool"
+    source.configuration.set_field(name="database", value=["db"])
+    source.set_sync_cursor(
+        {
+            "filtering": "{}",
+            "options": options_digest(),
+            "binlog": {"log_file": "binlog.000001", "log_pos": 4, "gtid_set": None},
+        }
+    )
+    source._connect = mock.MagicMock(
+        side_effect=[
+            AsyncIter([[("binlog.000005", 1000)]]).__aiter__(),
+            AsyncIter([[("binlog.000005", 1200, "", "", "")]]).__aiter__(),
+        ]
+    )
+    source.fetch_rows_from_all_tables = mock.MagicMock(
+        return_value=AsyncIter([{"_id": "db_customers_1_"}])
+    )
+
+    # Execute
+    docs = [doc async for doc, _ in source.get_docs()]
+
+    # Assert
+    assert docs == [{"_id": "db_customers_1_"}]
+    assert source.should_delete("db_customers_2_")
+    assert source.sync_cursor()["binlog"] == {
+        "log_file": "binlog.000005",
+        "log_pos": 1200,
+        "gtid_set": None,
+    }
+
+
+class SnapshotConnection:
+    """Records the statements executed on a connection"""
+
+    def __init__(self, statements, name):
+        self.statements = statements
+        self.name = name
+        self.closed = False
+
+    def cursor(self):
+        connection = self
+
+        class _Cursor:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *args):
+                pass
+
+            async def execute(self, query):
+                connection.statements.append((connection.name, query))
+
+            async def fetchall(self):
+                return [("binlog.000003", 154, "", "", "uuid:1-5")]
+
+        return _Cursor()
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_consistent_snapshot():
+    """Test ConsistentSnapshot starts all the workers on the same snapshot"""
+    # Setup
+    statements = []
+    connections = [
+        SnapshotConnection(statements, name)
+        for name in ["control", "worker_1", "worker_2"]
+    ]
+    snapshot = ConsistentSnapshot(connection_settings={}, workers=2)
+
+    # Execute
+    with mock.patch("aiomysql.connect", AsyncMock(side_effect=connections)):
+        checkpoint = await snapshot.start(binlog_position=True)
+    async with snapshot.acquire() as first:
+        async with snapshot.acquire() as second:
+            acquired = {first.name, second.name}
+    await snapshot.close()
+
+    # Assert
+    assert checkpoint == {
+        "log_file": "binlog.000003",
+        "log_pos": 154,
+        "gtid_set": "uuid:1-5",
+    }
+    assert statements == [
+        ("control", "FLUSH TABLES WITH READ LOCK"),
+        ("worker_1", "SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ"),
+        ("worker_1", "START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY"),
+        ("worker_2", "SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ"),
+        ("worker_2", "START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY"),
+        ("control", QUERIES["BINARY_LOG_STATUS"]),
+        ("control", "UNLOCK TABLES"),
+    ]
+    assert acquired == {"worker_1", "worker_2"}
+    assert all(connection.closed for connection in connections)
+
+
+@pytest.mark.asyncio
+async def test_get_docs_with_consistent_snapshot(patch_validate_databases):
+    """Test get_docs method of MySQL reads the tables from a consistent snapshot"""
+    # Setup
+    source = create_source(MySqlDataSource, consistent_snapshot=True)
+    source.configuration.get_field("consistent_snapshot").type = "bool"
+    source.configuration.set_field(name="database", value=["db"])
+    snapshot = mock.MagicMock()
+    snapshot.start = AsyncMock(return_value=None)
+    snapshot.close = AsyncMock()
+    acquired = []
+
+    async def _fetch_rows_from_all_tables(database):
+        acquired.append(source._acquire())
+        yield {"_id": "db_table_1_"}
+
+    source.fetch_rows_from_all_tables = _fetch_rows_from_all_tables
+
+    # Execute
+    with mock.patch(
+        "connectors.sources.mysql.ConsistentSnapshot", return_value=snapshot
+    ):
+        docs = [doc async for doc, _ in source.get_docs()]
+
+    # Assert
+    assert docs == [{"_id": "db_table_1_"}]
+    assert acquired == [snapshot.acquire.return_value]
+    snapshot.start.assert_awaited_once_with(binlog_position=False)
+    snapshot.close.assert_awaited_once()
+    assert source.snapshot is None
+
+
+DATABASES_STATE = {
+    "tables": 2,
+    "update_time": "2023-01-01T10:00:00",
+    "create_time": "2022-12-01T10:00:00",
+    "gtid_executed": "3E11FA47-71CA-11E1-9E33-C80AA9429562:1-5",
+    "binlog_position": None,
+}
+
+
+@pytest.mark.asyncio
+async def test_changed_without_skip_idle_syncs():
+    """Test changed method of MySQL always reports a change when skip_idle_syncs is off"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    source.set_sync_cursor({"databases_state": DATABASES_STATE})
+    source._fetch_databases_state = AsyncMock()
+
+    # Execute and Assert
+    assert await source.changed()
+    source._fetch_databases_state.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "last_state, state, expected_changed",
+    [
+        (None, DATABASES_STATE, True),
+        (DATABASES_STATE, DATABASES_STATE, False),
+        (DATABASES_STATE, {**DATABASES_STATE, "tables": 3}, True),
+        (
+            DATABASES_STATE,
+            {**DATABASES_STATE, "gtid_executed": "3E11FA47:1-6"},
+            True,
+        ),
+        (DATABASES_STATE, None, True),
+    ],
+)
+@pytest.mark.asyncio
+async def test_changed(last_state, state, expected_changed):
+    """Test changed method of MySQL compares the state of the databases with the one of the last sync"""
+    # Setup
+    source = create_source(MySqlDataSource, skip_idle_syncs=True)
+    source.configuration.set_field(name="database", value=["db"])
+    source.set_sync_cursor(
+        {
+            "filtering": digest_filtering(Filter()),
+            "options": options_digest(),
+            "databases_state": last_state,
+        }
+    )
+    source.set_filtering(Filter())
+    source.connection_pool = mock.MagicMock()
+    source._fetch_databases_state = AsyncMock(return_value=state)
+
+    # Execute and Assert
+    assert await source.changed() is expected_changed
+
+
+@pytest.mark.parametrize(
+    "filtering, options",
+    [
+        (Filter({"rules": [{"id": "rule"}]}), {}),
+        (Filter(), {"excluded_columns": "photo"}),
+    ],
+)
+@pytest.mark.asyncio
+async def test_changed_with_new_filtering_or_options(filtering, options):
+    """Test changed method of MySQL reports a change when the filtering or the options shaping the documents changed"""
+    # Setup
+    source = create_source(MySqlDataSource, skip_idle_syncs=True, **options)
+    source.configuration.set_field(name="database", value=["db"])
+    source.set_sync_cursor(
+        {
+            "filtering": digest_filtering(Filter()),
+            "options": options_digest(),
+            "databases_state": DATABASES_STATE,
+        }
+    )
+    source.set_filtering(filtering)
+    source._fetch_databases_state = AsyncMock(return_value=DATABASES_STATE)
+
+    # Execute and Assert
+    assert await source.changed()
+    source._fetch_databases_state.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_changed_when_state_unavailable(patch_logger):
+    """Test changed method of MySQL syncs anyway when the state of the databases can't be read"""
+    # Setup
+    source = create_source(MySqlDataSource, skip_idle_syncs=True)
+    source.configuration.set_field(name="database", value=["db"])
+    source.set_sync_cursor({"databases_state": DATABASES_STATE})
+    source.connection_pool = mock.MagicMock()
+    source._fetch_databases_state = AsyncMock(side_effect=Exception("Access denied"))
+
+    # Execute and Assert
+    assert await source.changed()
+
+
+@pytest.mark.asyncio
+async def test_changed_when_full_sync_due():
+    """Test changed method of MySQL doesn't skip a due full sync of the incremental column"""
+    # Setup
+    source = create_source(
+        MySqlDataSource, skip_idle_syncs=True, incremental_column="updated_at"
+    )
+    last_full_sync = datetime.now(timezone.utc) - timedelta(days=2)
+    source.set_sync_cursor(
+        {
+            "databases_state": DATABASES_STATE,
+            "last_full_sync": last_full_sync.isoformat(),
+        }
+    )
+    source._fetch_databases_state = AsyncMock(return_value=DATABASES_STATE)
+
+    # Execute and Assert
+    assert await source.changed()
+    source._fetch_databases_state.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_fetch_databases_state_with_binlog_position():
+    """Test _fetch_databases_state method of MySQL falls back to the binlog position without GTIDs"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    results = {
+        QUERIES["DATABASES_STATE"].format(databases="%s"): [
+            (2, datetime(2023, 1, 1, 10), datetime(2022, 12, 1, 10), "")
+        ],
+        QUERIES["BINARY_LOG_STATUS"]: [("binlog.000002", 1540, "", "", "")],
+    }
+
+    async def _connect(query, fetch_many=False, query_args=(), **query_kwargs):
+        yield results[query.format(**query_kwargs)]
+
+    source._connect = _connect
+
+    # Execute
+    state = await source._fetch_databases_state(databases=["db"])
+
+    # Assert
+    assert state == {
+        "tables": 2,
+        "update_time": "2023-01-01T10:00:00",
+        "create_time": "2022-12-01T10:00:00",
+        "gtid_executed": None,
+        "binlog_position": "binlog.000002:1540",
+    }
+
+
+@pytest.mark.asyncio
+async def test_fetch_databases_state_with_cached_statistics():
+    """Test _fetch_databases_state method of MySQL reads the current statistics of the tables on MySQL 8"""
+    # Setup
+    source = create_source(MySqlDataSource, skip_idle_syncs=True)
+    source.configuration.get_field("skip_idle_syncs").type = "bool"
+    executed = []
+
+    class _Cursor(BatchCursor):
+        async def execute(self, query, args=None):
+            executed.append(query)
+            if query == QUERIES["STATS_EXPIRY_VARIABLE"]:
+                self.rows = [("information_schema_stats_expiry", "86400")]
+            elif query.startswith("SELECT COUNT(*)"):
+                self.rows = [(2, datetime(2023, 1, 1, 10), None, "3E11FA47:1-5")]
+
+    connection = mock.Mock()
+    connection.cursor = mock.Mock(side_effect=lambda *args: _Cursor([], []))
+
+    @asynccontextmanager
+    async def _acquire(scan=False):
+        yield connection
+
+    source._acquire = _acquire
+
+    # Execute
+    await source._fetch_databases_state(databases=["db"])
+    state = await source._fetch_databases_state(databases=["db"])
+
+    # Assert
+    query = QUERIES["DATABASES_STATE"].format(databases="%s")
+    assert executed == [
+        QUERIES["STATS_EXPIRY_VARIABLE"],
+        QUERIES["DISABLE_STATS_EXPIRY"],
+        query,
+        QUERIES["DISABLE_STATS_EXPIRY"],
+        query,
+    ]
+    assert state["update_time"] == "2023-01-01T10:00:00"
+
+
+@pytest.mark.parametrize(
+    "skip_idle_syncs, variable, expected_query",
+    [
+        (True, [("information_schema_stats_expiry", "86400")], "DISABLE_STATS_EXPIRY"),
+        (True, [], None),
+        (False, [("information_schema_stats_expiry", "86400")], None),
+    ],
+)
+@pytest.mark.asyncio
+async def test_statistics_session_query(skip_idle_syncs, variable, expected_query):
+    """Test _statistics_session_query method of MySQL only disables the cache of the statistics where there's one"""
+    # Setup
+    source = create_source(MySqlDataSource, skip_idle_syncs=skip_idle_syncs)
+    source.configuration.get_field("skip_idle_syncs").type = "bool"
+    source._connect = mock.MagicMock(return_value=AsyncIter([variable]).__aiter__())
+
+    # Execute
+    session_query = await source._statistics_session_query()
+
+    # Assert
+    assert session_query == (QUERIES[expected_query] if expected_query else None)
+
+
+def _replica(host, lag=0, in_use=0):
+    replica = Replica(host=host, port=3306, pool=mock.MagicMock())
+    replica.lag = lag
+    replica.usage.in_use = in_use
+    return replica
+
+
+def test_pick_replica_round_robin():
+    """Test _pick_replica method of MySQL cycles through the replicas which don't lag"""
+    # Setup
+    source = create_source(MySqlDataSource, max_replica_lag=60)
+    source.replicas = [
+        _replica("replica-1"),
+        _replica("replica-2", lag=120),
+        _replica("replica-3", lag=None),
+        _replica("replica-4", lag=10),
+    ]
+
+    # Execute
+    picked = [source._pick_replica().host for _ in range(4)]
+
+    # Assert
+    assert sorted(picked) == ["replica-1", "replica-1", "replica-4", "replica-4"]
+    assert picked[0] != picked[1]
+
+
+def test_pick_replica_least_loaded():
+    """Test _pick_replica method of MySQL picks the replica with the fewest queries"""
+    # Setup
+    source = create_source(MySqlDataSource, replica_routing="least_loaded")
+    source.replicas = [
+        _replica("replica-1", in_use=3),
+        _replica("replica-2", in_use=1),
+        _replica("replica-3", in_use=2),
+    ]
+
+    # Execute and Assert
+    assert source._pick_replica().host == "replica-2"
+
+
+@pytest.mark.parametrize(
+    "configuration",
+    [{"cdc": True}, {"consistent_snapshot": True}],
+)
+def test_pick_replica_with_primary_only_reads(configuration):
+    """Test _pick_replica method of MySQL reads from the primary when the rows go with its binlog or snapshot"""
+    # Setup
+    source = create_source(MySqlDataSource, **configuration)
+    source.replicas = [_replica("replica-1")]
+
+    # Execute and Assert
+    assert source._pick_replica() is None
+
+
+def test_pick_replica_when_all_replicas_lag():
+    """Test _pick_replica method of MySQL falls back to the primary when every replica lags"""
+    # Setup
+    source = create_source(MySqlDataSource, max_replica_lag=60)
+    source.replicas = [_replica("replica-1", lag=61), _replica("replica-2", lag=None)]
+
+    # Execute and Assert
+    assert source._pick_replica() is None
+
+
+@pytest.mark.asyncio
+async def test_connect_routes_scans_to_replicas():
+    """Test _connect method of MySQL sends table scans to a replica and other queries to the primary"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    servers = []
+
+    def _pool(name):
+        @asynccontextmanager
+        async def _acquire():
+            servers.append(name)
+            connection = mock.Mock()
+            connection.cursor = mock.Mock(return_value=BatchCursor([], []))
+            yield connection
+
+        pool = mock.MagicMock()
+        pool.acquire = _acquire
+        return pool
+
+    source.connection_pool = _pool("primary")
+    replica = Replica(host="replica-1", port=3306, pool=_pool("replica-1"))
+    replica.lag = 0
+    source.replicas = [replica]
+
+    # Execute
+    [
+        row
+        async for row in source._connect(
+            query=QUERIES["TABLE_DATA"],
+            fetch_many=True,
+            database="db",
+            table="table",
+            columns="*",
+        )
+    ]
+    await anext(source._connect(query=QUERIES["ALL_DATABASE"]))
+
+    # Assert
+    assert servers == ["replica-1", "primary"]
+
+
+@pytest.mark.asyncio
+async def test_ping_with_replicas(patch_logger):
+    """Test ping method of MySQL sets up a pool for each replica which can be reached"""
+    # Setup
+    source = create_source(
+        MySqlDataSource, replicas="replica-1, replica-2:3307, replica-3"
+    )
+    primary = mock.MagicMock()
+    primary.acquire = Connection
+    replica_pool = mock.MagicMock()
+
+    async def _create_pool(**settings):
+        if "host" not in settings:
+            return primary
+        if settings["host"] == "replica-3":
+            raise Exception("Can't connect to MySQL server on 'replica-3'")
+        return replica_pool
+
+    source._create_pool = _create_pool
+    with mock.patch.object(Replica, "read_lag", AsyncMock(return_value=0)):
+        # Execute
+        await source.ping()
+
+    # Assert
+    assert [replica.name for replica in source.replicas] == [
+        "replica-1:3306",
+        "replica-2:3307",
+    ]
+    assert source.sync_stats()["replicas"]["replica-2:3307"]["lag"] == 0
+
+
+@pytest.mark.asyncio
+async def test_check_replicas(patch_logger):
+    """Test _check_replicas method of MySQL stops reading from replicas whose lag can't be read"""
+    # Setup
+    source = create_source(MySqlDataSource)
+    replica = _replica("replica-1", lag=0)
+    replica.checked_at = 0
+    source.replicas = [replica]
+    replica.read_lag = AsyncMock(side_effect=Exception("Access denied"))
+
+    # Execute
+    await source._check_replicas()
+
+    # Assert
+    assert replica.lag is None
+    assert source._pick_replica() is None
+
+
+@pytest.mark.asyncio
+async def test_replica_read_lag_on_older_servers():
+    """Test Replica.read_lag reads SHOW SLAVE STATUS on servers without SHOW REPLICA STATUS"""
+    # Setup
+    cursor = mock.MagicMock()
+    queries = []
+
+    async def _execute(query):
+        queries.append(query)
+        if query == QUERIES["REPLICA_STATUS"]:
+            raise aiomysql.ProgrammingError(1064, "You have an error in your SQL")
+
+    cursor.execute = _execute
+    cursor.fetchone = AsyncMock(return_value={"Seconds_Behind_Master": 12})
+
+    @asynccontextmanager
+    async def _cursor(cursor_class):
+        yield cursor
+
+    @asynccontextmanager
+    async def _acquire():
+        connection = mock.Mock()
+        connection.cursor = _cursor
+        yield connection
+
+    pool = mock.MagicMock()
+    pool.acquire = _acquire
+    replica = Replica(host="replica-1", port=3306, pool=pool)
+
+    # Execute
+    lag = await replica.read_lag()
+
+    # Assert
+    assert lag == 12
+    assert queries == [QUERIES["REPLICA_STATUS"], QUERIES["SLAVE_STATUS"]]
+
+
+@pytest.mark.asyncio
+async def test_get_docs_tracks_sync_checkpoint(patch_validate_databases):
+    """Test get_docs method of MySQL records the position of the last row in the sync checkpoint"""
+    # Setup
+    source = create_source(MySqlDataSource, resumable_syncs=True)
+    source.configuration.get_field("resumable_syncs").type = "bool"
+    source.configuration.set_field(name="database", value=["db"])
+
+    async def _fetch_rows_from_all_tables(database):
+        source.ordered_tables[(database, "table")] = ["id", "code"]
+        source.last_keys[(database, "table")] = (Decimal("1.10"), b"\x00\xff")
+        yield {
+            "_id": "db_table_1.1_\x00\xff_",
+            "Database": "db",
+            "Table": "table",
+            "db_table_id": 1.1,
+            "db_table_code": "\x00\xff",
+        }
+        yield {"_id": "db_other_1_", "Database": "db", "Table": "other"}
+
+    source.fetch_rows_from_all_tables = _fetch_rows_from_all_tables
+    checkpoints = []
+
+    # Execute
+    async for _ in source.get_docs():
+        checkpoints.append(source.sync_checkpoint())
+
+    # Assert
+    assert checkpoints == [
+        {
+            "filtering": "{}",
+            "completed_tables": [],
+            "database": "db",
+            "table": "table",
+            "key": [{"decimal": "1.10"}, {"bytes": "AP8="}],
+        },
+        {
+            "filtering": "{}",
+            "completed_tables": [["db", "table"]],
+            "database": "db",
+            "table": "other",
+            "key": None,
+        },
+    ]
+
+
+def test_sync_checkpoint_without_resumable_syncs():
+    """Test sync_checkpoint method of MySQL when the syncs can't be resumed"""
+    # Setup
+    source = create_source(MySqlDataSource, resumable_syncs=True, cdc=True)
+    source.position = ("db", "table", None)
+
+    # Execute and Assert
+    assert source.sync_checkpoint() is None
+
+
+@pytest.mark.asyncio
+async def test_fetch_documents_resumes_from_checkpoint():
+    """Test fetch_documents method of MySQL skips the tables read before the sync was interrupted, resumes after the last key and keeps the documents of those tables only"""
+    # Setup
+    source = create_source(MySqlDataSource, resumable_syncs=True)
+    source.set_sync_checkpoint(
+        {
+            "filtering": "{}",
+            "completed_tables": [["db", "done"]],
+            "database": "db",
+            "table": "table",
+            "key": [10],
+        }
+    )
+    source._resume(filtering=None)
+    source.catalog = {
+        "db": {
+            "table": {
+                "primary_keys": ["id"],
+                "columns": {"id": "int"},
+                "update_time": datetime(2023, 1, 1),
+                "row_count": 20,
+            }
+        }
+    }
+    source._connect = mock.MagicMock()
+    source._fetch_rows_by_keyset = mock.MagicMock(
+        return_value=AsyncIter([["db_table_id"], (11,)]).__aiter__()
+    )
+
+    # Execute
+    skipped = [doc async for doc in source.fetch_documents(database="db", table="done")]
+    documents = [
+        doc async for doc in source.fetch_documents(database="db", table="table")
+    ]
+
+    # Assert
+    assert skipped == []
+    source._connect.assert_not_called()
+    source._fetch_rows_by_keyset.assert_called_once_with(
+        database="db",
+        table="table",
+        primary_keys=["id"],
+        lower=(10,),
+        columns="*",
+        row_filter=None,
+        decoders=None,
+    )
+    assert [doc["_id"] for doc in documents] == ["db_table_11_"]
+    assert source.last_keys[("db", "table")] == (11,)
+    assert source.resumed
+    assert not source.should_delete("db_done_1_")
+    assert not source.should_delete("db_table_1_")
+    assert source.should_delete("db_other_1_")
+
+
+def test_resume_decodes_the_key():
+    """Test _resume method of MySQL gives back the primary key values read before the sync was interrupted"""
+    # Setup
+    key = (
+        Decimal("1.10"),
+        b"\x00\xff",
+        datetime(2023, 1, 1, 10, 30, 0, 123456),
+        date(2023, 1, 1),
+        timedelta(hours=1, microseconds=5),
+        "name",
+        7,
+    )
+    source = create_source(MySqlDataSource, resumable_syncs=True)
+    source.set_sync_checkpoint(
+        {
+            "filtering": "{}",
+            "completed_tables": [],
+            "database": "db",
+            "table": "table",
+            "key": json.loads(json.dumps(encode_key(key))),
+        }
+    )
+
+    # Execute
+    source._resume(filtering=None)
+
+    # Assert
+    assert source.resume_keys[("db", "table")] == list(key)
+
+
+def test_resume_with_different_filtering(patch_logger):
+    """Test _resume method of MySQL runs a full pass when the filtering changed"""
+    # Setup
+    source = create_source(MySqlDataSource, resumable_syncs=True)
+    source.set_sync_checkpoint(
+        {
+            "filtering": "{}",
+            "completed_tables": [["db", "done"]],
+            "database": "db",
+            "table": "table",
+            "key": [10],
+        }
+    )
+
+    # Execute
+    source._resume(filtering=Filter({"rules": [{"id": "rule"}]}))
+
+    # Assert
+    assert not source.resumed
+    assert source.completed_tables == []
+    assert source.resume_keys == {}
+
+
+@pytest.mark.asyncio
+async def test_fetch_schema():
+    """Test fetch_schema method of MySQL lists the tables of all the databases at once, and caches them"""
+    # Setup
+    source = create_source(MySqlDataSource, schema_cache_ttl=30)
+    source._connect = mock.MagicMock(
+        return_value=AsyncIter(
+            [[("db_1", "table_1"), ("db_1", "table_2"), ("db_2", "table_1")]]
+        ).__aiter__()
+    )
+
+    # Execute
+    schema = await source.fetch_schema(databases=["db_1", "db_2", "db_3"])
+    cached_schema = await source.fetch_schema(databases=["db_1"])
+
+    # Assert
+    source._connect.assert_called_once_with(
+        query=QUERIES["DATABASES_TABLES"],
+        query_args=("db_1", "db_2", "db_3"),
+        databases="%s, %s, %s",
+    )
+    assert schema == {
+        "db_1": ["table_1", "table_2"],
+        "db_2": ["table_1"],
+        "db_3": [],
+    }
+    assert cached_schema == {"db_1": ["table_1", "table_2"]}
+
+
+@pytest.mark.asyncio
+async def test_fetch_schema_shared_by_instances():
+    """Test fetch_schema method of MySQL shares the tables listed by another instance reading the same server"""
+    # Setup
+    validation_source = create_source(MySqlDataSource, schema_cache_ttl=30)
+    validation_source._connect = mock.MagicMock(
+        return_value=AsyncIter([[("db", "table")]]).__aiter__()
+    )
+    sync_source = create_source(MySqlDataSource, schema_cache_ttl=30)
+    sync_source._connect = mock.MagicMock()
+    other_source = create_source(
+        MySqlDataSource, schema_cache_ttl=30, host="other-host"
+    )
+    other_source._connect = mock.MagicMock(
+        return_value=AsyncIter([[("db", "other_table")]]).__aiter__()
+    )
+
+    # Execute
+    await validation_source.fetch_schema(databases=["db"])
+    schema = await sync_source.fetch_schema(databases=["db"])
+    other_schema = await other_source.fetch_schema(databases=["db"])
+
+    # Assert
+    sync_source._connect.assert_not_called()
+    assert schema == {"db": ["table"]}
+    assert other_schema == {"db": ["other_table"]}
+
+
+@pytest.mark.asyncio
+async def test_fetch_schema_without_cache():
+    """Test fetch_schema method of MySQL lists the tables again once they expired"""
+    # Setup
+    source = create_source(MySqlDataSource, schema_cache_ttl=0)
+    source._connect = mock.MagicMock(
+        side_effect=lambda **kwargs: AsyncIter([[("db", "table")]]).__aiter__()
+    )
+
+    # Execute
+    await source.fetch_schema(databases=["db"])
+    await source.fetch_schema(databases=["db"])
+
+    # Assert
+    assert source._connect.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_advanced_rules_validation_with_explain(
+    patch_configured_databases, patch_validate_databases, patch_ping
+):
+    """Test the advanced rules validation of MySQL reports the queries EXPLAIN fails on"""
+    # Setup
+    patch_configured_databases.return_value = [DB_ONE]
+    patch_validate_databases.return_value = []
+    source = create_source(MySqlDataSource, explain_advanced_rules=True)
+    source.fetch_schema = AsyncMock(return_value={DB_ONE: [TABLE_ONE, TABLE_TWO]})
+    source.explain_query = AsyncMock(
+        side_effect=lambda database, table, query: None
+        if table == TABLE_ONE
+        else "You have an error in your SQL syntax"
+    )
+
+    # Execute
+    validation_result = await MySQLAdvancedRulesValidator(source).validate(
+        {DB_ONE: {TABLE_ONE: "SELECT * FROM table1", TABLE_TWO: "SELEC"}}
+    )
+
+    # Assert
+    assert validation_result == SyncRuleValidationResult(
+        rule_id=SyncRuleValidationResult.ADVANCED_RULES,
+        is_valid=False,
+        validation_message=f"Invalid queries (database -> table: error): ({DB_ONE} -> {TABLE_TWO}: You have an error in your SQL syntax).",
+    )
+    assert source.explain_query.call_count == 2
@@ -29,6 +29,30 @@ class FakeSource:
     async def changed(self):
         return True
 
+    def sync_cursor(self):
+        return None
+
+    def set_sync_cursor(self, sync_cursor):
+        pass
+
+    def sync_checkpoint(self):
+        return None
+
+    def set_sync_checkpoint(self, checkpoint):
+        pass
+
+    def set_filtering(self, filtering):
+        pass
+
+    def sync_stats(self):
+        return {}
+
+    def basic_rules_matches(self):
+        return {}
+
+    def should_delete(self, doc_id):
+        return True
+
     async def ping(self):
         pass
 
@@ -309,6 +309,19 @@ def test_engine_should_ingest(documents_should_ingest_tuples, rules, expected_st
     )
 
 
+def test_engine_add_matches():
+    engine = BasicRuleEngine(parse([BASIC_RULE_ONE_JSON, BASIC_RULE_TWO_JSON]))
+
+    engine.add_matches(BASIC_RULE_TWO_ID, 3)
+    engine.add_matches(BASIC_RULE_TWO_ID, 2)
+    engine.add_matches("unknown rule", 1)
+
+    assert engine.rules_match_stats == {
+        BasicRule.DEFAULT_RULE_ID: RuleMatchStats(Policy.INCLUDE, 0),
+        BASIC_RULE_TWO_ID: RuleMatchStats(Policy.EXCLUDE, 5),
+    }
+
+
 def basic_rule_one_policy_and_rule_uppercase():
     basic_rule_uppercase = BASIC_RULE_ONE_JSON
 
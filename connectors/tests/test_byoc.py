@@ -1071,3 +1071,85 @@ async def test_prepare_docs(filtering, expected_filtering_calls):
     assert all(
         type(filter_) == Filter for _, filter_ in docs_generator_fake.call_kwargs
     )
+
+
+@pytest.mark.parametrize(
+    "exception, expected_sync_cursor",
+    [(None, {"cursor": "new"}), (Exception("Something went wrong"), {"cursor": "old"})],
+)
+@pytest.mark.asyncio
+async def test_sync_done_saves_sync_cursor(exception, expected_sync_cursor):
+    connector_src = {
+        "service_type": "test",
+        "index_name": "search-some-index",
+        "configuration": {},
+        "language": "en",
+        "scheduling": {},
+        "status": "created",
+        "sync_cursor": {"cursor": "old"},
+    }
+    connector = Connector(StubIndex(), "test", connector_src, {})
+    connector._start_time = 0
+    connector.data_provider = Mock()
+    connector.data_provider.sync_cursor = Mock(return_value={"cursor": "new"})
+    job = Mock()
+    job.done = AsyncMock()
+
+    await connector._sync_done(job, {}, exception=exception)
+
+    assert connector.doc_source["sync_cursor"] == expected_sync_cursor
+
+
+@pytest.mark.asyncio
+async def test_sync_done_logs_sync_stats(patch_logger):
+    connector_src = {
+        "service_type": "test",
+        "index_name": "search-some-index",
+        "configuration": {},
+        "language": "en",
+        "scheduling": {},
+        "status": "created",
+    }
+    connector = Connector(StubIndex(), "test", connector_src, {})
+    connector._start_time = 0
+    connector.data_provider = Mock()
+    connector.data_provider.sync_stats = Mock(
+        return_value={"fetch_sizes": {"db.table": 100}}
+    )
+    job = Mock()
+    job.done = AsyncMock()
+
+    await connector._sync_done(job, {})
+
+    patch_logger.assert_present(
+        f"[{connector.id}] Sync stats: {{'fetch_sizes': {{'db.table': 100}}}}"
+    )
+
+
+@pytest.mark.asyncio
+async def test_sync_closes_the_data_provider_when_nothing_changed(patch_logger):
+    connector_src = {
+        "service_type": "test",
+        "index_name": "search-some-index",
+        "configuration": {},
+        "language": "en",
+        "scheduling": {},
+        "status": "connected",
+    }
+    connector = Connector(StubIndex(), "test", connector_src, {})
+    connector.next_sync = Mock(return_value=0)
+    data_provider = Mock()
+    data_provider.changed = AsyncMock(return_value=False)
+    data_provider.close = AsyncMock()
+    connector.source_klass = Mock(return_value=data_provider)
+    elastic_server = Mock()
+    elastic_server.async_bulk = AsyncMock()
+
+    await connector.sync(elastic_server, idling=0)
+
+    data_provider.set_filtering.assert_called_once_with(
+        connector.filtering.get_active_filter()
+    )
+    data_provider.close.assert_awaited_once()
+    assert connector.data_provider is None
+    elastic_server.async_bulk.assert_not_awaited()
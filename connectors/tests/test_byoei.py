@@ -5,7 +5,12 @@
 #
 import asyncio
 import datetime
+import gzip
+import itertools
+import json
+import zlib
 from copy import deepcopy
+from decimal import Decimal
 from unittest import mock
 from unittest.mock import Mock, call
 
@@ -13,12 +18,18 @@ import pytest
 
 from connectors.byoc import PipelineSettings
 from connectors.byoei import (
+    BulkController,
+    Bulker,
     ContentIndexNameInvalid,
     ElasticServer,
+    ErrorBudgetExceeded,
     Fetcher,
     IndexMissing,
+    compress,
+    encode_ndjson,
 )
 from connectors.tests.commons import AsyncGeneratorFake
+from connectors.utils import MemQueue
 
 INDEX = "some-index"
 TIMESTAMP = datetime.datetime(year=2023, month=1, day=1)
@@ -34,6 +45,15 @@ DOC_ONE_DIFFERENT_TIMESTAMP = {
 
 DOC_TWO = {"_id": 2, "_timestamp": TIMESTAMP}
 
+DOC_ONE_HASHED = {**DOC_ONE, "_content_hash": "abc"}
+
+DOC_ONE_HASHED_DIFFERENT_TIMESTAMP = {
+    **DOC_ONE_DIFFERENT_TIMESTAMP,
+    "_content_hash": "abc",
+}
+
+DOC_ONE_DIFFERENT_HASH = {**DOC_ONE, "_content_hash": "def"}
+
 SYNC_RULES_ENABLED = True
 SYNC_RULES_DISABLED = False
 
@@ -174,7 +194,7 @@ async def test_get_existing_ids(mock_responses):
 
     es = ElasticServer(config)
     ids = []
-    async for doc_id, ts in es.get_existing_ids("search-some-index"):
+    async for doc_id, ts, content_hash in es.get_existing_ids("search-some-index"):
         ids.append(doc_id)
 
     assert ids == ["1", "2"]
@@ -209,6 +229,9 @@ async def test_async_bulk(mock_responses, patch_logger):
         "doc_deleted": 1,
         "attachment_extracted": 1,
         "doc_updated": 1,
+        "doc_retried": 0,
+        "doc_dropped": 0,
+        "dead_letters": [],
         "fetch_error": None,
     }
 
@@ -222,6 +245,9 @@ async def test_async_bulk(mock_responses, patch_logger):
         "doc_deleted": 1,
         "attachment_extracted": 1,
         "doc_updated": 1,
+        "doc_retried": 0,
+        "doc_dropped": 0,
+        "dead_letters": [],
         "fetch_error": None,
     }
 
@@ -253,6 +279,9 @@ async def test_async_bulk_same_ts(mock_responses, patch_logger):
         "doc_deleted": 1,
         "attachment_extracted": 0,
         "doc_updated": 0,
+        "doc_retried": 0,
+        "doc_dropped": 0,
+        "dead_letters": [],
         "fetch_error": None,
     }
 
@@ -265,6 +294,9 @@ async def test_async_bulk_same_ts(mock_responses, patch_logger):
         "doc_deleted": 1,
         "attachment_extracted": 0,
         "doc_updated": 0,
+        "doc_retried": 0,
+        "doc_dropped": 0,
+        "dead_letters": [],
         "fetch_error": None,
     }
 
@@ -352,7 +384,10 @@ async def lazy_downloads_mock():
 
 async def setup_fetcher(basic_rule_engine, existing_docs, queue, sync_rules_enabled):
     client = Mock()
-    existing_ids = {doc["_id"]: doc["_timestamp"] for doc in existing_docs}
+    existing_ids = {
+        doc["_id"]: (doc["_timestamp"], doc.get("_content_hash"))
+        for doc in existing_docs
+    }
 
     # filtering content doesn't matter as the BasicRuleEngine behavior is mocked
     filtering_mock = Mock()
@@ -430,6 +465,30 @@ async def setup_fetcher(basic_rule_engine, existing_docs, queue, sync_rules_enab
             deleted(0),
             total_downloads(0),
         ),
+        (
+            # doc 1 is present, data source has doc 1 with a different timestamp but the same content hash -> nothing happens
+            [DOC_ONE_HASHED],
+            [(DOC_ONE_HASHED_DIFFERENT_TIMESTAMP, None)],
+            NO_FILTERING,
+            SYNC_RULES_ENABLED,
+            [end_docs_operation()],
+            updated(0),
+            created(0),
+            deleted(0),
+            total_downloads(0),
+        ),
+        (
+            # doc 1 is present, data source has doc 1 with the same timestamp but a different content hash -> doc is updated
+            [DOC_ONE_HASHED],
+            [(DOC_ONE_DIFFERENT_HASH, None)],
+            NO_FILTERING,
+            SYNC_RULES_ENABLED,
+            [index_operation(DOC_ONE_DIFFERENT_HASH), end_docs_operation()],
+            updated(1),
+            created(0),
+            deleted(0),
+            total_downloads(0),
+        ),
         (
             [],
             [(DOC_ONE, None)],
@@ -580,3 +639,496 @@ async def test_get_docs(
         assert fetcher.total_downloads == expected_total_downloads
 
         assert queue_called_with_operations(queue, expected_queue_operations)
+
+
+@pytest.mark.asyncio
+async def test_get_docs_keeps_docs_the_data_provider_should_not_delete():
+    queue = await queue_mock()
+    data_provider = Mock()
+    data_provider.should_delete = Mock(
+        side_effect=lambda doc_id: doc_id != DOC_TWO["_id"]
+    )
+    existing_ids = {
+        DOC_ONE_ID: (TIMESTAMP, None),
+        DOC_TWO["_id"]: (TIMESTAMP, None),
+    }
+    filtering_mock = Mock()
+    filtering_mock.get_active_filter = Mock(return_value={})
+    fetcher = Fetcher(
+        Mock(),
+        queue,
+        INDEX,
+        existing_ids,
+        filtering=filtering_mock,
+        data_provider=data_provider,
+    )
+
+    await fetcher.get_docs(AsyncGeneratorFake([]))
+
+    assert fetcher.total_docs_deleted == deleted(1)
+    assert queue_called_with_operations(
+        queue, [delete_operation(DOC_ONE), end_docs_operation()]
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_docs_with_deletions_from_the_data_provider():
+    queue = await queue_mock()
+    existing_ids = {DOC_ONE_ID: (TIMESTAMP, None)}
+    fetcher = await setup_fetcher(
+        None, [DOC_ONE], queue, sync_rules_enabled=SYNC_RULES_DISABLED
+    )
+    fetcher.existing_ids = existing_ids
+
+    await fetcher.get_docs(
+        AsyncGeneratorFake([({"_id": DOC_ONE_ID, "_op_type": "delete"}, None)])
+    )
+
+    assert fetcher.total_docs_deleted == deleted(1)
+    assert existing_ids == {}
+    assert queue_called_with_operations(
+        queue, [delete_operation(DOC_ONE), end_docs_operation()]
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_docs_counts_basic_rules_matches_of_the_data_provider():
+    queue = await queue_mock()
+    data_provider = Mock()
+    data_provider.should_delete = Mock(return_value=True)
+    data_provider.basic_rules_matches = Mock(return_value={"rule": 3})
+    filtering_mock = Mock()
+    filtering_mock.get_active_filter = Mock(return_value={})
+    fetcher = Fetcher(
+        Mock(),
+        queue,
+        INDEX,
+        {},
+        filtering=filtering_mock,
+        sync_rules_enabled=SYNC_RULES_ENABLED,
+        data_provider=data_provider,
+    )
+    fetcher.basic_rule_engine = Mock()
+
+    await fetcher.get_docs(AsyncGeneratorFake([]))
+
+    fetcher.basic_rule_engine.add_matches.assert_called_once_with("rule", 3)
+
+
+@pytest.mark.asyncio
+async def test_get_docs_queues_checkpoints_of_the_data_provider():
+    queue = await queue_mock()
+    data_provider = Mock()
+    data_provider.should_delete = Mock(return_value=True)
+    data_provider.sync_checkpoint = Mock(side_effect=[{"position": 1}, None])
+    filtering_mock = Mock()
+    filtering_mock.get_active_filter = Mock(return_value={})
+    with mock.patch(
+        "connectors.byoei.time.monotonic", side_effect=itertools.count(step=60)
+    ):
+        fetcher = Fetcher(
+            Mock(),
+            queue,
+            INDEX,
+            {},
+            filtering=filtering_mock,
+            data_provider=data_provider,
+            checkpoint_interval=60,
+        )
+        await fetcher.get_docs(
+            AsyncGeneratorFake([(deepcopy(DOC_ONE), None), (deepcopy(DOC_TWO), None)])
+        )
+
+    assert queue_called_with_operations(
+        queue,
+        [
+            index_operation(DOC_ONE),
+            {"_op_type": "checkpoint", "checkpoint": {"position": 1}},
+            index_operation(DOC_TWO),
+            end_docs_operation(),
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_bulker_saves_checkpoints_once_the_previous_operations_are_sent():
+    queue = MemQueue(maxsize=10, maxmemsize=1024 * 1024)
+    events = []
+
+    async def _bulk(operations, pipeline):
+        await asyncio.sleep(0)
+        events.append(operations.count(b"\n"))
+        return {"items": []}
+
+    async def _on_checkpoint(checkpoint):
+        events.append(checkpoint)
+
+    client = Mock()
+    client.bulk = _bulk
+    bulker = Bulker(
+        client,
+        queue,
+        chunk_size=500,
+        pipeline_settings=Mock(),
+        chunk_mem_size=1,
+        max_concurrency=5,
+        on_checkpoint=_on_checkpoint,
+    )
+    await queue.put(index_operation(DOC_ONE))
+    await queue.put({"_op_type": "checkpoint", "checkpoint": {"position": 1}})
+    await queue.put(index_operation(DOC_TWO))
+    await queue.put(end_docs_operation())
+
+    await bulker.run()
+
+    assert events == [2, {"position": 1}, 2]
+    assert bulker.ops == {"index": 2}
+
+
+def test_encode_ndjson():
+    lines = [
+        {"index": {"_index": "search-index", "_id": "1"}},
+        {"title": "é", "price": Decimal("10.5"), "created": datetime.date(2023, 1, 1)},
+    ]
+
+    encoded = encode_ndjson(lines)
+
+    assert encoded.endswith(b"\n")
+    assert [json.loads(line) for line in encoded.splitlines()] == [
+        {"index": {"_index": "search-index", "_id": "1"}},
+        {"title": "é", "price": 10.5, "created": "2023-01-01"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bulker_sends_ndjson_bodies_of_at_most_chunk_mem_size():
+    queue = MemQueue(maxsize=10, maxmemsize=1024 * 1024)
+    bodies = []
+
+    async def _bulk(operations, pipeline):
+        bodies.append(operations)
+        return {"items": []}
+
+    client = Mock()
+    client.bulk = _bulk
+    bulker = Bulker(
+        client,
+        queue,
+        chunk_size=500,
+        pipeline_settings=Mock(),
+        # a bit more than one operation
+        chunk_mem_size=1.5 * 512 / (1024 * 1024),
+        max_concurrency=5,
+    )
+    for doc_id in range(3):
+        await queue.put(index_operation({"_id": doc_id, "data": "x" * 512}))
+    await queue.put(end_docs_operation())
+
+    await bulker.run()
+
+    assert [body.count(b"\n") for body in bodies] == [4, 2]
+    assert all(isinstance(body, bytes) for body in bodies)
+
+
+def bulk_client(*responses):
+    bodies = []
+
+    async def _bulk(operations, pipeline):
+        bodies.append(operations)
+        return responses[len(bodies) - 1]
+
+    client = Mock()
+    client.bulk = _bulk
+    return client, bodies
+
+
+def bulk_item(doc_id, status, error=None):
+    item = {"_id": doc_id, "status": status}
+    if error is not None:
+        item["error"] = {"type": error, "reason": f"{error} on {doc_id}"}
+    return {"index": item}
+
+
+async def run_bulker(client, docs, **options):
+    queue = MemQueue(maxsize=10, maxmemsize=1024 * 1024)
+    bulker = Bulker(
+        client,
+        queue,
+        chunk_size=500,
+        pipeline_settings=PipelineSettings({}),
+        chunk_mem_size=1,
+        max_concurrency=5,
+        retry_interval=0,
+        **options,
+    )
+    for doc in docs:
+        await queue.put(index_operation(doc))
+    await queue.put(end_docs_operation())
+    await bulker.run()
+    return bulker
+
+
+@pytest.mark.asyncio
+async def test_bulker_retries_rejected_operations(patch_logger):
+    client, bodies = bulk_client(
+        {
+            "errors": True,
+            "items": [
+                bulk_item("1", 201),
+                bulk_item("2", 429, "es_rejected_execution_exception"),
+            ],
+        },
+        {"errors": False, "items": [bulk_item("2", 201)]},
+    )
+
+    bulker = await run_bulker(client, [DOC_ONE, DOC_TWO])
+
+    assert len(bodies) == 2
+    assert [json.loads(line)["id"] for line in bodies[1].splitlines()[1::2]] == [
+        DOC_TWO["_id"]
+    ]
+    assert bulker.retried == 1
+    assert bulker.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_bulker_drops_failed_operations_within_the_error_budget(patch_logger):
+    client, bodies = bulk_client(
+        {
+            "errors": True,
+            "items": [
+                bulk_item("1", 400, "mapper_parsing_exception"),
+                bulk_item("2", 429, "es_rejected_execution_exception"),
+            ],
+        },
+        {
+            "errors": True,
+            "items": [bulk_item("2", 429, "es_rejected_execution_exception")],
+        },
+    )
+
+    bulker = await run_bulker(client, [DOC_ONE, DOC_TWO], max_retries=1, error_budget=2)
+
+    assert len(bodies) == 2
+    assert bulker.retried == 1
+    assert bulker.dropped == 2
+    assert [(letter["_id"], letter["status"]) for letter in bulker.dead_letters] == [
+        ("1", 400),
+        ("2", 429),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bulker_fails_over_the_error_budget(patch_logger):
+    client, _ = bulk_client(
+        {
+            "errors": True,
+            "items": [
+                bulk_item("1", 400, "mapper_parsing_exception"),
+                bulk_item("2", 400, "mapper_parsing_exception"),
+            ],
+        },
+    )
+
+    with pytest.raises(ErrorBudgetExceeded):
+        await run_bulker(client, [DOC_ONE, DOC_TWO], error_budget=1)
+
+
+@pytest.mark.asyncio
+async def test_bulker_fails_when_a_finished_bulk_exceeded_the_error_budget(
+    patch_logger,
+):
+    queue = MemQueue(maxsize=10, maxmemsize=1024 * 1024)
+    sent = asyncio.Event()
+    checkpoints = []
+
+    async def _bulk(operations, pipeline):
+        sent.set()
+        return {
+            "errors": True,
+            "items": [bulk_item("1", 400, "mapper_parsing_exception")],
+        }
+
+    async def _on_checkpoint(checkpoint):
+        checkpoints.append(checkpoint)
+
+    client = Mock()
+    client.bulk = _bulk
+    bulker = Bulker(
+        client,
+        queue,
+        # each operation is sent on its own
+        chunk_size=2,
+        pipeline_settings=PipelineSettings({}),
+        chunk_mem_size=1,
+        max_concurrency=5,
+        on_checkpoint=_on_checkpoint,
+    )
+
+    async def _produce():
+        await queue.put(index_operation(DOC_ONE))
+        await sent.wait()
+        # the bulk task is over before the checkpoint joins it
+        await asyncio.sleep(0.01)
+        assert len(bulker.bulk_tasks) == 0
+        await queue.put({"_op_type": "checkpoint", "checkpoint": {"position": 1}})
+        await queue.put(end_docs_operation())
+
+    with pytest.raises(ErrorBudgetExceeded):
+        await asyncio.gather(bulker.run(), _produce())
+
+    assert checkpoints == []
+
+
+@pytest.mark.asyncio
+async def test_bulker_does_not_checkpoint_after_a_failed_bulk(patch_logger):
+    queue = MemQueue(maxsize=10, maxmemsize=1024 * 1024)
+    checkpoints = []
+
+    async def _bulk(operations, pipeline):
+        raise ConnectionError("the cluster went away")
+
+    async def _on_checkpoint(checkpoint):
+        checkpoints.append(checkpoint)
+
+    client = Mock()
+    client.bulk = _bulk
+    bulker = Bulker(
+        client,
+        queue,
+        chunk_size=2,
+        pipeline_settings=PipelineSettings({}),
+        chunk_mem_size=1,
+        max_concurrency=5,
+        on_checkpoint=_on_checkpoint,
+    )
+    await queue.put(index_operation(DOC_ONE))
+    await queue.put({"_op_type": "checkpoint", "checkpoint": {"position": 1}})
+    await queue.put(end_docs_operation())
+
+    with pytest.raises(ConnectionError):
+        await bulker.run()
+
+    assert checkpoints == []
+
+
+MiB = 1024 * 1024
+
+
+@pytest.mark.parametrize(
+    "elapsed, took, rejected, expected_chunk_mem_size, expected_concurrency",
+    [
+        # healthy responses grow the size, the concurrency is already at its max
+        (1, 500, 0, 8 * MiB, 4),
+        # rejections halve both
+        (1, 500, 3, 3.5 * MiB, 2),
+        # slow requests halve the size
+        (12, 11000, 0, 3.5 * MiB, 4),
+        # requests waiting besides their took halve the concurrency
+        (12, 1000, 0, 7 * MiB, 2),
+        # without took, the latency is the elapsed time
+        (12, None, 0, 3.5 * MiB, 4),
+    ],
+)
+def test_bulk_controller(
+    elapsed, took, rejected, expected_chunk_mem_size, expected_concurrency, patch_logger
+):
+    controller = BulkController(
+        max_chunk_mem_size=8,
+        max_concurrency=4,
+        min_chunk_mem_size=1,
+        target_latency=10,
+    )
+    controller.chunk_mem_size = 7 * MiB
+
+    controller.update(elapsed=elapsed, took=took, rejected=rejected)
+
+    assert controller.chunk_mem_size == expected_chunk_mem_size
+    assert controller.concurrency == expected_concurrency
+
+
+def test_bulk_controller_stays_within_limits(patch_logger):
+    controller = BulkController(
+        max_chunk_mem_size=4, max_concurrency=4, min_chunk_mem_size=1
+    )
+
+    for _ in range(10):
+        controller.update(elapsed=1, rejected=1)
+    assert (controller.chunk_mem_size, controller.concurrency) == (1 * MiB, 1)
+
+    for _ in range(20):
+        controller.update(elapsed=1, took=100)
+    assert (controller.chunk_mem_size, controller.concurrency) == (4 * MiB, 4)
+
+
+def test_bulk_controller_keeps_one_request(patch_logger):
+    controller = BulkController(
+        max_chunk_mem_size=4, max_concurrency=4, min_concurrency=0
+    )
+
+    for _ in range(10):
+        controller.update(elapsed=1, rejected=1)
+    assert controller.concurrency == 1
+
+
+@pytest.mark.asyncio
+async def test_bulker_follows_its_controller(patch_logger):
+    client, _ = bulk_client(
+        {
+            "errors": True,
+            "took": 10,
+            "items": [bulk_item("1", 429, "es_rejected_execution_exception")],
+        },
+        {"errors": False, "took": 10, "items": [bulk_item("1", 201)]},
+    )
+    controller = BulkController(max_chunk_mem_size=4, max_concurrency=4)
+
+    bulker = await run_bulker(client, [DOC_ONE], controller=controller)
+
+    assert bulker.retried == 1
+    assert bulker.chunk_mem_size == controller.chunk_mem_size == 3 * MiB
+    assert bulker.bulk_tasks.max_concurrency == controller.concurrency == 2
+
+
+@pytest.mark.parametrize(
+    "compression, decompress", [("gzip", gzip.decompress), ("deflate", zlib.decompress)]
+)
+def test_compress(compression, decompress):
+    body = b'{"index":{"_id":"1"}}\n{"title":"some text"}\n' * 100
+
+    compressed = compress(body, compression, level=1)
+
+    assert len(compressed) < len(body)
+    assert decompress(compressed) == body
+
+
+def test_compress_with_unsupported_compression():
+    with pytest.raises(ValueError):
+        compress(b"{}", "brotli")
+
+
+@pytest.mark.parametrize(
+    "compression, decompress", [("gzip", gzip.decompress), ("deflate", zlib.decompress)]
+)
+@pytest.mark.asyncio
+async def test_bulker_sends_compressed_bodies(compression, decompress):
+    requests = []
+
+    async def _perform_request(method, path, params, headers, body):
+        requests.append((method, path, params, headers, body))
+        return {"errors": False, "items": []}
+
+    client = Mock()
+    client.perform_request = _perform_request
+    pipeline = PipelineSettings({})
+
+    bulker = await run_bulker(
+        client, [DOC_ONE, DOC_TWO], compression=compression, compression_level=1
+    )
+
+    assert len(requests) == 1
+    method, path, params, headers, body = requests[0]
+    assert (method, path, params) == ("PUT", "/_bulk", {"pipeline": pipeline.name})
+    assert headers["content-encoding"] == compression
+    assert decompress(body).count(b"\n") == 4
+    assert bulker.bytes_sent == len(body)
@@ -19,6 +19,7 @@ from connectors.source import (
     BaseDataSource,
     DataSourceConfiguration,
     Field,
+    SerializerRegistry,
     get_data_sources,
     get_source_klass,
 )
@@ -227,3 +228,36 @@ async def test_serialize(raw_doc, expected_doc):
 
         for serialized_doc_key, expected_doc_key in zip(serialized_doc, expected_doc):
             assert serialized_doc[serialized_doc_key] == expected_doc[expected_doc_key]
+
+
+class Celsius(float):
+    pass
+
+
+class Temperature(Celsius):
+    pass
+
+
+def test_serializer_registry():
+    registry = SerializerRegistry({Celsius: lambda value: f"{value}C"})
+
+    assert registry.serialize_value(1.5) == 1.5
+    assert registry.serialize_value(Celsius(1.5)) == "1.5C"
+    assert registry.serialize_value(Temperature(1.5)) == "1.5C"
+    assert registry.serialize_value((Celsius(1.5), [{"a": Celsius(2)}])) == [
+        "1.5C",
+        [{"a": "2.0C"}],
+    ]
+    assert registry.serialize_value({1, 2}) == {1, 2}
+
+
+def test_serializer_registry_copy():
+    registry = SerializerRegistry({Celsius: lambda value: f"{value}C"})
+    assert registry.serialize_value(Temperature(1.5)) == "1.5C"
+
+    copy = registry.copy()
+    copy.register(Temperature, lambda value: f"{value} degrees")
+
+    assert copy.serialize_value(Temperature(1.5)) == "1.5 degrees"
+    assert copy.serialize_value(Celsius(1.5)) == "1.5C"
+    assert registry.serialize_value(Temperature(1.5)) == "1.5C"
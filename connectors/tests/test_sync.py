@@ -475,8 +475,8 @@ async def test_connector_service_poll_large(mock_responses, patch_logger, set_en
 
     # let's make sure we are seeing bulk batches of various sizes
     assert_re(".*Sending a batch.*", patch_logger.logs)
-    assert_re(".*0.48MiB", patch_logger.logs)
-    assert_re(".*0.17MiB", patch_logger.logs)
+    assert_re(".*0.5MiB", patch_logger.logs)
+    assert_re(".*0.42MiB", patch_logger.logs)
     assert_re(".*Sync done: 1001 indexed, 0  deleted", patch_logger.logs)
 
 
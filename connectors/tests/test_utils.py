@@ -10,6 +10,7 @@ import contextlib
 import functools
 import os
 import random
+import sys
 import tempfile
 import time
 from unittest.mock import Mock
@@ -25,8 +26,10 @@ from connectors.utils import (
     MemQueue,
     RetryStrategy,
     convert_to_b64,
+    estimate_size,
     get_base64_value,
     get_size,
+    merge_generators,
     next_run,
     retryable,
     validate_index_name,
@@ -83,7 +86,7 @@ async def test_mem_queue_speed(patch_logger):
 async def test_mem_queue_race(patch_logger):
     item = "small stuff"
     queue = MemQueue(
-        maxmemsize=get_size(item) * 2 + 1, refresh_interval=0.01, refresh_timeout=1
+        maxmemsize=estimate_size(item) * 2 + 1, refresh_interval=0.01, refresh_timeout=1
     )
     max_size = 0
 
@@ -107,7 +110,24 @@ async def test_mem_queue_race(patch_logger):
     tasks = [asyncio.create_task(t) for t in tasks]
 
     await asyncio.gather(*tasks)
-    assert max_size <= get_size(item) * 2
+    assert max_size <= estimate_size(item) * 2
+
+
+@pytest.mark.asyncio
+async def test_mem_queue_with_sizer(patch_logger):
+    queue = MemQueue(maxmemsize=1024, sizer=get_size)
+    await queue.put("small stuff")
+
+    assert queue.qmemsize() == asizeof.asizeof("small stuff")
+
+
+def test_estimate_size():
+    doc = {"_id": "1", "doc": {"title": "x" * 1000, "tags": ["a", "b"]}}
+
+    # same order of magnitude as the exact size, for a fraction of its cost
+    assert get_size(doc) / 2 < estimate_size(doc) < get_size(doc) * 2
+    assert estimate_size(doc, depth=0) == sys.getsizeof(doc)
+    assert estimate_size(b"x" * 1000) == sys.getsizeof(b"x" * 1000)
 
 
 @pytest.mark.asyncio
@@ -116,7 +136,7 @@ async def test_mem_queue(patch_logger):
     await queue.put("small stuff")
 
     assert not queue.full()
-    assert queue.qmemsize() == asizeof.asizeof("small stuff")
+    assert queue.qmemsize() == sys.getsizeof("small stuff")
 
     # let's pile up until it can't accept anymore stuff
     while True:
@@ -136,7 +156,7 @@ async def test_mem_queue(patch_logger):
     async def remove_data():
         await asyncio.sleep(0.1)
         size, item = await queue.get()
-        assert (size, item) == (64, "small stuff")
+        assert (size, item) == (sys.getsizeof("small stuff"), "small stuff")
         await asyncio.sleep(0)
         await queue.get()  # removes the 2kb
         assert not queue.full()
@@ -193,6 +213,22 @@ async def test_concurrent_runner_fails(patch_logger):
     assert 5 not in results
 
 
+@pytest.mark.asyncio
+async def test_concurrent_runner_fails_after_the_task_finished(patch_logger):
+    async def coroutine():
+        raise Exception("I FAILED")
+
+    runner = ConcurrentTasks()
+    await runner.put(coroutine)
+    await asyncio.sleep(0.01)
+    assert len(runner) == 0
+
+    with pytest.raises(Exception, match="I FAILED"):
+        await runner.put(coroutine)
+    with pytest.raises(Exception, match="I FAILED"):
+        await runner.join()
+
+
 @pytest.mark.asyncio
 async def test_concurrent_runner_high_concurrency(patch_logger):
     results = []
@@ -222,6 +258,45 @@ async def test_concurrent_runner_high_concurrency(patch_logger):
     assert second_results == [3]
 
 
+@pytest.mark.asyncio
+async def test_merge_generators(patch_logger):
+    async def generator(name, count):
+        for i in range(count):
+            await asyncio.sleep(0)
+            yield name, i
+
+    items = [
+        item
+        async for item in merge_generators(
+            [generator("a", 10), generator("b", 5), generator("c", 1)],
+            max_concurrency=2,
+            queue_size=2,
+        )
+    ]
+
+    assert sorted(items) == sorted(
+        [("a", i) for i in range(10)] + [("b", i) for i in range(5)] + [("c", 0)]
+    )
+    # both running generators get their turn
+    assert items.index(("b", 4)) < items.index(("a", 9))
+
+
+@pytest.mark.asyncio
+async def test_merge_generators_fails(patch_logger):
+    async def generator():
+        yield 1
+        raise Exception("I FAILED")
+
+    async def endless_generator():
+        while True:
+            await asyncio.sleep(0)
+            yield 2
+
+    with pytest.raises(Exception, match="I FAILED"):
+        async for _ in merge_generators([generator(), endless_generator()]):
+            pass
+
+
 @contextlib.contextmanager
 def temp_file(converter):
     if converter == "system":
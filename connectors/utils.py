@@ -10,6 +10,7 @@ import os
 import platform
 import shutil
 import subprocess
+import sys
 import time
 from datetime import datetime, timezone
 from enum import Enum
@@ -27,6 +28,19 @@ DEFAULT_QUEUE_MEM_SIZE = 5
 DEFAULT_CHUNK_MEM_SIZE = 25
 DEFAULT_MAX_CONCURRENCY = 5
 DEFAULT_CONCURRENT_DOWNLOADS = 10
+DEFAULT_CHECKPOINT_INTERVAL = 60
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_INTERVAL = 2
+DEFAULT_ERROR_BUDGET = 0
+DEFAULT_MAX_DEAD_LETTERS = 100
+DEFAULT_ADAPTIVE_BULK = False
+DEFAULT_MIN_CHUNK_MEM_SIZE = 1
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_TARGET_BULK_LATENCY = 5
+DEFAULT_COMPRESSION = None
+DEFAULT_COMPRESSION_LEVEL = 6
+# levels of nested containers estimate_size looks into, enough for the queued documents
+ESTIMATE_SIZE_DEPTH = 4
 TIKA_SUPPORTED_FILETYPES = [
     ".txt",
     ".py",
@@ -124,6 +138,30 @@ def get_size(ob):
     return asizeof.asizeof(ob)
 
 
+# types estimate_size doesn't look into
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, bool, type(None))
+
+
+def estimate_size(ob, depth=ESTIMATE_SIZE_DEPTH):
+    """Returns an estimate of the size in Bytes, much cheaper than `get_size`.
+
+    Dicts, lists, tuples and sets are sized from their items, down to `depth`
+    levels, and only by their own size below. Unlike `get_size`, objects are
+    not tracked, so the ones referenced several times are counted each time.
+    Encoded documents are sized from their length.
+    """
+    size = sys.getsizeof(ob)
+    if depth <= 0 or isinstance(ob, _ATOMIC_TYPES):
+        return size
+    if isinstance(ob, dict):
+        for key, value in ob.items():
+            size += estimate_size(key, depth - 1) + estimate_size(value, depth - 1)
+    elif isinstance(ob, (list, tuple, set, frozenset)):
+        for item in ob:
+            size += estimate_size(item, depth - 1)
+    return size
+
+
 def get_base64_value(content):
     """
     Returns the converted file passed into a base64 encoded value
@@ -191,10 +229,16 @@ def convert_to_b64(source, target=None, overwrite=False):
 
 class MemQueue(asyncio.Queue):
     def __init__(
-        self, maxsize=0, maxmemsize=0, refresh_interval=1.0, refresh_timeout=60
+        self,
+        maxsize=0,
+        maxmemsize=0,
+        refresh_interval=1.0,
+        refresh_timeout=60,
+        sizer=estimate_size,
     ):
         super().__init__(maxsize)
         self.maxmemsize = maxmemsize
+        self.sizer = sizer
         self.refresh_interval = refresh_interval
         self._current_memsize = 0
         self.refresh_timeout = refresh_timeout
@@ -228,13 +272,13 @@ class MemQueue(asyncio.Queue):
             await asyncio.sleep(self.refresh_interval)
 
     async def put(self, item):
-        item_size = get_size(item)
+        item_size = self.sizer(item)
 
         # This block is taken from the original put() method but with two
         # changes:
         #
         # 1/ full() takes the new item size to decide if we're going over the
-        #    max size, so we do a single call on `get_size` per item
+        #    max size, so we do a single call on `sizer` per item
         #
         # 2/ when the putter is done, we check if the result is QueueFull.
         #    if it's the case, we re-raise it here
@@ -275,7 +319,7 @@ class MemQueue(asyncio.Queue):
         super().put_nowait((item_size, item))
 
     def put_nowait(self, item):
-        item_size = get_size(item)
+        item_size = self.sizer(item)
         if self.full(item_size):
             raise asyncio.QueueFull
         super().put_nowait((item_size, item))
@@ -289,6 +333,9 @@ class ConcurrentTasks:
 
     - `max_concurrency`: max concurrent tasks allowed, default: 5
     - `results_callback`: when provided, synchronous funciton called with the result of each task.
+
+    The first exception raised by a task is raised again by the next `put()`
+    or `join()` call, even when the task finished before.
     """
 
     def __init__(self, max_concurrency=5, results_callback=None):
@@ -296,6 +343,7 @@ class ConcurrentTasks:
         self.tasks = []
         self.results_callback = results_callback
         self._task_over = asyncio.Event()
+        self._exception = None
 
     def __len__(self):
         return len(self.tasks)
@@ -303,8 +351,13 @@ class ConcurrentTasks:
     def _callback(self, task, result_callback=None):
         self.tasks.remove(task)
         self._task_over.set()
+        if task.cancelled():
+            return
         if task.exception():
-            raise task.exception()
+            # raising from a done callback would only log it
+            if self._exception is None:
+                self._exception = task.exception()
+            return
         if result_callback is not None:
             result_callback(task.result())
         # global callback
@@ -318,12 +371,17 @@ class ConcurrentTasks:
         function will block and wait for a free slot.
 
         If provided, `result_callback` will be called when the task is done.
+
+        Raises the exception of a task that failed before.
         """
-        # If self.tasks has reached its max size, we wait for one task to finish
-        if len(self.tasks) >= self.max_concurrency:
+        self._raise_exception()
+        # If self.tasks has reached its max size, we wait for tasks to finish,
+        # several when `max_concurrency` was lowered in the meantime
+        while len(self.tasks) >= self.max_concurrency:
             await self._task_over.wait()
             # rearm
             self._task_over.clear()
+        self._raise_exception()
         task = asyncio.create_task(coroutine())
         self.tasks.append(task)
         task.add_done_callback(
@@ -331,9 +389,14 @@ class ConcurrentTasks:
         )
         return task
 
+    def _raise_exception(self):
+        if self._exception is not None:
+            raise self._exception
+
     async def join(self):
-        """Wait for all tasks to finish."""
+        """Wait for all tasks to finish, and raises the exception of the first task that failed."""
         await asyncio.gather(*self.tasks)
+        self._raise_exception()
 
     def cancel(self):
         """Cancels all tasks"""
@@ -341,6 +404,60 @@ class ConcurrentTasks:
             task.cancel()
 
 
+async def merge_generators(
+    generators, max_concurrency=DEFAULT_MAX_CONCURRENCY, queue_size=DEFAULT_QUEUE_SIZE
+):
+    """Consumes several async generators concurrently and yields their items.
+
+    - `generators`: an iterable of async generators
+    - `max_concurrency`: max generators consumed at the same time, the next one
+      is started as soon as a running one is exhausted
+    - `queue_size`: max items produced but not yet yielded. Producers wait when
+      it's reached and take turns to hand over items, so a generator producing
+      a lot of items can't starve the others.
+
+    If one of the generators fails, the others are cancelled and the exception
+    is raised.
+    """
+    queue = asyncio.Queue(maxsize=queue_size)
+    # asyncio.Lock is acquired in FIFO order, unlike a slot in a full queue
+    turn = asyncio.Lock()
+    tasks = ConcurrentTasks(max_concurrency=max_concurrency)
+    over = object()
+
+    async def _drain(generator):
+        try:
+            async for item in generator:
+                async with turn:
+                    await queue.put((None, item))
+        except Exception as e:
+            await queue.put((e, None))
+        finally:
+            await generator.aclose()
+
+    async def _feed():
+        try:
+            for generator in generators:
+                await tasks.put(functools.partial(_drain, generator))
+            await tasks.join()
+        except Exception as e:
+            await queue.put((e, None))
+        await queue.put((over, None))
+
+    feeder = asyncio.create_task(_feed())
+    try:
+        while True:
+            error, item = await queue.get()
+            if error is over:
+                break
+            if error is not None:
+                raise error
+            yield item
+    finally:
+        feeder.cancel()
+        tasks.cancel()
+
+
 def get_event_loop(uvloop=False):
     if uvloop:
         # activate uvloop if lib is present
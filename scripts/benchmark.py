@@ -0,0 +1,359 @@
+#
+# Copyright Elasticsearch B.V. and/or licensed to Elasticsearch B.V. under one
+# or more contributor license agreements. Licensed under the Elastic License 2.0;
+# you may not use this file except in compliance with the Elastic License 2.0.
+#
+"""Micro-benchmarks of the hot paths of a sync.
+
+They run in memory, without any backend or Elasticsearch.
+"""
+import asyncio
+import functools
+import logging
+import random
+import string
+import struct
+import time
+import zlib
+from argparse import ArgumentDefaultsHelpFormatter, ArgumentParser
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+
+from aiohttp import web
+from pymysql.converters import convert_date, convert_datetime
+
+from connectors.byoc import PipelineSettings
+from connectors.byoei import ElasticServer
+from connectors.logger import set_logger
+from connectors.source import DataSourceConfiguration
+from connectors.sources.mysql import MySqlDataSource, RowTransformer
+from connectors.utils import MemQueue, estimate_size, get_size
+
+DATABASE = "customerinfo"
+TABLE = "customers"
+COLUMNS = {
+    "id": "int",
+    "name": "varchar",
+    "age": "int",
+    "price": "decimal",
+    "created": "datetime",
+    "updated": "datetime",
+    "country": "varchar",
+    "description": "text",
+}
+
+
+def _report(name, rows, duration):
+    print(
+        f"{name}: {int(rows / duration)} rows/sec, {duration / rows * 1000000:.2f} µs/row ({rows} rows in {duration:.2f}s)"
+    )
+
+
+def _source(**configuration):
+    source_configuration = MySqlDataSource.get_default_configuration()
+    for name, value in configuration.items():
+        source_configuration[name]["value"] = value
+    return MySqlDataSource(configuration=DataSourceConfiguration(source_configuration))
+
+
+def _mysql_rows(size):
+    now = datetime.now()
+    return [
+        (
+            row_id,
+            f"user_{row_id}",
+            row_id % 100,
+            Decimal("10.5"),
+            now,
+            now,
+            "FR",
+            "description " * 16,
+        )
+        for row_id in range(size)
+    ]
+
+
+def row_transformer(size):
+    """Rows/sec of turning MySQL rows into documents, row by row and precompiled."""
+    source = _source()
+    column_names = [f"{DATABASE}_{TABLE}_{column}" for column in COLUMNS]
+    keys = [f"{DATABASE}_{TABLE}_id"]
+    rows = _mysql_rows(size)
+    timestamp = datetime.now()
+
+    start = time.perf_counter()
+    for row in rows:
+        source._format_document(
+            database=DATABASE,
+            table=TABLE,
+            keys=keys,
+            row=dict(zip(column_names, row)),
+            timestamp=timestamp,
+        )
+    _report("format_document", size, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    transform = RowTransformer(
+        database=DATABASE,
+        table=TABLE,
+        column_names=column_names,
+        keys=keys,
+        serialize_value=source.serialize_value,
+        column_types=COLUMNS,
+    )
+    for row in rows:
+        transform(row=row, timestamp=timestamp)
+    _report("row_transformer", size, time.perf_counter() - start)
+
+
+def _mysql_compress(value):
+    return struct.pack("<I", len(value)) + zlib.compress(value)
+
+
+def compressed_columns(size):
+    """Bytes on the wire and rows/sec of reading the fixture's 20 KiB `description`
+    rows as they are and compressed server-side."""
+    source = _source()
+    # the rows of the MySQL fixture, see connectors/sources/tests/fixtures/mysql
+    description = "".join(
+        random.choices(string.ascii_uppercase + string.digits, k=1024 * 20)
+    )
+    column_types = {"name": "varchar", "age": "int", "description": "longtext"}
+    column_names = [f"{DATABASE}_{TABLE}_{column}" for column in column_types]
+    keys = [f"{DATABASE}_{TABLE}_name"]
+    timestamp = datetime.now()
+
+    for name, value, compressed in (
+        ("description", description, ()),
+        (
+            "compressed_description",
+            _mysql_compress(description.encode()),
+            ["description"],
+        ),
+    ):
+        rows = [(f"user_{row_id}", row_id, value) for row_id in range(size)]
+        transform = RowTransformer(
+            database=DATABASE,
+            table=TABLE,
+            column_names=column_names,
+            keys=keys,
+            serialize_value=source.serialize_value,
+            column_types=column_types,
+            compressed_columns=compressed,
+        )
+        start = time.perf_counter()
+        for row in rows:
+            transform(row=row, timestamp=timestamp)
+        _report(name, size, time.perf_counter() - start)
+        print(f"{name}: {len(value)} bytes/row on the wire")
+
+
+def _text_rows(size):
+    # values of the text protocol, before the conversions of the driver
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+    today = datetime.now().strftime("%Y-%m-%d")
+    return [
+        (
+            row_id,
+            f"user_{row_id}",
+            row_id % 100,
+            "10.50",
+            now,
+            now,
+            today,
+            "description " * 16,
+        )
+        for row_id in range(size)
+    ]
+
+
+def raw_rows(size):
+    """Rows/sec of turning MySQL rows into documents, with the dates and decimals
+    parsed by the driver and read raw."""
+    source = _source()
+    column_types = {**COLUMNS, "created": "date"}
+    column_names = [f"{DATABASE}_{TABLE}_{column}" for column in column_types]
+    keys = [f"{DATABASE}_{TABLE}_id"]
+    rows = _text_rows(size)
+    timestamp = datetime.now()
+    converters = (
+        None,
+        None,
+        None,
+        Decimal,
+        convert_datetime,
+        convert_datetime,
+        convert_date,
+        None,
+    )
+
+    for raw_values in (False, True):
+        transform = RowTransformer(
+            database=DATABASE,
+            table=TABLE,
+            column_names=column_names,
+            keys=keys,
+            serialize_value=source.serialize_value,
+            column_types=column_types,
+            raw_values=raw_values,
+        )
+        start = time.perf_counter()
+        for row in rows:
+            if not raw_values:
+                row = tuple(
+                    value if converter is None else converter(value)
+                    for converter, value in zip(converters, row)
+                )
+            transform(row=row, timestamp=timestamp)
+        _report(
+            "raw_rows" if raw_values else "parsed_rows",
+            size,
+            time.perf_counter() - start,
+        )
+
+
+class _BulkClient:
+    """Stands in for the Elasticsearch client, acknowledging every bulk request."""
+
+    async def bulk(self, operations, pipeline):
+        return {"errors": False, "items": []}
+
+    async def close(self):
+        pass
+
+
+async def _no_existing_ids(index):
+    return
+    yield
+
+
+async def _docs(size):
+    now = datetime.now().isoformat()
+    for row_id in range(size):
+        yield {
+            "_id": f"{DATABASE}_{TABLE}_{row_id}_",
+            "_timestamp": now,
+            f"{DATABASE}_{TABLE}_id": row_id,
+            f"{DATABASE}_{TABLE}_name": f"user_{row_id}",
+            f"{DATABASE}_{TABLE}_age": row_id % 100,
+            f"{DATABASE}_{TABLE}_country": "FR",
+            f"{DATABASE}_{TABLE}_description": "description " * 16,
+            f"{DATABASE}_{TABLE}_tags": ["customer", "active"],
+        }, None
+
+
+async def _async_bulk(size):
+    es = ElasticServer({"host": "http://localhost:9200"})
+    await es.client.close()
+    es.client = _BulkClient()
+    es.get_existing_ids = _no_existing_ids
+    await es.async_bulk(f"search-{TABLE}", _docs(size), pipeline=mock.Mock())
+
+
+def mem_queue_sizer(size):
+    """Docs/sec through ElasticServer.async_bulk, with the queued documents sized
+    exactly and estimated."""
+    set_logger(logging.WARNING)
+    for name, sizer in (("get_size", get_size), ("estimate_size", estimate_size)):
+        with mock.patch(
+            "connectors.byoei.MemQueue", functools.partial(MemQueue, sizer=sizer)
+        ):
+            start = time.perf_counter()
+            asyncio.run(_async_bulk(size))
+            _report(name, size, time.perf_counter() - start)
+
+
+async def _stand_in_server(received):
+    """Starts an HTTP server answering bulk requests like Elasticsearch, and
+    counting the bytes it receives."""
+
+    async def _bulk(request):
+        # the body is decompressed by aiohttp, its length on the wire is the header's
+        await request.read()
+        received["bytes"] += request.content_length
+        return web.json_response(
+            {"errors": False, "took": 1, "items": []},
+            headers={"X-Elastic-Product": "Elasticsearch"},
+        )
+
+    app = web.Application(client_max_size=1024**3)
+    app.router.add_put("/_bulk", _bulk)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]
+
+
+async def _compressed_bulk(size, compression, level):
+    received = {"bytes": 0}
+    runner, port = await _stand_in_server(received)
+    es = ElasticServer({"host": f"http://127.0.0.1:{port}"})
+    es.get_existing_ids = _no_existing_ids
+    try:
+        start = time.perf_counter()
+        await es.async_bulk(
+            f"search-{TABLE}",
+            _docs(size),
+            PipelineSettings({}),
+            options={"compression": compression, "compression_level": level},
+        )
+        duration = time.perf_counter() - start
+    finally:
+        await es.close()
+        await runner.cleanup()
+    return duration, received["bytes"]
+
+
+def bulk_compression(size):
+    """Docs/sec and bytes sent through ElasticServer.async_bulk to a local
+    stand-in of Elasticsearch, with the bulk requests compressed at different levels."""
+    set_logger(logging.WARNING)
+    for compression, level in (
+        (None, None),
+        ("gzip", 1),
+        ("gzip", 6),
+        ("gzip", 9),
+        ("deflate", 1),
+        ("deflate", 6),
+        ("deflate", 9),
+    ):
+        name = "uncompressed" if compression is None else f"{compression}-{level}"
+        duration, bytes_sent = asyncio.run(_compressed_bulk(size, compression, level))
+        _report(name, size, duration)
+        print(f"{name}: {bytes_sent} bytes sent, {bytes_sent / size:.1f} bytes/doc")
+
+
+BENCHMARKS = {
+    "row-transformer": row_transformer,
+    "compressed-columns": compressed_columns,
+    "raw-rows": raw_rows,
+    "mem-queue-sizer": mem_queue_sizer,
+    "bulk-compression": bulk_compression,
+}
+
+
+def _parser():
+    parser = ArgumentParser(
+        prog="benchmark", formatter_class=ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "--name",
+        type=str,
+        help="Benchmark to run",
+        choices=sorted(BENCHMARKS),
+        default="row-transformer",
+    )
+    parser.add_argument("--size", type=int, help="How many rows", default=100000)
+    return parser
+
+
+def main(args=None):
+    parser = _parser()
+    args = parser.parse_args(args=args)
+    BENCHMARKS[args.name](args.size)
+
+
+if __name__ == "__main__":
+    main()